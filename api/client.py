@@ -0,0 +1,265 @@
+import bisect
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from models.singleton import singleton
+from settings.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# 需要重试的HTTP状态码
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# 可以安全对冲（重复发送）的请求方法
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class RetryableStatusError(requests.RequestException):
+    """服务端返回了可重试的状态码"""
+
+
+class LatencyHistogram:
+    """接口耗时直方图
+
+    buckets 为各桶上界（秒），同时保留最近 window 次耗时用于计算分位数。
+    """
+
+    BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.BUCKETS) + 1)
+        self._recent: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.hedges = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+            self._recent.append(seconds)
+            self.count += 1
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def record_hedge(self) -> None:
+        with self._lock:
+            self.hedges += 1
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """最近耗时的分位数，没有样本时返回None"""
+        with self._lock:
+            samples = sorted(self._recent)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percent / 100))
+        return samples[index]
+
+    @property
+    def samples(self) -> int:
+        return len(self._recent)
+
+    @property
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets = {
+                f"<={upper}s": count
+                for upper, count in zip(self.BUCKETS, self._counts)
+                if count
+            }
+            if self._counts[-1]:
+                buckets[f">{self.BUCKETS[-1]}s"] = self._counts[-1]
+            result = {
+                "count": self.count,
+                "errors": self.errors,
+                "hedges": self.hedges,
+                "buckets": buckets,
+            }
+        for percent in (50, 95, 99):
+            result[f"p{percent}"] = self.percentile(percent)
+        return result
+
+
+class ApiClient:
+    """共享的HTTP客户端
+
+    根据各 Api* 类的 URL/METHOD/TIMEOUT/CONNECT_TIMEOUT 发送请求：
+    复用长连接、接受压缩响应、连接与读取分别超时、指数退避加随机抖动重试；
+    幂等请求在耗时超过历史 hedge_percentile 分位数时再发一个对冲请求，取先返回者。
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8,
+        hedge_percentile: float = 95,
+        hedge_min_samples: int = 20,
+    ):
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._hedge_percentile = hedge_percentile
+        self._hedge_min_samples = hedge_min_samples
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers["Accept-Encoding"] = "gzip, deflate"
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool_size * 2, thread_name_prefix="api-client"
+        )
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, endpoint: str) -> LatencyHistogram:
+        with self._lock:
+            if endpoint not in self._histograms:
+                self._histograms[endpoint] = LatencyHistogram()
+            return self._histograms[endpoint]
+
+    def _backoff(self, attempt: int) -> float:
+        """指数退避并加入随机抖动"""
+        return min(
+            self._backoff_max, self._backoff_base * 2**attempt
+        ) * random.uniform(0.5, 1.0)
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        response = self._session.request(method, url, **kwargs)
+        if response.status_code in RETRY_STATUS:
+            raise RetryableStatusError(f"{url} 返回 {response.status_code}")
+        return response
+
+    def _hedge_delay(self, method: str, histogram: LatencyHistogram) -> Optional[float]:
+        """返回发出对冲请求前的等待时间，不需要对冲时返回None"""
+        if (
+            not self._hedge_percentile
+            or method.upper() not in IDEMPOTENT_METHODS
+            or histogram.samples < self._hedge_min_samples
+        ):
+            return None
+        return histogram.percentile(self._hedge_percentile)
+
+    @staticmethod
+    def _discard(future: Future) -> None:
+        """丢弃对冲中落后的请求，已返回的响应关闭后连接放回连接池"""
+        if not future.cancelled() and future.exception() is None:
+            future.result().close()
+
+    def _send_hedged(
+        self, method: str, url: str, histogram: LatencyHistogram, **kwargs
+    ) -> requests.Response:
+        delay = self._hedge_delay(method, histogram)
+        if delay is None:
+            return self._send(method, url, **kwargs)
+
+        futures: List[Future] = [
+            self._executor.submit(self._send, method, url, **kwargs)
+        ]
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            histogram.record_hedge()
+            futures.append(self._executor.submit(self._send, method, url, **kwargs))
+
+        # 取最先成功的结果，全部失败时抛出最后一个异常
+        pending = set(futures)
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            # 未开始的请求直接取消，已在进行的请求完成后丢弃
+            for future in pending:
+                if not future.cancel():
+                    future.add_done_callback(self._discard)
+
+    def request(
+        self,
+        api: Any,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        deadline: Optional[float] = None,
+    ) -> requests.Response:
+        """按 Api* 类的元数据发送请求
+
+        deadline 为截止时间（time.monotonic），每次尝试前按剩余时间重新计算读取超时，
+        已到截止时间或退避等待会超过截止时间时不再重试，直接抛出异常。
+        """
+        endpoint = getattr(api, "DESC", api.URL)
+        histogram = self.histogram(endpoint)
+        connect_timeout = getattr(api, "CONNECT_TIMEOUT", settings.HTTP_CONNECT_TIMEOUT)
+
+        for attempt in range(self._max_retries + 1):
+            read_timeout = api.TIMEOUT
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise requests.Timeout(f"{endpoint} 请求已超过截止时间")
+                read_timeout = min(read_timeout, left)
+
+            started = time.perf_counter()
+            try:
+                response = self._send_hedged(
+                    api.METHOD,
+                    api.URL,
+                    histogram,
+                    headers=headers,
+                    params=params,
+                    timeout=(min(connect_timeout, read_timeout), read_timeout),
+                )
+            except (
+                requests.ConnectionError,
+                requests.Timeout,
+                RetryableStatusError,
+            ) as e:
+                histogram.record_error()
+                if attempt >= self._max_retries:
+                    raise
+                backoff = self._backoff(attempt)
+                if deadline is not None and time.monotonic() + backoff >= deadline:
+                    logger.info(f"{endpoint} 请求失败，重试会超过截止时间: {e}")
+                    raise
+                logger.info(f"{endpoint} 请求失败，准备第 {attempt + 1} 次重试: {e}")
+                time.sleep(backoff)
+            else:
+                histogram.record(time.perf_counter() - started)
+                return response
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各接口的耗时统计"""
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {
+            endpoint: histogram.to_dict for endpoint, histogram in histograms.items()
+        }
+
+
+@singleton
+def get_api_client() -> ApiClient:
+    """获取进程级共享的HTTP客户端"""
+    return ApiClient(
+        pool_size=settings.HTTP_POOL_SIZE,
+        max_retries=settings.HTTP_MAX_RETRIES,
+        backoff_base=settings.HTTP_BACKOFF_BASE,
+        backoff_max=settings.HTTP_BACKOFF_MAX,
+        hedge_percentile=settings.HTTP_HEDGE_PERCENTILE,
+        hedge_min_samples=settings.HTTP_HEDGE_MIN_SAMPLES,
+    )
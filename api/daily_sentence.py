@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from typing import Any, Dict, List, Optional
 
 
@@ -7,6 +7,15 @@ class ApiDailySentence:
     METHOD = "GET"
     DESC = "金山词霸每日金句API"
     TIMEOUT = 60
+    CONNECT_TIMEOUT = 5
+
+    @dataclass
+    class Params:
+        date: Optional[str] = None  # 指定日期（YYYY-MM-DD），为空时返回最新一句
+
+        @property
+        def to_dict(self):
+            return {key: value for key, value in asdict(self).items() if value}
 
     @dataclass
     class Response:
@@ -29,7 +38,6 @@ class ApiDailySentence:
 
         @classmethod
         def load(cls, data: Dict[str, Any]) -> "ApiDailySentence.Response":
-            print(data)
             return cls(**data)
 
         @property
@@ -1,19 +1,159 @@
 import base64
 import json
+import threading
 import time
 from dataclasses import asdict, dataclass
 from typing import Any, Dict, Optional
 
 from cryptography.hazmat.primitives import serialization
 
+from models.singleton import singleton
 from settings.settings import settings
 
 
+def _text(value: Any) -> Optional[str]:
+    """展示用字符串，空值返回None"""
+    return value if value else None
+
+
+def _float(value: Any) -> Optional[float]:
+    """解析数值字段，空值或非法值返回None"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value: Any) -> Optional[int]:
+    """解析整数字段，空值或非法值返回None"""
+    number = _float(value)
+    return None if number is None else int(number)
+
+
+def _b64url(data: bytes) -> str:
+    """Base64URL编码并去掉末尾的填充符"""
+    return base64.urlsafe_b64encode(data).decode("utf-8").rstrip("=")
+
+
+class QWeatherTokenProvider:
+    """和风天气JWT令牌提供者
+
+    私钥只解析一次，令牌在过期前 refresh_margin 秒内才重新签发，
+    多线程并发调用时只会有一个线程执行签名。
+    """
+
+    def __init__(
+        self,
+        credentials_id: str,
+        project_id: str,
+        private_key_pem: str,
+        ttl: int = 60 * 10,
+        refresh_margin: int = 60,
+    ):
+        self._credentials_id = credentials_id
+        self._project_id = project_id
+        self._private_key_pem = private_key_pem
+        self._ttl = ttl
+        self._refresh_margin = refresh_margin
+
+        self._lock = threading.Lock()
+        self._private_key = None
+        self._token: Optional[str] = None
+        self._expires_at = 0
+
+        # 统计信息
+        self.hits = 0
+        self.refreshes = 0
+        self.sign_seconds_total = 0.0
+        self.sign_seconds_last = 0.0
+
+    def _load_private_key(self):
+        """加载私钥（仅首次调用时解析PEM）"""
+        if self._private_key is None:
+            self._private_key = serialization.load_pem_private_key(
+                self._private_key_pem.encode("utf-8"),
+                password=None,
+            )
+        return self._private_key
+
+    def _sign(self, now: int) -> None:
+        """签发新的JWT令牌"""
+        started = time.perf_counter()
+
+        header = {"alg": "EdDSA", "kid": self._credentials_id}
+        # JWT载荷（Payload）
+        payload = {
+            "sub": self._project_id,  # 签发者
+            "exp": now + self._ttl,  # 过期时间
+            "iat": now,  # 签发时间
+        }
+
+        # 拼接Base64URL编码后的Header和Payload
+        signing_input = "{}.{}".format(
+            _b64url(json.dumps(header, separators=(",", ":")).encode("utf-8")),
+            _b64url(json.dumps(payload, separators=(",", ":")).encode("utf-8")),
+        )
+
+        # 使用Ed25519私钥对签名内容进行签名
+        signature = self._load_private_key().sign(signing_input.encode("utf-8"))
+
+        self._token = f"{signing_input}.{_b64url(signature)}"
+        self._expires_at = payload["exp"]
+
+        elapsed = time.perf_counter() - started
+        self.refreshes += 1
+        self.sign_seconds_last = elapsed
+        self.sign_seconds_total += elapsed
+
+    def get_token(self) -> str:
+        """获取有效的JWT令牌，临近过期时自动刷新"""
+        with self._lock:
+            now = int(time.time())
+            if self._token is None or now >= self._expires_at - self._refresh_margin:
+                self._sign(now)
+            else:
+                self.hits += 1
+            return self._token
+
+    def invalidate(self) -> None:
+        """使当前令牌失效，下次获取时重新签发"""
+        with self._lock:
+            self._token = None
+            self._expires_at = 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """令牌缓存统计"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "refreshes": self.refreshes,
+                "sign_seconds_total": self.sign_seconds_total,
+                "sign_seconds_last": self.sign_seconds_last,
+                "expires_at": self._expires_at,
+            }
+
+
+@singleton
+def get_token_provider() -> QWeatherTokenProvider:
+    """获取进程级的和风天气令牌提供者"""
+    return QWeatherTokenProvider(
+        settings.CREDENTIALS_ID,
+        settings.PROJECT_ID,
+        settings.PRIVATE_KEY_PEM,
+        ttl=settings.QWEATHER_TOKEN_TTL,
+        refresh_margin=settings.QWEATHER_TOKEN_REFRESH_MARGIN,
+    )
+
+
 class ApiWeather(object):
     URL = "https://q64up3ryvx.re.qweatherapi.com/v7/weather/3d"
     METHOD = "GET"
     DESC = "和风天气API接口"
     TIMEOUT = 60
+    CONNECT_TIMEOUT = 5
 
     @dataclass
     class Params:
@@ -39,84 +179,45 @@ class ApiWeather(object):
 
         @classmethod
         def load(cls):
-            header = {"alg": "EdDSA", "kid": settings.CREDENTIALS_ID}
-
-            # JWT载荷（Payload）
-            payload = {
-                "sub": settings.PROJECT_ID,  # 签发者
-                "exp": int(time.time()) + 60 * 10,  # 过期时间（10分钟后）
-                "iat": int(time.time()),  # 签发时间
-            }
-
-            # 对Header进行Base64URL编码
-            header_json = json.dumps(header, separators=(",", ":"))
-            header_encoded = (
-                base64.urlsafe_b64encode(header_json.encode("utf-8"))
-                .decode("utf-8")
-                .rstrip("=")
-            )
-
-            # 对Payload进行Base64URL编码
-            payload_json = json.dumps(payload, separators=(",", ":"))
-            payload_encoded = (
-                base64.urlsafe_b64encode(payload_json.encode("utf-8"))
-                .decode("utf-8")
-                .rstrip("=")
-            )
+            return cls(f"Bearer {get_token_provider().get_token()}")
 
-            # 拼接Header和Payload
-            signing_input = f"{header_encoded}.{payload_encoded}"
-
-            # 加载私钥
-            private_key = serialization.load_pem_private_key(
-                settings.PRIVATE_KEY_PEM.encode("utf-8"),
-                password=None,
-            )
-
-            # 使用Ed25519私钥对签名内容进行签名
-            signature = private_key.sign(signing_input.encode("utf-8"))
-
-            # 对签名结果进行Base64URL编码
-            signature_encoded = (
-                base64.urlsafe_b64encode(signature).decode("utf-8").rstrip("=")
-            )
-
-            # 组合成最终的JWT Token
-            jwt_token = f"Bearer {header_encoded}.{payload_encoded}.{signature_encoded}"
+    @dataclass(slots=True)
+    class Response:
+        """单日预报
 
-            return cls(jwt_token)
+        数值字段在加载时解析为 int/float，缺失（空字符串）统一为 None；
+        只有直接展示的字段保留原始字符串。
+        """
 
-    @dataclass
-    class Response:
         fxDate: str  # 预报日期
         sunrise: Optional[str]  # 日出时间，在高纬度地区可能为空
         sunset: Optional[str]  # 日落时间，在高纬度地区可能为空
         moonrise: Optional[str]  # 当天月升时间，可能为空
         moonset: Optional[str]  # 当天月落时间，可能为空
         moonPhase: Optional[str]  # 月相名称
-        moonPhaseIcon: Optional[str]  # 月相图标代码，另请参考天气图标项目
-        tempMax: Optional[str]  # 预报当天最高温度
-        tempMin: Optional[str]  # 预报当天最低温度
-        iconDay: Optional[str]  # 预报白天天气状况的图标代码，另请参考天气图标项目
+        moonPhaseIcon: Optional[int]  # 月相图标代码，另请参考天气图标项目
+        tempMax: Optional[int]  # 预报当天最高温度
+        tempMin: Optional[int]  # 预报当天最低温度
+        iconDay: Optional[int]  # 预报白天天气状况的图标代码，另请参考天气图标项目
         textDay: Optional[str]  # 预报白天天气状况文字描述，包括阴晴雨雪等天气状态的描述
-        iconNight: Optional[str]  # 预报夜间天气状况的图标代码，另请参考天气图标项目
+        iconNight: Optional[int]  # 预报夜间天气状况的图标代码，另请参考天气图标项目
         textNight: Optional[
             str
         ]  # 预报晚间天气状况文字描述，包括阴晴雨雪等天气状态的描述
-        wind360Day: Optional[str]  # 预报白天风向360角度
+        wind360Day: Optional[int]  # 预报白天风向360角度
         windDirDay: Optional[str]  # 预报白天风向
-        windScaleDay: Optional[str]  # 预报白天风力等级
-        windSpeedDay: Optional[str]  # 预报白天风速，公里/小时
-        wind360Night: Optional[str]  # 预报夜间风向360角度
+        windScaleDay: Optional[str]  # 预报白天风力等级，如 1-3
+        windSpeedDay: Optional[int]  # 预报白天风速，公里/小时
+        wind360Night: Optional[int]  # 预报夜间风向360角度
         windDirNight: Optional[str]  # 预报夜间当天风向
-        windScaleNight: Optional[str]  # 预报夜间风力等级
-        windSpeedNight: Optional[str]  # 预报夜间风速，公里/小时
-        precip: Optional[str]  # 预报当天总降水量，默认单位：毫米
-        uvIndex: Optional[str]  # 紫外线强度指数
-        humidity: Optional[str]  # 相对湿度，百分比数值
-        pressure: Optional[str]  # 大气压强，默认单位：百帕
-        vis: Optional[str]  # 能见度，默认单位：公里
-        cloud: Optional[str]  # 云量，百分比数值。可能为空
+        windScaleNight: Optional[str]  # 预报夜间风力等级，如 1-3
+        windSpeedNight: Optional[int]  # 预报夜间风速，公里/小时
+        precip: Optional[float]  # 预报当天总降水量，默认单位：毫米
+        uvIndex: Optional[int]  # 紫外线强度指数
+        humidity: Optional[int]  # 相对湿度，百分比数值
+        pressure: Optional[int]  # 大气压强，默认单位：百帕
+        vis: Optional[int]  # 能见度，默认单位：公里
+        cloud: Optional[int]  # 云量，百分比数值。可能为空
 
         @property
         def to_dict(self):
@@ -124,4 +225,32 @@ class ApiWeather(object):
 
         @classmethod
         def load(cls, data: Dict[str, Any]) -> "ApiWeather.Response":
-            return cls(**data)
+            return cls(
+                fxDate=data["fxDate"],
+                sunrise=_text(data.get("sunrise")),
+                sunset=_text(data.get("sunset")),
+                moonrise=_text(data.get("moonrise")),
+                moonset=_text(data.get("moonset")),
+                moonPhase=_text(data.get("moonPhase")),
+                moonPhaseIcon=_int(data.get("moonPhaseIcon")),
+                tempMax=_int(data.get("tempMax")),
+                tempMin=_int(data.get("tempMin")),
+                iconDay=_int(data.get("iconDay")),
+                textDay=_text(data.get("textDay")),
+                iconNight=_int(data.get("iconNight")),
+                textNight=_text(data.get("textNight")),
+                wind360Day=_int(data.get("wind360Day")),
+                windDirDay=_text(data.get("windDirDay")),
+                windScaleDay=_text(data.get("windScaleDay")),
+                windSpeedDay=_int(data.get("windSpeedDay")),
+                wind360Night=_int(data.get("wind360Night")),
+                windDirNight=_text(data.get("windDirNight")),
+                windScaleNight=_text(data.get("windScaleNight")),
+                windSpeedNight=_int(data.get("windSpeedNight")),
+                precip=_float(data.get("precip")),
+                uvIndex=_int(data.get("uvIndex")),
+                humidity=_int(data.get("humidity")),
+                pressure=_int(data.get("pressure")),
+                vis=_int(data.get("vis")),
+                cloud=_int(data.get("cloud")),
+            )
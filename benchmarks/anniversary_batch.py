@@ -0,0 +1,74 @@
+"""纪念日计算耗时对比
+
+逐条调用 calculate_anniversaries（旧实现）与按列批量计算（新实现），
+接收人数分别为 1千、10万、100万；逐条计算超过 --scalar-limit 条时
+只计算前 scalar-limit 条并按比例外推。先抽样核对两种实现的结果一致。
+
+用法: python -m benchmarks.anniversary_batch [--scalar-limit 100000]
+"""
+
+import argparse
+import functools
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+from wechat.anniversary_batch import calculate_anniversaries_batch
+from wechat.date_calculation import AnniversaryCalculator, milestone_index
+
+SIZES = [1_000, 100_000, 1_000_000]
+CURRENT = datetime(2025, 3, 1, 7, 30)
+
+
+def _start_dates(size: int, rng: random.Random) -> List[datetime]:
+    first = date(1990, 1, 1)
+    span = (CURRENT.date() - first).days
+    return [
+        datetime.combine(
+            first + timedelta(days=rng.randrange(span + 1)), datetime.min.time()
+        )
+        for _ in range(size)
+    ]
+
+
+def _verify(starts: List[datetime], samples: int, rng: random.Random) -> None:
+    batch = calculate_anniversaries_batch(starts, CURRENT)
+    for index in rng.sample(range(len(starts)), min(samples, len(starts))):
+        expected = AnniversaryCalculator.calculate_anniversaries(starts[index], CURRENT)
+        if batch.row(index) != expected:
+            raise AssertionError(f"结果不一致: {starts[index]}")
+    print(f"抽样核对 {min(samples, len(starts))} 条，结果一致")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scalar-limit", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    _verify(_start_dates(20_000, rng), 5_000, rng)
+
+    for size in SIZES:
+        starts = _start_dates(size, rng)
+
+        scalar_count = min(size, args.scalar_limit)
+        milestone_index.cache_clear()
+        started = time.perf_counter()
+        for start in starts[:scalar_count]:
+            AnniversaryCalculator.calculate_anniversaries(start, CURRENT)
+        scalar = (time.perf_counter() - started) * size / scalar_count
+
+        started = time.perf_counter()
+        calculate_anniversaries_batch(starts, CURRENT)
+        batch = time.perf_counter() - started
+
+        note = "" if scalar_count == size else f"（按 {scalar_count} 条外推）"
+        print(
+            f"{size:>9} 人: 逐条 {scalar:8.3f}s{note}  批量 {batch:7.3f}s  "
+            f"加速 {scalar / batch:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
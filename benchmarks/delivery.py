@@ -0,0 +1,64 @@
+"""发送吞吐压测（无需微信）
+
+用法: python -m benchmarks.delivery [消息数]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from wechat.delivery import DeliveryWorker, FileBackend, HttpBackend
+
+
+class _SinkHandler(BaseHTTPRequestHandler):
+    """只读取请求体并返回 204 的本地接收端"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def _run(worker: DeliveryWorker, count: int) -> None:
+    started = time.perf_counter()
+    futures = [
+        worker.submit(f"user{i % 50}", f"消息 {i}\n" + "天气" * 200)
+        for i in range(count)
+    ]
+    worker.join()
+    elapsed = time.perf_counter() - started
+    failed = sum(1 for future in futures if future.exception() is not None)
+    print(
+        f"{worker.stats['backend']:>6}: {count} 条 {elapsed:.3f}s "
+        f"({count / elapsed:.0f} 条/s), 失败 {failed}, 会话 {worker.stats['sessions']}"
+    )
+    worker.stop()
+
+
+def main(count: int = 10000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        _run(
+            DeliveryWorker(FileBackend(os.path.join(tmp, "outbox.jsonl")), interval=0),
+            count,
+        )
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SinkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/send"
+        _run(DeliveryWorker(HttpBackend(url), interval=0), count // 10)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,83 @@
+"""HTTP客户端长尾压测（无需真实接口）
+
+本地服务端大部分请求快速返回，少量请求模拟长尾延迟，
+对比关闭与开启对冲请求时的 p50/p99 耗时。
+
+用法: python -m benchmarks.http_client [请求数]
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from api.client import ApiClient
+
+# 慢请求比例和耗时（秒）
+SLOW_RATIO = 0.05
+SLOW_SECONDS = 1.0
+FAST_SECONDS = 0.01
+
+
+class _TailHandler(BaseHTTPRequestHandler):
+    """按比例随机产生长尾延迟的本地接口"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(SLOW_SECONDS if random.random() < SLOW_RATIO else FAST_SECONDS)
+        body = json.dumps({"code": "200"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _api(url: str) -> type:
+    return type(
+        "ApiBenchmark",
+        (),
+        {"URL": url, "METHOD": "GET", "DESC": "benchmark", "TIMEOUT": 10},
+    )
+
+
+def _run(name: str, client: ApiClient, api: type, count: int) -> None:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(count):
+        request_started = time.perf_counter()
+        client.request(api).json()
+        latencies.append(time.perf_counter() - request_started)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    hedges = client.stats["benchmark"]["hedges"]
+    print(
+        f"{name:>8}: {count} 次 {elapsed:.2f}s, "
+        f"p50={p50 * 1000:.1f}ms p99={p99 * 1000:.1f}ms, 对冲 {hedges} 次"
+    )
+
+
+def main(count: int = 400) -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _TailHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        api = _api(f"http://127.0.0.1:{server.server_address[1]}/weather")
+        random.seed(0)
+        _run("不对冲", ApiClient(hedge_percentile=0), api, count)
+        random.seed(0)
+        _run("p90对冲", ApiClient(hedge_percentile=90), api, count)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,115 @@
+"""农历转换耗时对比
+
+从1900年起逐年、逐月累加天数的常见写法（旧实现），
+与导入时展开的查找表加共享缓存（新实现），为大量接收人批量计算
+农历日期和下一个农历周年纪念日。先核对两种实现的结果一致。
+
+用法: python -m benchmarks.lunar_calendar [接收人数]
+"""
+
+import random
+import sys
+import time
+from datetime import date, timedelta
+from typing import List, Tuple
+
+from models.lunar_calendar import (
+    FIRST_NEW_YEAR,
+    LUNAR_INFO,
+    LunarDate,
+    lunar_to_solar,
+    next_lunar_anniversaries,
+    next_lunar_anniversary,
+    solar_to_lunar,
+)
+
+TODAY = date(2025, 3, 1)
+
+
+def _year_days(info: int) -> int:
+    days = 348 + sum(1 for month in range(1, 13) if info & (0x10000 >> month))
+    if info & 0xF:
+        days += 30 if info & 0x10000 else 29
+    return days
+
+
+def _month_days(info: int) -> List[Tuple[int, bool, int]]:
+    months = []
+    for month in range(1, 13):
+        months.append((month, False, 30 if info & (0x10000 >> month) else 29))
+        if month == info & 0xF:
+            months.append((month, True, 30 if info & 0x10000 else 29))
+    return months
+
+
+def naive_solar_to_lunar(day: date) -> LunarDate:
+    offset = (day - FIRST_NEW_YEAR).days
+    year = 1900
+    while offset >= _year_days(LUNAR_INFO[year - 1900]):
+        offset -= _year_days(LUNAR_INFO[year - 1900])
+        year += 1
+    for month, leap, days in _month_days(LUNAR_INFO[year - 1900]):
+        if offset < days:
+            return LunarDate(year, month, offset + 1, leap)
+        offset -= days
+    raise ValueError(day)
+
+
+def naive_lunar_to_solar(year: int, month: int, day: int) -> date:
+    offset = sum(_year_days(LUNAR_INFO[y - 1900]) for y in range(1900, year))
+    for current, leap, days in _month_days(LUNAR_INFO[year - 1900]):
+        if current == month and not leap:
+            return FIRST_NEW_YEAR + timedelta(days=offset + min(day, days) - 1)
+        offset += days
+    raise ValueError((year, month, day))
+
+
+def naive_next_anniversary(start: date, on_or_after: date) -> Tuple[int, date]:
+    lunar = naive_solar_to_lunar(start)
+    year = lunar.year
+    while True:
+        day = naive_lunar_to_solar(year, lunar.month, lunar.day)
+        if day >= on_or_after:
+            return year - lunar.year, day
+        year += 1
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(0)
+    first = date(1950, 1, 1)
+    span = (TODAY - first).days
+    starts = [first + timedelta(days=rng.randrange(span)) for _ in range(size)]
+
+    for start in rng.sample(starts, 2_000):
+        assert solar_to_lunar(start) == naive_solar_to_lunar(start), start
+        assert next_lunar_anniversary(start, TODAY) == naive_next_anniversary(
+            start, TODAY
+        ), start
+    print("抽样核对 2000 条，结果一致")
+
+    sample = starts[: min(size, 1_000)]
+    started = time.perf_counter()
+    for start in sample:
+        naive_next_anniversary(start, TODAY)
+    naive = (time.perf_counter() - started) * size / len(sample)
+
+    solar_to_lunar.cache_clear()
+    lunar_to_solar.cache_clear()
+    timings = []
+    # 第一次为冷缓存，第二次相当于第二天再次运行
+    for _ in range(2):
+        started = time.perf_counter()
+        next_lunar_anniversaries(starts, TODAY)
+        timings.append(time.perf_counter() - started)
+
+    print(
+        f"{size} 位接收人的下一个农历周年: 逐年累加 {naive * 1000:.0f}ms"
+        f"（按 {len(sample)} 条外推）  查找表 冷缓存 {timings[0] * 1000:.0f}ms "
+        f"热缓存 {timings[1] * 1000:.0f}ms"
+    )
+    print(f"公历转农历缓存: {solar_to_lunar.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""本地模拟的 OpenAI 兼容接口，用于压测大模型相关代码
+
+延迟 = latency + 输出token数 * token_latency，token 数按字符数粗略估算。
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+SUGGESTION = "晴空如你的笑眼，出门记得带上温柔与防晒"
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 2)
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.2, token_latency: float = 0.002):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.token_latency = token_latency
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "MockLLMServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: MockLLMServer
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body: Dict[str, Any]) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(
+        self,
+        request: Dict[str, Any],
+        content: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+    ) -> None:
+        """以 SSE 形式逐字返回"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def _event(delta: Dict[str, Any], usage: Any = None) -> None:
+            chunk = {
+                "id": "mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": (
+                    [{"index": 0, "delta": delta, "finish_reason": None}]
+                    if delta
+                    else []
+                ),
+                "usage": usage,
+            }
+            data = json.dumps(chunk, ensure_ascii=False)
+            self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            time.sleep(self.server.latency)
+            for char in content:
+                _event({"content": char})
+                time.sleep(self.server.token_latency)
+            _event(
+                {},
+                {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            )
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端超时后主动断开
+            pass
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests += 1
+        messages: List[Dict[str, str]] = request["messages"]
+
+        if request.get("response_format", {}).get("type") == "json_object":
+            items = json.loads(messages[-1]["content"])
+            content = json.dumps(
+                {
+                    "suggestions": [
+                        {"id": item["id"], "suggestion": SUGGESTION} for item in items
+                    ]
+                },
+                ensure_ascii=False,
+            )
+        else:
+            content = SUGGESTION
+
+        prompt_tokens = sum(_tokens(message["content"]) for message in messages)
+        completion_tokens = _tokens(content)
+        if request.get("stream"):
+            self._stream(request, content, prompt_tokens, completion_tokens)
+            return
+        time.sleep(self.server.latency + completion_tokens * self.server.token_latency)
+        self._reply(
+            {
+                "id": "mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": content},
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        )
@@ -0,0 +1,41 @@
+"""逐条请求与批量请求大模型建议的耗时、token 对比（使用本地模拟接口）
+
+用法: python -m benchmarks.suggestion_batch [消息数]
+"""
+
+import sys
+import time
+
+from benchmarks.mock_llm import MockLLMServer
+from settings.settings import settings
+
+
+def main(count: int = 40) -> None:
+    server = MockLLMServer().start()
+    settings.DEEPSEEK_BASE_URL = server.base_url
+
+    from wechat import deepseek
+
+    messages = [f"第{i}位: 晴 2°C ~ 10°C 湿度 65% 紫外线 3" for i in range(count)]
+
+    for label, batch_size in (("逐条", 1), ("批量10", 10), ("批量20", 20)):
+        before = deepseek.stats.to_dict
+        requests_before = server.requests
+        started = time.perf_counter()
+        results = deepseek.get_suggestions(messages, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        after = deepseek.stats.to_dict
+        tokens = (after["prompt_tokens"] + after["completion_tokens"]) - (
+            before["prompt_tokens"] + before["completion_tokens"]
+        )
+        assert len(results) == count
+        print(
+            f"{label:>6}: {count} 条 {elapsed:.3f}s, "
+            f"请求 {server.requests - requests_before} 次, token {tokens}"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,93 @@
+"""消息模板渲染耗时对比
+
+逐行 str.format 并捕获 KeyError 跳过缺字段的行（旧实现），
+与预编译模板一次性拼接（新实现）渲染相同的 10 万条消息。
+
+用法: python -m benchmarks.template_render [消息数]
+"""
+
+import json
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+from models.template_models import TemplateDatabase
+
+TEMPLATE_FILE = "./data/templates.json"
+HEADER = "✨ 🌈 亲爱的宝贝天气播报 🌈 ✨\n"
+
+
+def _template_data(rng: random.Random) -> Dict[str, Any]:
+    data = {
+        "date": "2025-01-01",
+        "season": "冬日暖阳",
+        "season_icon": "❄️",
+        "temp_min": rng.randint(-10, 20),
+        "temp_max": rng.randint(0, 38),
+        "day_icon": "🌞",
+        "day_name": "晴",
+        "night_icon": "✨",
+        "night_name": "晴",
+        "humidity_name": "适宜",
+        "humidity_icon": "💧",
+        "humidity": rng.randint(10, 100),
+        "uv_name": "适中",
+        "uv_icon": "🔆",
+        "uv_index": rng.randint(0, 11),
+        "precip": round(rng.random() * 20, 1),
+        "vis_name": "良好",
+        "vis_icon": "👀",
+        "vis": rng.randint(1, 30),
+        "sunrise": "07:00",
+        "sunset": "18:00",
+        "moon_name": "满月",
+        "moon_icon": "🌕",
+        "moonrise": "18:30",
+        "moonset": "06:10",
+    }
+    # 约四分之一的数据缺少月出月落（高纬度地区等情况）
+    if rng.random() < 0.25:
+        del data["moonrise"], data["moonset"]
+    return data
+
+
+def _legacy_render(templates: List[str], data: Dict[str, Any]) -> str:
+    message_lines = [HEADER]
+    for template in templates:
+        try:
+            message_lines.append(template.format(**data))
+        except KeyError:
+            continue
+    return "\n".join(message_lines)
+
+
+def main(count: int = 100000) -> None:
+    with open(TEMPLATE_FILE, "r", encoding="utf-8") as file:
+        raw = json.load(file)["templates"]
+    database = TemplateDatabase().load_from_json({"templates": raw})
+    styles = database.styles
+
+    rng = random.Random(0)
+    jobs = [(styles[i % len(styles)], _template_data(rng)) for i in range(count)]
+
+    started = time.perf_counter()
+    legacy = [_legacy_render(raw[style], data) for style, data in jobs]
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    compiled = [
+        database.get(style).render(data, first_line=HEADER) for style, data in jobs
+    ]
+    compiled_seconds = time.perf_counter() - started
+
+    assert legacy == compiled, "两种实现的渲染结果不一致"
+    print(
+        f"{count} 条消息（{len(styles)} 种风格）: "
+        f"逐行 format {legacy_seconds:.3f}s, 预编译 {compiled_seconds:.3f}s "
+        f"({legacy_seconds / compiled_seconds:.2f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
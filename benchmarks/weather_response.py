@@ -0,0 +1,118 @@
+"""天气预报对象的内存占用与渲染耗时对比
+
+旧表示为全部字段都是字符串的普通 dataclass，每次渲染都要 int(...) 解析数值；
+新表示为 __slots__ 的 ApiWeather.Response，数值在加载时解析一次。
+
+用法: python -m benchmarks.weather_response [城市数]
+"""
+
+import dataclasses
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from api.weather import ApiWeather
+from wechat.template import WeatherMessageGenerator
+
+# 旧版本的字符串字段表示
+LegacyResponse = dataclasses.make_dataclass(
+    "LegacyResponse",
+    [(field.name, Optional[str]) for field in dataclasses.fields(ApiWeather.Response)],
+)
+
+DAYS = 3
+RENDERS = 20000
+
+
+def _daily(location: int, day: int) -> Dict[str, Any]:
+    rng = random.Random(location * DAYS + day)
+    return {
+        "fxDate": f"2025-01-{day + 1:02d}",
+        "sunrise": "07:00",
+        "sunset": "18:00",
+        "moonrise": "",
+        "moonset": "",
+        "moonPhase": "满月",
+        "moonPhaseIcon": "804",
+        "tempMax": str(rng.randint(0, 38)),
+        "tempMin": str(rng.randint(-10, 20)),
+        "iconDay": rng.choice(["100", "101", "104", "305", "306"]),
+        "textDay": "晴",
+        "iconNight": rng.choice(["150", "151", "104", "305"]),
+        "textNight": "晴",
+        "wind360Day": str(rng.randint(0, 359)),
+        "windDirDay": "北风",
+        "windScaleDay": "1-3",
+        "windSpeedDay": str(rng.randint(0, 30)),
+        "wind360Night": str(rng.randint(0, 359)),
+        "windDirNight": "北风",
+        "windScaleNight": "1-3",
+        "windSpeedNight": str(rng.randint(0, 30)),
+        "precip": f"{rng.random() * 20:.1f}",
+        "uvIndex": str(rng.randint(0, 11)),
+        "humidity": str(rng.randint(10, 100)),
+        "pressure": str(rng.randint(990, 1030)),
+        "vis": str(rng.randint(1, 30)),
+        "cloud": str(rng.randint(0, 100)),
+    }
+
+
+def _measure(load: Callable[[Dict[str, Any]], Any], raw: List[str]):
+    """从接口返回的 JSON 文本加载，只统计加载后仍被对象持有的内存"""
+    tracemalloc.start()
+    objects = [load(json.loads(text)) for text in raw]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return objects, size
+
+
+def _legacy_decode(weather: Any) -> tuple:
+    """旧版本每次渲染都要做的数值解析"""
+    return (
+        int(weather.iconDay),
+        int(weather.iconNight),
+        int(weather.moonPhaseIcon),
+        int(weather.humidity),
+        int(weather.uvIndex),
+        int(weather.vis),
+    )
+
+
+def main(locations: int = 10000) -> None:
+    raw = [
+        json.dumps(_daily(location, day), ensure_ascii=False)
+        for location in range(locations)
+        for day in range(DAYS)
+    ]
+
+    legacy, legacy_size = _measure(lambda daily: LegacyResponse(**daily), raw)
+    typed, typed_size = _measure(ApiWeather.Response.load, raw)
+    print(
+        f"{len(raw)} 条预报: 旧表示 {legacy_size / len(raw):.0f} B/条, "
+        f"新表示 {typed_size / len(raw):.0f} B/条"
+    )
+
+    started = time.perf_counter()
+    for weather in legacy[:RENDERS]:
+        _legacy_decode(weather)
+    legacy_decode = time.perf_counter() - started
+    print(
+        f"旧表示每次渲染的数值解析: {legacy_decode / RENDERS * 1e6:.2f} us/次，新表示为 0"
+    )
+
+    generator = WeatherMessageGenerator("./data/header.json", "./data/weather.json")
+    started = time.perf_counter()
+    for weather in typed[:RENDERS]:
+        generator.generate_message(weather, "romantic")
+    render = time.perf_counter() - started
+    print(
+        f"新表示渲染: {render / RENDERS * 1e6:.1f} us/次"
+        f"（旧表示需额外 {legacy_decode / render * 100:.1f}%）"
+    )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,27 @@
+import operator
+
+# 条件运算符映射
+OPERATOR_MAP = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+def parse_condition(condition_str):
+    """解析条件字符串，返回运算符和数值"""
+    # 支持的所有运算符
+    operators = [">=", "<=", "!=", "==", ">", "<"]
+
+    for op in operators:
+        if condition_str.startswith(op):
+            try:
+                value = float(condition_str[len(op) :])
+                return op, value
+            except ValueError:
+                raise ValueError(f"无法解析数值: {condition_str[len(op):]}")
+
+    raise ValueError(f"无效的条件格式: {condition_str}")
@@ -0,0 +1,87 @@
+import calendar
+import functools
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from models.lunar_calendar import (
+    MAX_DATE,
+    MIN_DATE,
+    next_lunar_anniversary,
+    solar_to_lunar,
+)
+
+# 事件类型：anniversary 每年重复的纪念日，birthday 每年重复的生日，countdown 只发生一次的倒计时
+EVENT_TYPES = ("anniversary", "birthday", "countdown")
+# 重复事件按公历（solar）或农历（lunar）同月同日计算
+CALENDARS = ("solar", "lunar")
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(value: str) -> datetime:
+    """解析 YYYY-MM-DD 日期，同一字符串只解析一次"""
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+def check_calendar(calendar_name: str, day: Optional[date] = None) -> str:
+    """校验历法名称，农历的日期需要在农历查找表的范围内"""
+    if calendar_name not in CALENDARS:
+        raise ValueError(f"不支持的历法: {calendar_name}")
+    if calendar_name == "lunar" and day is not None and not MIN_DATE <= day <= MAX_DATE:
+        raise ValueError(f"日期超出农历支持范围 {MIN_DATE} - {MAX_DATE}: {day}")
+    return calendar_name
+
+
+def _add_years(day: date, years: int) -> date:
+    """按日历加年份，2月29日在平年取2月28日"""
+    year = day.year + years
+    return date(year, day.month, min(day.day, calendar.monthrange(year, day.month)[1]))
+
+
+@dataclass(frozen=True)
+class Event:
+    """接收人的一个日期事件"""
+
+    name: str  # 事件名称，如 "小美的生日"
+    date: date  # 首次发生的日期（生日为出生日期）
+    type: str = "anniversary"
+    lead_days: Optional[int] = None  # 提前几天开始提醒，为空时使用 EVENT_LEAD_DAYS
+    calendar: str = "solar"  # CALENDARS 之一
+
+    @property
+    def recurring(self) -> bool:
+        return self.type != "countdown"
+
+    def occurrence(self, on_or_after: date) -> Optional[date]:
+        """不早于 on_or_after 的下一次发生日期，倒计时已过去时返回None"""
+        if not self.recurring:
+            return self.date if self.date >= on_or_after else None
+        if self.calendar == "lunar":
+            upcoming = next_lunar_anniversary(self.date, on_or_after)
+            return None if upcoming is None else upcoming[1]
+        years = max(0, on_or_after.year - self.date.year)
+        day = _add_years(self.date, years)
+        if day < on_or_after:
+            day = _add_years(self.date, years + 1)
+        return day
+
+    def years_at(self, occurrence: date) -> int:
+        """occurrence 是第几周年（生日为年龄）"""
+        if self.calendar == "lunar":
+            return solar_to_lunar(occurrence).year - solar_to_lunar(self.date).year
+        return occurrence.year - self.date.year
+
+    @classmethod
+    def load(cls, data: Dict[str, Any]) -> "Event":
+        """解析数据"""
+        event_type = data.get("type", "anniversary")
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"不支持的事件类型: {event_type}")
+        day = parse_date(data["date"]).date()
+        return cls(
+            name=data["name"],
+            date=day,
+            type=event_type,
+            lead_days=data.get("lead_days"),
+            calendar=check_calendar(data.get("calendar", "solar"), day),
+        )
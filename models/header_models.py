@@ -1,8 +1,9 @@
 import json
-import random
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 
+from models.sampling import Sampler, pick
+
 
 @dataclass
 class Header:
@@ -42,10 +43,14 @@ class HeaderDatabase:
         except Exception as e:
             raise RuntimeError(f"加载文件失败: {e}")
 
+    def pick(self, sampler: Optional[Sampler] = None) -> Header:
+        """选取一个头部消息，指定抽样器时所有头部轮换一遍之前不会重复"""
+        return pick(sampler, "header", self._result)
+
     @property
     def choice(self):
         """随机获取一个头部消息"""
-        return random.choice(self._result)
+        return self.pick()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,218 @@
+import bisect
+import functools
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 1900-2100 年农历数据，每年 17 位：
+#   第 0-3 位   闰月月份，0 表示无闰月
+#   第 4-15 位  正月至十二月是否为大月（30天），正月在最高位
+#   第 16 位    闰月是否为大月
+LUNAR_INFO = (
+    0x04BD8, 0x04AE0, 0x0A570, 0x054D5, 0x0D260, 0x0D950, 0x16554, 0x056A0, 0x09AD0, 0x055D2,  # 1900
+    0x04AE0, 0x0A5B6, 0x0A4D0, 0x0D250, 0x1D255, 0x0B540, 0x0D6A0, 0x0ADA2, 0x095B0, 0x14977,  # 1910
+    0x04970, 0x0A4B0, 0x0B4B5, 0x06A50, 0x06D40, 0x1AB54, 0x02B60, 0x09570, 0x052F2, 0x04970,  # 1920
+    0x06566, 0x0D4A0, 0x0EA50, 0x16A95, 0x05AD0, 0x02B60, 0x186E3, 0x092E0, 0x1C8D7, 0x0C950,  # 1930
+    0x0D4A0, 0x1D8A6, 0x0B550, 0x056A0, 0x1A5B4, 0x025D0, 0x092D0, 0x0D2B2, 0x0A950, 0x0B557,  # 1940
+    0x06CA0, 0x0B550, 0x15355, 0x04DA0, 0x0A5B0, 0x14573, 0x052B0, 0x0A9A8, 0x0E950, 0x06AA0,  # 1950
+    0x0AEA6, 0x0AB50, 0x04B60, 0x0AAE4, 0x0A570, 0x05260, 0x0F263, 0x0D950, 0x05B57, 0x056A0,  # 1960
+    0x096D0, 0x04DD5, 0x04AD0, 0x0A4D0, 0x0D4D4, 0x0D250, 0x0D558, 0x0B540, 0x0B6A0, 0x195A6,  # 1970
+    0x095B0, 0x049B0, 0x0A974, 0x0A4B0, 0x0B27A, 0x06A50, 0x06D40, 0x0AF46, 0x0AB60, 0x09570,  # 1980
+    0x04AF5, 0x04970, 0x064B0, 0x074A3, 0x0EA50, 0x06B58, 0x05AC0, 0x0AB60, 0x096D5, 0x092E0,  # 1990
+    0x0C960, 0x0D954, 0x0D4A0, 0x0DA50, 0x07552, 0x056A0, 0x0ABB7, 0x025D0, 0x092D0, 0x0CAB5,  # 2000
+    0x0A950, 0x0B4A0, 0x0BAA4, 0x0AD50, 0x055D9, 0x04BA0, 0x0A5B0, 0x15176, 0x052B0, 0x0A930,  # 2010
+    0x07954, 0x06AA0, 0x0AD50, 0x05B52, 0x04B60, 0x0A6E6, 0x0A4E0, 0x0D260, 0x0EA65, 0x0D530,  # 2020
+    0x05AA0, 0x076A3, 0x096D0, 0x04AFB, 0x04AD0, 0x0A4D0, 0x1D0B6, 0x0D250, 0x0D520, 0x0DD45,  # 2030
+    0x0B5A0, 0x056D0, 0x055B2, 0x049B0, 0x0A577, 0x0A4B0, 0x0AA50, 0x1B255, 0x06D20, 0x0ADA0,  # 2040
+    0x14B63, 0x09370, 0x049F8, 0x04970, 0x064B0, 0x168A6, 0x0EA50, 0x06B20, 0x1A6C4, 0x0AAE0,  # 2050
+    0x092E0, 0x0D2E3, 0x0C960, 0x0D557, 0x0D4A0, 0x0DA50, 0x05D55, 0x056A0, 0x0A6D0, 0x055D4,  # 2060
+    0x052D0, 0x0A9B8, 0x0A950, 0x0B4A0, 0x0B6A6, 0x0AD50, 0x055A0, 0x0ABA4, 0x0A5B0, 0x052B0,  # 2070
+    0x0B273, 0x06930, 0x07337, 0x06AA0, 0x0AD50, 0x14B55, 0x04B60, 0x0A570, 0x054E4, 0x0D160,  # 2080
+    0x0E968, 0x0D520, 0x0DAA0, 0x16AA6, 0x056D0, 0x04AE0, 0x0A9D4, 0x0A2D0, 0x0D150, 0x0F252,  # 2090
+    0x0D520,  # 2100
+)  # fmt: skip
+FIRST_YEAR = 1900
+LAST_YEAR = FIRST_YEAR + len(LUNAR_INFO) - 1
+# 农历1900年正月初一
+FIRST_NEW_YEAR = date(1900, 1, 31)
+
+MONTH_NAMES = ("正", "二", "三", "四", "五", "六", "七", "八", "九", "十", "冬", "腊")
+DAY_NAMES = tuple(
+    [f"初{digit}" for digit in "一二三四五六七八九十"]
+    + [f"十{digit}" for digit in "一二三四五六七八九"]
+    + ["二十"]
+    + [f"廿{digit}" for digit in "一二三四五六七八九"]
+    + ["三十"]
+)
+
+
+def _unpack(info: int) -> Tuple[Tuple[Tuple[int, bool], ...], Tuple[int, ...]]:
+    """解出一年中按顺序排列的 (月份, 是否闰月) 和各月天数"""
+    leap_month = info & 0xF
+    months: List[Tuple[int, bool]] = []
+    lengths: List[int] = []
+    for month in range(1, 13):
+        months.append((month, False))
+        lengths.append(30 if info & (0x10000 >> month) else 29)
+        if month == leap_month:
+            months.append((month, True))
+            lengths.append(30 if info & 0x10000 else 29)
+    return tuple(months), tuple(lengths)
+
+
+# 导入时展开为查找表：每年正月初一的日期序数、各月的起始偏移、月份与天数
+_YEAR_STARTS: List[int] = []
+_MONTHS: List[Tuple[Tuple[int, bool], ...]] = []
+_MONTH_OFFSETS: List[Tuple[int, ...]] = []
+_MONTH_LENGTHS: List[Tuple[int, ...]] = []
+
+
+def _build_tables() -> None:
+    ordinal = FIRST_NEW_YEAR.toordinal()
+    for info in LUNAR_INFO:
+        months, lengths = _unpack(info)
+        offsets = [0]
+        for length in lengths[:-1]:
+            offsets.append(offsets[-1] + length)
+        _YEAR_STARTS.append(ordinal)
+        _MONTHS.append(months)
+        _MONTH_OFFSETS.append(tuple(offsets))
+        _MONTH_LENGTHS.append(lengths)
+        ordinal += sum(lengths)
+    # 最后一年的结束位置，便于判断范围
+    _YEAR_STARTS.append(ordinal)
+
+
+_build_tables()
+MIN_DATE = FIRST_NEW_YEAR
+MAX_DATE = date.fromordinal(_YEAR_STARTS[-1] - 1)
+
+
+@dataclass(frozen=True)
+class LunarDate:
+    """农历日期"""
+
+    year: int
+    month: int
+    day: int
+    leap: bool = False  # 是否为闰月
+
+    def __str__(self) -> str:
+        leap = "闰" if self.leap else ""
+        return f"农历{leap}{MONTH_NAMES[self.month - 1]}月{DAY_NAMES[self.day - 1]}"
+
+
+def leap_month(year: int) -> int:
+    """该年的闰月月份，没有闰月时为0"""
+    return LUNAR_INFO[_year_index(year)] & 0xF
+
+
+def month_length(year: int, month: int, leap: bool = False) -> int:
+    """农历某月的天数"""
+    index = _year_index(year)
+    return _MONTH_LENGTHS[index][_month_position(index, month, leap)]
+
+
+def _year_index(year: int) -> int:
+    if not FIRST_YEAR <= year <= LAST_YEAR:
+        raise ValueError(f"农历年份超出支持范围 {FIRST_YEAR}-{LAST_YEAR}: {year}")
+    return year - FIRST_YEAR
+
+
+def _month_position(index: int, month: int, leap: bool) -> int:
+    """月份在该年月份序列中的位置"""
+    leap_month = LUNAR_INFO[index] & 0xF
+    if leap and month != leap_month:
+        raise ValueError(f"农历{FIRST_YEAR + index}年没有闰{month}月")
+    if not 1 <= month <= 12:
+        raise ValueError(f"农历月份无效: {month}")
+    return month - 1 + (1 if leap_month and (month > leap_month or leap) else 0)
+
+
+@functools.lru_cache(maxsize=65536)
+def solar_to_lunar(day: date) -> LunarDate:
+    """公历转农历，只需常数次查表，结果在所有接收人之间共享缓存"""
+    ordinal = day.toordinal()
+    if not _YEAR_STARTS[0] <= ordinal < _YEAR_STARTS[-1]:
+        raise ValueError(f"日期超出农历支持范围 {MIN_DATE} - {MAX_DATE}: {day}")
+    # 农历年份与公历年份相同或早一年
+    index = min(day.year - FIRST_YEAR, len(LUNAR_INFO) - 1)
+    if ordinal < _YEAR_STARTS[index]:
+        index -= 1
+    offset = ordinal - _YEAR_STARTS[index]
+    position = bisect.bisect_right(_MONTH_OFFSETS[index], offset) - 1
+    month, leap = _MONTHS[index][position]
+    return LunarDate(
+        FIRST_YEAR + index, month, offset - _MONTH_OFFSETS[index][position] + 1, leap
+    )
+
+
+@functools.lru_cache(maxsize=65536)
+def lunar_to_solar(year: int, month: int, day: int, leap: bool = False) -> date:
+    """农历转公历，结果在所有接收人之间共享缓存"""
+    index = _year_index(year)
+    position = _month_position(index, month, leap)
+    if not 1 <= day <= _MONTH_LENGTHS[index][position]:
+        raise ValueError(
+            f"农历日期无效: {year}年{'闰' if leap else ''}{month}月{day}日"
+        )
+    return date.fromordinal(
+        _YEAR_STARTS[index] + _MONTH_OFFSETS[index][position] + day - 1
+    )
+
+
+def lunar_anniversary(lunar: LunarDate, year: int) -> Optional[date]:
+    """农历 year 年中与 lunar 同月同日的公历日期
+
+    闰月按同名的普通月份计算，该月没有这一天（如三十）时取该月最后一天；
+    超出查找表范围时返回None。
+    """
+    return _anniversary(year, lunar.month, lunar.day)
+
+
+@functools.lru_cache(maxsize=65536)
+def _anniversary(year: int, month: int, day: int) -> Optional[date]:
+    if not FIRST_YEAR <= year <= LAST_YEAR:
+        return None
+    return lunar_to_solar(year, month, min(day, month_length(year, month)))
+
+
+def next_lunar_anniversary(
+    start: date, on_or_after: date
+) -> Optional[Tuple[int, date]]:
+    """start 的农历周年中不早于 on_or_after 的第一个，返回 (周年数, 公历日期)"""
+    if on_or_after > MAX_DATE:
+        return None
+    lunar = solar_to_lunar(start)
+    year = max(lunar.year, solar_to_lunar(max(on_or_after, MIN_DATE)).year - 1)
+    # 最多向后查看两年
+    while True:
+        day = lunar_anniversary(lunar, year)
+        if day is None:
+            return None
+        if day >= on_or_after:
+            return year - lunar.year, day
+        year += 1
+
+
+def next_lunar_anniversaries(
+    starts: Iterable[date], on_or_after: date
+) -> List[Optional[Tuple[int, date]]]:
+    """批量计算多位接收人的下一个农历周年，相同的开始日期只计算一次"""
+    computed: Dict[date, Optional[Tuple[int, date]]] = {}
+    results = []
+    for start in starts:
+        if start not in computed:
+            computed[start] = next_lunar_anniversary(start, on_or_after)
+        results.append(computed[start])
+    return results
+
+
+def lunar_years_between(start: date, current: date) -> int:
+    """到 current 为止已过的农历周年数"""
+    lunar = solar_to_lunar(start)
+    years = solar_to_lunar(current).year - lunar.year
+    day = lunar_anniversary(lunar, lunar.year + years)
+    if years > 0 and (day is None or day > current):
+        years -= 1
+    return max(0, years)
@@ -0,0 +1,83 @@
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.event_models import Event, check_calendar, parse_date
+
+
+@dataclass
+class Recipient:
+    """消息接收人"""
+
+    name: str  # 微信好友备注名
+    location: Optional[int] = None  # 和风天气城市ID，为空时使用默认城市
+    anniversary: Optional[datetime] = None  # 纪念日，为空时不发送纪念日部分
+    weather_style: Optional[str] = None  # 天气模板风格，为空时随机
+    anniversary_style: Optional[str] = None  # 纪念日风格，为空时随机
+    anniversary_calendar: str = "solar"  # 周年纪念日按公历（solar）或农历（lunar）
+    events: Tuple[Event, ...] = ()  # 生日、倒计时等其他日期事件
+    send_time: Optional[str] = None  # 发送时间 HH:MM，为空时使用 settings 中的时间
+    timezone: Optional[str] = None  # 发送时间的时区，为空时使用 settings.TIMEZONE
+
+    @classmethod
+    def load(
+        cls, data: Dict[str, Any], defaults: Optional[Dict[str, Any]] = None
+    ) -> "Recipient":
+        """解析数据，未配置的字段使用 defaults 中的值"""
+        merged = {**(defaults or {}), **data}
+        anniversary = merged.get("anniversary")
+        anniversary = parse_date(anniversary) if anniversary else None
+        return cls(
+            name=merged["name"],
+            location=merged.get("location"),
+            anniversary=anniversary,
+            weather_style=merged.get("weather_style"),
+            anniversary_style=merged.get("anniversary_style"),
+            anniversary_calendar=check_calendar(
+                merged.get("anniversary_calendar", "solar"),
+                anniversary.date() if anniversary else None,
+            ),
+            events=tuple(Event.load(event) for event in merged.get("events", [])),
+            send_time=merged.get("send_time"),
+            timezone=merged.get("timezone"),
+        )
+
+
+class RecipientDatabase:
+    """接收人数据"""
+
+    def __init__(self):
+        self._result: List[Recipient] = []
+
+    def add(self, recipient: Recipient) -> "RecipientDatabase":
+        self._result.append(recipient)
+        return self
+
+    def load_from_json(self, data: Dict[str, Any]) -> "RecipientDatabase":
+        """从JSON加载数据"""
+        defaults = data.get("defaults", {})
+        for recipient in data.get("recipients", []):
+            self._result.append(Recipient.load(recipient, defaults))
+        return self
+
+    def load_from_file(self, file_path: str) -> "RecipientDatabase":
+        """从JSON文件加载数据"""
+        try:
+            with open(file_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+                return self.load_from_json(data)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+        except json.JSONDecodeError:
+            raise ValueError(f"文件格式错误: {file_path}")
+        except Exception as e:
+            raise RuntimeError(f"加载文件失败: {e}")
+
+    @property
+    def get_all(self) -> List[Recipient]:
+        """获取所有接收人"""
+        return list(self._result)
+
+    def __len__(self) -> int:
+        return len(self._result)
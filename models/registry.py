@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Tuple, TypeVar
+
+from models.header_models import HeaderDatabase
+from models.template_models import TemplateDatabase
+from models.weather_models import WeatherDataLoader
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class _Entry(Generic[T]):
+    """已加载的数据版本"""
+
+    signature: Tuple[int, int]  # (mtime_ns, size)
+    digest: str
+    value: T
+
+
+class DataRegistry(Generic[T]):
+    """进程级数据注册表
+
+    每个文件只解析一次，文件 mtime/大小 变化且内容哈希不同时才重新构建；
+    新对象完整构建后再整体替换，正在渲染的消息仍持有旧版本的引用。
+    """
+
+    def __init__(self, factory: Callable[[Dict[str, Any]], T]):
+        self._factory = factory
+        self._entries: Dict[str, _Entry[T]] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    @staticmethod
+    def _signature(file_path: str) -> Tuple[int, int]:
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self, file_path: str) -> T:
+        """获取文件对应的数据对象，必要时重新加载"""
+        return self.get_with_digest(file_path)[0]
+
+    def get_with_digest(self, file_path: str) -> Tuple[T, str]:
+        """获取数据对象及其文件内容的 sha256，可用作依赖该数据的缓存键"""
+        path = os.path.abspath(file_path)
+        signature = self._signature(path)
+
+        entry = self._entries.get(path)
+        if entry is not None and entry.signature == signature:
+            return entry.value, entry.digest
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.signature == signature:
+                return entry.value, entry.digest
+
+            try:
+                with open(path, "rb") as file:
+                    raw = file.read()
+            except FileNotFoundError:
+                raise FileNotFoundError(f"文件不存在: {file_path}")
+            digest = hashlib.sha256(raw).hexdigest()
+
+            # 仅 mtime 变化、内容未变时沿用旧对象
+            if entry is not None and entry.digest == digest:
+                self._entries[path] = _Entry(signature, digest, entry.value)
+                return entry.value, digest
+
+            try:
+                data = json.loads(raw.decode("utf-8"))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                raise ValueError(f"文件格式错误: {file_path}")
+
+            value = self._factory(data)
+            self._entries[path] = _Entry(signature, digest, value)
+            self.loads += 1
+            return value, digest
+
+    def clear(self) -> None:
+        """清空所有已加载的数据"""
+        with self._lock:
+            self._entries.clear()
+
+
+def _build_weather_loader(data: Dict[str, Any]) -> WeatherDataLoader:
+    loader = WeatherDataLoader()
+    loader.load_categories(data)
+    return loader
+
+
+header_registry: DataRegistry[HeaderDatabase] = DataRegistry(
+    lambda data: HeaderDatabase().load_from_json(data)
+)
+weather_registry: DataRegistry[WeatherDataLoader] = DataRegistry(_build_weather_loader)
+template_registry: DataRegistry[TemplateDatabase] = DataRegistry(
+    lambda data: TemplateDatabase().load_from_json(data)
+)
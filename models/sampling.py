@@ -0,0 +1,187 @@
+import functools
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Sequence, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class KeyedPermutation:
+    """由字符串键确定的 [0, size) 上的伪随机排列
+
+    使用平衡 Feistel 网络加循环行走（cycle walking），
+    单次映射为 O(1)，不需要生成或保存整个排列。
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, size: int, key: str):
+        if size <= 0:
+            raise ValueError(f"排列大小必须为正数: {size}")
+        self.size = size
+        # 定义域取不小于 size 的 4 的幂，左右两半位数相同
+        self._half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self._mask = (1 << self._half_bits) - 1
+        self._round_keys = [
+            hashlib.blake2b(f"{key}|{i}".encode("utf-8"), digest_size=8).digest()
+            for i in range(self.ROUNDS)
+        ]
+
+    def _round(self, value: int, round_key: bytes) -> int:
+        digest = hashlib.blake2b(
+            value.to_bytes(8, "little"), digest_size=8, key=round_key
+        ).digest()
+        return int.from_bytes(digest, "little") & self._mask
+
+    def _encrypt(self, value: int) -> int:
+        left, right = value >> self._half_bits, value & self._mask
+        for round_key in self._round_keys:
+            left, right = right, left ^ self._round(right, round_key)
+        return (left << self._half_bits) | right
+
+    def __getitem__(self, position: int) -> int:
+        value = self._encrypt(position)
+        # 落在 size 之外时继续映射，直到回到定义域内
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+
+@functools.lru_cache(maxsize=16384)
+def _permutation(size: int, key: str, cycle: int) -> KeyedPermutation:
+    """同一轮内的抽取共用一个排列，轮密钥只在每轮第一次抽取时推导"""
+    return KeyedPermutation(size, f"{key}|{cycle}")
+
+
+def shuffle_bag_index(key: str, draw: int, size: int) -> int:
+    """洗牌袋抽样：第 draw 次抽取的下标
+
+    每 size 次抽取为一轮，每轮使用由 (key, 轮次) 确定的排列，
+    同一轮内不会重复，所有条目都用过一遍后才会再次出现。
+    """
+    cycle, position = divmod(draw, size)
+    return _permutation(size, key, cycle)[position]
+
+
+class AliasTable:
+    """Walker/Vose 别名表，预处理 O(n) 后每次按权重抽样为 O(1)"""
+
+    def __init__(self, items: Sequence[T], weights: Sequence[float]):
+        if len(items) != len(weights) or not items:
+            raise ValueError("条目与权重数量不一致或为空")
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("权重之和必须为正数")
+
+        size = len(items)
+        self.items: List[T] = list(items)
+        self._probability = [0.0] * size
+        self._alias = [0] * size
+
+        scaled = [weight * size / total for weight in weights]
+        small = [i for i, value in enumerate(scaled) if value < 1]
+        large = [i for i, value in enumerate(scaled) if value >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._probability[less] = scaled[less]
+            self._alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        for index in small + large:
+            self._probability[index] = 1.0
+
+    def sample(self, rng: Optional[random.Random] = None) -> T:
+        rng = rng or random
+        column = rng.randrange(len(self.items))
+        if rng.random() < self._probability[column]:
+            return self.items[column]
+        return self.items[self._alias[column]]
+
+
+class CursorStore:
+    """每个使用者在每个抽样池上的抽取进度
+
+    以 {使用者: {抽样池: [已抽取次数, 最后抽取日]}} 的形式持久化在 file_path 中；
+    同一天内重复抽取返回同一个位置，保证当天的渲染结果稳定。
+    """
+
+    def __init__(self, file_path: Optional[str]):
+        self._file_path = file_path
+        self._lock = threading.Lock()
+        self._cursors: Dict[str, Dict[str, List[int]]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not self._file_path or not os.path.exists(self._file_path):
+            return
+        try:
+            with open(self._file_path, "r", encoding="utf-8") as file:
+                self._cursors = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.info(f"抽样进度加载失败，将从头开始: {e}")
+
+    def save(self) -> None:
+        """有变化时写回文件"""
+        if not self._file_path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self._file_path) or ".", exist_ok=True)
+            tmp_path = f"{self._file_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(self._cursors, file, separators=(",", ":"))
+            os.replace(tmp_path, self._file_path)
+            self._dirty = False
+
+    def advance(self, owner: str, pool: str, day: int) -> int:
+        """返回本次抽取的序号，同一天内重复调用返回相同序号"""
+        with self._lock:
+            cursors = self._cursors.setdefault(owner, {})
+            cursor = cursors.get(pool)
+            if cursor is None:
+                cursor = cursors[pool] = [0, -1]
+            if cursor[1] != day:
+                cursor[0] += 1
+                cursor[1] = day
+                self._dirty = True
+            return cursor[0] - 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(cursors) for cursors in self._cursors.values())
+
+
+class Sampler:
+    """某个使用者某一天某个消息部分的不重复抽样器"""
+
+    def __init__(
+        self, store: CursorStore, owner: str, day: date, section: str, seed: str = ""
+    ):
+        self._store = store
+        self._owner = owner
+        self._day = day.toordinal()
+        self._section = section
+        self._seed = seed
+
+    def choice(self, pool: str, items: Sequence[T]) -> T:
+        """从抽样池中取出一项，每轮内不重复"""
+        pool = f"{self._section}/{pool}"
+        draw = self._store.advance(self._owner, pool, self._day)
+        key = f"{self._seed}|{self._owner}|{pool}"
+        return items[shuffle_bag_index(key, draw, len(items))]
+
+
+def pick(sampler: Optional[Sampler], pool: str, items: Sequence[T]) -> T:
+    """有抽样器时按洗牌袋抽取，否则使用全局 random 随机选择"""
+    if sampler is None:
+        return random.choice(items)
+    return sampler.choice(pool, items)
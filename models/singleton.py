@@ -0,0 +1,30 @@
+import functools
+import threading
+from typing import Callable, List, TypeVar
+
+T = TypeVar("T")
+
+
+def singleton(factory: Callable[[], T]) -> Callable[[], T]:
+    """把无参数的工厂函数变为进程级单例的获取函数
+
+    第一次调用时才创建实例（此时才读取 settings），并发的第一次调用也只创建一次；
+    cache_clear() 丢弃已创建的实例，下次调用时重新创建。
+    """
+    lock = threading.Lock()
+    instances: List[T] = []
+
+    @functools.wraps(factory)
+    def get() -> T:
+        if not instances:
+            with lock:
+                if not instances:
+                    instances.append(factory())
+        return instances[0]
+
+    def cache_clear() -> None:
+        with lock:
+            instances.clear()
+
+    get.cache_clear = cache_clear
+    return get
@@ -0,0 +1,91 @@
+import json
+import string
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class CompiledLine:
+    """预编译的单行模板
+
+    segments 为 (字面文本, 字段名) 序列，字段名为 None 表示只有字面文本；
+    fields 为该行需要的全部字段。
+    """
+
+    segments: Tuple[Tuple[str, Optional[str]], ...]
+    fields: FrozenSet[str]
+
+    @classmethod
+    def compile(cls, template: str) -> "CompiledLine":
+        """解析模板行，只支持不带格式说明的 {字段} 占位符"""
+        segments = []
+        for literal, field, format_spec, conversion in string.Formatter().parse(
+            template
+        ):
+            if field is not None and (not field or format_spec or conversion):
+                raise ValueError(f"不支持的模板占位符: {template}")
+            segments.append((literal, field))
+        return cls(
+            segments=tuple(segments),
+            fields=frozenset(field for _, field in segments if field is not None),
+        )
+
+
+class MessageTemplate:
+    """一种风格的消息模板，由若干预编译的模板行组成"""
+
+    def __init__(self, style: str, lines: List[str]):
+        self.style = style
+        self.lines = [CompiledLine.compile(line) for line in lines]
+
+    def render(self, data: Dict[str, Any], first_line: Optional[str] = None) -> str:
+        """渲染消息，缺少所需字段的行在格式化前直接跳过"""
+        parts: List[str] = []
+        if first_line is not None:
+            parts.append(first_line)
+        available = data.keys()
+        for line in self.lines:
+            if not line.fields <= available:
+                continue
+            if parts:
+                parts.append("\n")
+            for literal, field in line.segments:
+                parts.append(literal)
+                if field is not None:
+                    parts.append(str(data[field]))
+        return "".join(parts)
+
+
+class TemplateDatabase:
+    """消息模板数据"""
+
+    def __init__(self):
+        self._templates: Dict[str, MessageTemplate] = {}
+
+    def load_from_json(self, data: Dict[str, Any]) -> "TemplateDatabase":
+        """从JSON加载数据"""
+        for style, lines in data.get("templates").items():
+            self._templates[style] = MessageTemplate(style, lines)
+        return self
+
+    def load_from_file(self, file_path: str) -> "TemplateDatabase":
+        """从JSON文件加载数据"""
+        try:
+            with open(file_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+                return self.load_from_json(data)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+        except json.JSONDecodeError:
+            raise ValueError(f"文件格式错误: {file_path}")
+        except Exception as e:
+            raise RuntimeError(f"加载文件失败: {e}")
+
+    def get(self, style: str, default: str = "romantic") -> MessageTemplate:
+        """获取指定风格的模板，不存在时使用默认风格"""
+        return self._templates.get(style) or self._templates[default]
+
+    @property
+    def styles(self) -> List[str]:
+        """所有模板风格"""
+        return list(self._templates.keys())
@@ -1,7 +1,13 @@
+import bisect
 import json
-import random
+import logging
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from models.conditions import OPERATOR_MAP, parse_condition
+from models.sampling import Sampler, pick
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -27,17 +33,31 @@ class WeatherItem:
             level=data.get("level"),
         )
 
+    @property
+    def pool(self) -> str:
+        """抽样池标识"""
+        return f"code:{self.code}" if self.code is not None else f"name:{self.name[0]}"
+
+    def pick_suggestion(self, sampler: Optional[Sampler] = None) -> str:
+        return pick(sampler, f"{self.pool}/suggestion", self.suggestions)
+
+    def pick_name(self, sampler: Optional[Sampler] = None) -> str:
+        return pick(sampler, f"{self.pool}/name", self.name)
+
+    def pick_icon(self, sampler: Optional[Sampler] = None) -> str:
+        return pick(sampler, f"{self.pool}/icon", self.icons)
+
     @property
     def get_suggestion(self) -> str:
-        return random.choice(self.suggestions)
+        return self.pick_suggestion()
 
     @property
     def get_name(self) -> str:
-        return random.choice(self.name)
+        return self.pick_name()
 
     @property
     def get_icon(self):
-        return random.choice(self.icons)
+        return self.pick_icon()
 
 
 @dataclass
@@ -55,6 +75,104 @@ class WeatherCategory:
         return cls(id=data["id"], name=data["name"], items=items)
 
 
+class LevelTable:
+    """等级查找表（紫外线等级、月份等离散整数取值）
+
+    以等级为下标的稠密数组，查询为 O(1)。
+    """
+
+    def __init__(self, category: WeatherCategory):
+        self.category_id = category.id
+        size = max(
+            (max(item.level) for item in category.items if item.level), default=-1
+        )
+        self._table: List[Optional[WeatherItem]] = [None] * (size + 1)
+
+        for item in category.items:
+            for level in item.level or []:
+                if level < 0:
+                    raise ValueError(f"类别 {category.id} 存在非法等级: {level}")
+                if self._table[level] is not None:
+                    raise ValueError(f"类别 {category.id} 的等级 {level} 重复定义")
+                self._table[level] = item
+
+        # 未覆盖的等级会使用调用方的默认值
+        levels = [level for item in category.items for level in item.level or []]
+        self.gaps = [
+            level
+            for level in range(min(levels, default=0), len(self._table))
+            if self._table[level] is None
+        ]
+        if self.gaps:
+            logger.warning(f"类别 {category.id} 未覆盖的等级: {self.gaps}")
+
+    def lookup(self, value: int) -> Optional[WeatherItem]:
+        if isinstance(value, int) and 0 <= value < len(self._table):
+            return self._table[value]
+        return None
+
+
+class IntervalTable:
+    """区间查找表（湿度、能见度、气压等阈值条件）
+
+    以所有阈值为断点把数轴切分为 (-inf, b0), {b0}, (b0, b1), ... {bk}, (bk, inf)
+    若干段，加载时确定每段对应的项目，查询时二分定位所在段。
+    """
+
+    def __init__(self, category: WeatherCategory):
+        self.category_id = category.id
+        conditions = []
+        for item in category.items:
+            op, threshold = parse_condition(item.condition)
+            conditions.append((OPERATOR_MAP[op], threshold, item))
+
+        self._breakpoints: List[float] = sorted({c[1] for c in conditions})
+        self._segments: List[Optional[WeatherItem]] = []
+        self.gaps: List[Tuple[float, float]] = []
+
+        for index in range(2 * len(self._breakpoints) + 1):
+            low, high, sample = self._segment_bounds(index)
+            matched = [
+                item for func, threshold, item in conditions if func(sample, threshold)
+            ]
+            if len(matched) > 1:
+                raise ValueError(
+                    f"类别 {category.id} 的条件在区间 [{low}, {high}] 内重叠: "
+                    f"{[item.condition for item in matched]}"
+                )
+            if not matched:
+                self.gaps.append((low, high))
+            self._segments.append(matched[0] if matched else None)
+
+        # 未覆盖的区间会使用调用方的默认值
+        if self.gaps:
+            logger.debug(f"类别 {category.id} 使用默认值的区间: {self.gaps}")
+
+    def _segment_bounds(self, index: int) -> Tuple[float, float, float]:
+        """返回第 index 段的下界、上界以及一个代表值"""
+        points = self._breakpoints
+        if index % 2 == 1:
+            point = points[index // 2]
+            return point, point, point
+
+        position = index // 2
+        low = points[position - 1] if position > 0 else float("-inf")
+        high = points[position] if position < len(points) else float("inf")
+        if low == float("-inf"):
+            sample = high - 1
+        elif high == float("inf"):
+            sample = low + 1
+        else:
+            sample = (low + high) / 2
+        return low, high, sample
+
+    def lookup(self, value: float) -> Optional[WeatherItem]:
+        position = bisect.bisect_left(self._breakpoints, value)
+        if position < len(self._breakpoints) and self._breakpoints[position] == value:
+            return self._segments[2 * position + 1]
+        return self._segments[2 * position]
+
+
 class WeatherDataLoader:
     """天气数据加载器"""
 
@@ -63,17 +181,25 @@ class WeatherDataLoader:
         self._code_index: Dict[int, WeatherItem] = {}
         self._category_id_index: Dict[int, WeatherCategory] = {}
         self._name_index: Dict[str, List[WeatherItem]] = {}
+        self._value_index: Dict[int, Union[LevelTable, IntervalTable]] = {}
 
     def _build_indexes(self) -> None:
         """构建索引以加速查询"""
         self._code_index.clear()
         self._category_id_index.clear()
         self._name_index.clear()
+        self._value_index.clear()
 
         for category in self._categories.values():
             # 构建类别ID索引
             self._category_id_index[category.id] = category
 
+            # 预编译等级/阈值类别的查找表
+            if category.items and all(item.level for item in category.items):
+                self._value_index[category.id] = LevelTable(category)
+            elif category.items and all(item.condition for item in category.items):
+                self._value_index[category.id] = IntervalTable(category)
+
             # 构建代码和名称索引
             for item in category.items:
                 if item.code is not None:
@@ -98,7 +224,7 @@ class WeatherDataLoader:
         except Exception as e:
             raise RuntimeError(f"加载文件失败: {e}")
 
-    def find_item_by_code(self, code: int) -> Optional[WeatherItem]:
+    def find_item_by_code(self, code: Optional[int]) -> Optional[WeatherItem]:
         """通过code查找天气项目"""
         return self._code_index.get(code)
 
@@ -106,6 +232,15 @@ class WeatherDataLoader:
         """根据ID查找类别"""
         return self._category_id_index.get(category_id)
 
+    def find_item_by_value(
+        self, category_id: int, value: Optional[Union[int, float]]
+    ) -> Optional[WeatherItem]:
+        """根据等级或数值在预编译查找表中查找项目，未命中或数值缺失时返回None"""
+        table = self._value_index.get(category_id)
+        if table is None or value is None:
+            return None
+        return table.lookup(value)
+
     # def find_items_by_name(self, name: str) -> List[WeatherItem]:
     #     """通过名称查找天气项目"""
     #     return self._name_index.get(name, [])
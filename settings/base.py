@@ -43,17 +43,128 @@ class BaseConfig:
     CREDENTIALS_ID = get_env_config("CREDENTIALS_ID")
     PROJECT_ID = get_env_config("PROJECT_ID")
     PRIVATE_KEY_PEM = get_env_config("PRIVATE_KEY_PEM")
+    # 和风天气JWT有效期（秒）
+    QWEATHER_TOKEN_TTL = 60 * 10
+    # 距离过期多少秒内重新签发JWT
+    QWEATHER_TOKEN_REFRESH_MARGIN = 60
     # 纪念日日期
     ANNIVERSARY = get_env_config("ANNIVERSARY")
     # 日志级别
     LOGGER_LEVEL = "DEBUG"
     # DeepSeek API Key
     DEEPSEEK_API_KEY = get_env_config("DEEPSEEK_API_KEY")
+    # DeepSeek 接口地址
+    DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+    # DeepSeek 模型
+    DEEPSEEK_MODEL = "deepseek-chat"
+    # DeepSeek 连接池大小
+    DEEPSEEK_POOL_SIZE = 10
+    # DeepSeek 连接超时（秒）
+    DEEPSEEK_CONNECT_TIMEOUT = 5
+    # DeepSeek 请求超时（秒）
+    DEEPSEEK_TIMEOUT = 30
+    # DeepSeek 最大重试次数
+    DEEPSEEK_MAX_RETRIES = 2
+    # 异步并发请求 DeepSeek 的上限
+    DEEPSEEK_CONCURRENCY = 5
+    # 建议缓存文件
+    SUGGESTION_CACHE_FILE = "./data/cache/suggestions.json"
+    # 建议缓存有效期（秒）
+    SUGGESTION_CACHE_TTL = 60 * 60 * 24 * 30
+    # 建议缓存最大条目数
+    SUGGESTION_CACHE_SIZE = 1000
+    # 每种天气特征保留的建议数量
+    SUGGESTION_CACHE_VARIANTS = 3
+    # 建议数量未达到上述数量时，每次命中有多大概率重新生成一条补充
+    SUGGESTION_CACHE_TOP_UP = 0.2
+    # 每次批量请求包含的天气消息数量，小于等于1时逐条请求
+    SUGGESTION_BATCH_SIZE = 1
+    # 是否以流式方式请求建议
+    SUGGESTION_STREAM = True
+    # 单条建议的耗时预算（秒），超出后使用本地建议
+    SUGGESTION_BUDGET = 20
+    # 大模型建议需在运行截止时间前多少秒结束，留出时间使用本地建议并拼接消息
+    SUGGESTION_HEADROOM = 5
     # 日志文件名
     LOG_FILE_NAME = "daily_message.log"
     # 提醒时间
     HOUR = 7
     # 分钟数
     MINUTE = 30
+    # 默认时区，接收人可单独配置
+    TIMEZONE = "Asia/Shanghai"
+    # 定时任务存储的数据库地址，为空时只保存在内存中
+    SCHEDULER_JOBSTORE_URL = "sqlite:///./data/cache/jobs.sqlite3"
+    # 任务错过触发时间后仍然执行的宽限时间（秒）
+    SCHEDULER_MISFIRE_GRACE = 300
+    # 错过多次触发时是否只补执行一次
+    SCHEDULER_COALESCE = True
+    # 同一分钟的第一个任务触发后等待多少秒再合并运行
+    SCHEDULER_BATCH_WINDOW = 5
+    # 提前多少秒生成消息放入待发送队列，到点后只执行发送；为0时到点后才生成
+    SCHEDULER_PREPARE_LEAD = 600
+    # 提前生成失败后的重试间隔（秒），只在提前量内重试
+    SCHEDULER_PREPARE_RETRY = 60
+    # 准备、发送阶段各自的批量运行线程数，准备阶段的重试在两次运行之间不占用线程
+    SCHEDULER_WORKERS = 4
+    # HTTP连接池大小
+    HTTP_POOL_SIZE = 10
+    # HTTP连接超时（秒），各接口可通过 CONNECT_TIMEOUT 覆盖
+    HTTP_CONNECT_TIMEOUT = 5
+    # HTTP最大重试次数
+    HTTP_MAX_RETRIES = 2
+    # HTTP重试退避的初始间隔和最大间隔（秒）
+    HTTP_BACKOFF_BASE = 0.5
+    HTTP_BACKOFF_MAX = 8
+    # 请求耗时超过该历史分位数时发出对冲请求，0为关闭
+    HTTP_HEDGE_PERCENTILE = 95
+    # 开启对冲前至少需要的历史样本数
+    HTTP_HEDGE_MIN_SAMPLES = 20
+    # 天气预报本地存储文件
+    FORECAST_STORE_FILE = "./data/cache/forecast.sqlite3"
+    # 预报发布后多少秒内视为新鲜，无需请求接口
+    FORECAST_FRESH_AGE = 60 * 60 * 6
+    # 预报发布后多少秒内仍可在网络异常时使用
+    FORECAST_MAX_AGE = 60 * 60 * 36
+    # 只有过期预报时等待刷新的时间（秒），超时后先使用过期预报
+    FORECAST_STALE_BUDGET = 5
+    # 每日一句存档文件
+    SENTENCE_ARCHIVE_FILE = "./data/cache/sentences.json"
+    # 请求每日一句的耗时预算（秒），超时后使用最近一天的存档，没有存档时省略该部分
+    SENTENCE_BUDGET = 5
+    # 每日一句最多存档的天数
+    SENTENCE_ARCHIVE_SIZE = 365
+    # 发送完成后是否预取明天的每日一句
+    SENTENCE_PREFETCH = True
+    # 接口返回的还不是当天的句子时，间隔多久（秒）再次请求
+    SENTENCE_RETRY_AFTER = 60 * 60
+    # 渲染随机数的全局种子，修改后所有接收人的随机选择都会变化
+    RENDER_SEED = ""
+    # 渲染结果缓存的最大条目数
+    RENDER_CACHE_SIZE = 1024
+    # 按 (开始日期, 当天) 缓存的纪念日数据的最大条目数，日期变化时清空
+    ANNIVERSARY_CACHE_SIZE = 4096
+    # 接收人数不少于该值且安装了 numpy 时，纪念日按列批量计算
+    ANNIVERSARY_BATCH_MIN = 1000
+    # 生日、倒计时等事件默认提前几天开始提醒
+    EVENT_LEAD_DAYS = 3
+    # 头部、图标、建议等不重复抽样的进度文件
+    SAMPLER_CURSOR_FILE = "./data/cache/cursors.json"
+    # 单次运行的总截止时间（秒）
+    RUN_DEADLINE = 120
+    # 并发获取数据的线程数
+    FETCH_WORKERS = 8
+    # 接收人配置文件，文件不存在时只发送给 USER_NAME
+    RECIPIENTS_FILE = "./data/recipients.json"
+    # 消息发送后端：wxauto / file / http
+    DELIVERY_BACKEND = "wxauto"
+    # file 后端的输出文件
+    DELIVERY_FILE = "./logs/outbox.jsonl"
+    # http 后端的接收地址
+    DELIVERY_HTTP_URL = "http://127.0.0.1:8765/send"
+    # 发送队列容量
+    DELIVERY_QUEUE_SIZE = 1000
+    # 两条消息之间的最小间隔（秒）
+    DELIVERY_INTERVAL = 1.0
 
     USER_NAME = "你的用户名"
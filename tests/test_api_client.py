@@ -0,0 +1,149 @@
+"""api.client.ApiClient 的重试、对冲和截止时间，对本地 http.server 实际发送请求
+
+用法: python -m pytest tests
+"""
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List
+
+import requests
+
+from api.client import ApiClient, RetryableStatusError
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """按服务端的 respond(第几次请求) 返回 (状态码, 延迟秒数)"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.hits += 1
+            hit = self.server.hits
+        status, delay = self.server.respond(hit)
+        time.sleep(delay)
+        body = json.dumps({"code": str(status), "hit": hit}).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端已超时断开
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class ApiClientTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.hits = 0
+        self.server.respond = lambda hit: (200, 0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api = type(
+            "ApiTest",
+            (),
+            {
+                "URL": f"http://127.0.0.1:{self.server.server_address[1]}/test",
+                "METHOD": "GET",
+                "DESC": "test",
+                "TIMEOUT": 5,
+                "CONNECT_TIMEOUT": 1,
+            },
+        )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _respond(self, respond: Callable[[int], tuple]) -> None:
+        self.server.respond = respond
+
+    def test_retries_retryable_status(self):
+        self._respond(lambda hit: (503, 0) if hit <= 2 else (200, 0))
+        client = ApiClient(max_retries=2, backoff_base=0.01, hedge_percentile=0)
+
+        response = client.request(self.api)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["hit"], 3)
+        stats = client.stats["test"]
+        self.assertEqual(stats["errors"], 2)
+        self.assertEqual(stats["count"], 1)
+
+    def test_raises_after_max_retries(self):
+        self._respond(lambda hit: (500, 0))
+        client = ApiClient(max_retries=1, backoff_base=0.01, hedge_percentile=0)
+
+        with self.assertRaises(RetryableStatusError):
+            client.request(self.api)
+        self.assertEqual(self.server.hits, 2)
+
+    def test_hedges_slow_request(self):
+        client = ApiClient(hedge_percentile=50, hedge_min_samples=5)
+        for _ in range(5):
+            client.request(self.api)
+
+        # 第6次请求很慢，对冲请求（第7次）很快返回
+        self._respond(lambda hit: (200, 2) if hit == 6 else (200, 0))
+        started = time.monotonic()
+        response = client.request(self.api)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(response.json()["hit"], 7)
+        self.assertLess(elapsed, 1)
+        self.assertEqual(client.stats["test"]["hedges"], 1)
+
+    def test_losing_hedge_is_discarded(self):
+        client = ApiClient(pool_size=1, hedge_percentile=50, hedge_min_samples=5)
+        for _ in range(5):
+            client.request(self.api)
+        self._respond(lambda hit: (200, 0.5) if hit == 6 else (200, 0))
+        client.request(self.api)
+
+        # 落后的请求完成后连接放回连接池，之后的请求不受影响
+        time.sleep(0.6)
+        self._respond(lambda hit: (200, 0))
+        responses: List[requests.Response] = [
+            client.request(self.api) for _ in range(3)
+        ]
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+
+    def test_deadline_bounds_read_timeout(self):
+        self._respond(lambda hit: (200, 2))
+        client = ApiClient(max_retries=5, backoff_base=0.01, hedge_percentile=0)
+
+        started = time.monotonic()
+        with self.assertRaises(requests.Timeout):
+            client.request(self.api, deadline=time.monotonic() + 0.5)
+        self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_no_backoff_past_deadline(self):
+        self._respond(lambda hit: (503, 0))
+        client = ApiClient(max_retries=5, backoff_base=5, hedge_percentile=0)
+
+        started = time.monotonic()
+        with self.assertRaises(RetryableStatusError):
+            client.request(self.api, deadline=time.monotonic() + 1)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(self.server.hits, 1)
+
+    def test_expired_deadline_sends_nothing(self):
+        client = ApiClient(hedge_percentile=0)
+
+        with self.assertRaises(requests.Timeout):
+            client.request(self.api, deadline=time.monotonic() - 1)
+        self.assertEqual(self.server.hits, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""wechat.date_calculation 的按日历加月份和纪念日索引，与逐日枚举的结果对比
+
+用法: python -m pytest tests
+"""
+
+import calendar
+import random
+import unittest
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+from wechat.date_calculation import (
+    MILESTONE_PRIORITY,
+    SPECIAL_DAYS,
+    AnniversaryCalculator,
+    MilestoneIndex,
+    add_months,
+)
+
+
+def _random_date(rng: random.Random, first: date, last: date) -> date:
+    return date.fromordinal(rng.randint(first.toordinal(), last.toordinal()))
+
+
+def _brute_add_months(start: date, months: int) -> date:
+    """逐月前进，取目标月份中不晚于开始日期"日"的最后一天"""
+    year, month = start.year, start.month
+    for _ in range(months):
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    day = start.day
+    while True:
+        try:
+            return date(year, month, day)
+        except ValueError:
+            day -= 1
+
+
+def _brute_count_months(start: date, current: date) -> int:
+    months = -1
+    while add_months(start, months + 1) <= current:
+        months += 1
+    return months
+
+
+def _brute_next(start: date, current: date) -> Optional[Tuple[date, str, int]]:
+    """枚举全部特殊天数和 current 之后一年多的月纪念日，取最早的一个"""
+    candidates = [
+        (start + timedelta(days=day), MILESTONE_PRIORITY["special"], "special", day)
+        for day in SPECIAL_DAYS
+    ]
+    months = max(0, _brute_count_months(start, current))
+    for month in range(1, months + 14):
+        kind, value = ("monthly", month) if month % 12 else ("yearly", month // 12)
+        candidates.append(
+            (add_months(start, month), MILESTONE_PRIORITY[kind], kind, value)
+        )
+    upcoming = [candidate for candidate in candidates if candidate[0] > current]
+    if not upcoming:
+        return None
+    day, _, kind, value = min(upcoming)
+    return day, kind, value
+
+
+class AddMonthsTest(unittest.TestCase):
+    def test_clamps_to_month_end(self):
+        self.assertEqual(add_months(date(2023, 1, 31), 1), date(2023, 2, 28))
+        self.assertEqual(add_months(date(2024, 1, 31), 1), date(2024, 2, 29))
+        self.assertEqual(add_months(date(2024, 1, 31), 3), date(2024, 4, 30))
+        self.assertEqual(add_months(date(2024, 2, 29), 12), date(2025, 2, 28))
+        self.assertEqual(add_months(date(2024, 2, 29), 48), date(2028, 2, 29))
+        self.assertEqual(add_months(date(2023, 11, 30), 2), date(2024, 1, 30))
+
+    def test_matches_brute_force(self):
+        rng = random.Random(19)
+        for _ in range(2000):
+            start = _random_date(rng, date(1990, 1, 1), date(2030, 12, 31))
+            months = rng.randint(0, 240)
+            self.assertEqual(
+                add_months(start, months), _brute_add_months(start, months)
+            )
+
+    def test_month_end_starts_never_skip_a_month(self):
+        for start in (date(2024, 1, 31), date(2024, 2, 29), date(2023, 8, 31)):
+            for months in range(1, 49):
+                day = add_months(start, months)
+                self.assertEqual(
+                    (day.year - start.year) * 12 + day.month - start.month, months
+                )
+                self.assertLessEqual(
+                    day.day, calendar.monthrange(day.year, day.month)[1]
+                )
+
+
+class MilestoneIndexTest(unittest.TestCase):
+    def test_count_months_matches_brute_force(self):
+        rng = random.Random(1900)
+        for _ in range(1000):
+            start = _random_date(rng, date(2000, 1, 1), date(2025, 12, 31))
+            current = start + timedelta(days=rng.randint(0, 4000))
+            self.assertEqual(
+                MilestoneIndex(start).count_months(current),
+                _brute_count_months(start, current),
+                (start, current),
+            )
+
+    def test_next_matches_brute_force(self):
+        rng = random.Random(2019)
+        for _ in range(3000):
+            start = _random_date(rng, date(2000, 1, 1), date(2025, 12, 31))
+            # 偏向月底开始日期和开始当天附近，覆盖日期截断和特殊天数
+            if rng.random() < 0.2:
+                start = add_months(start.replace(day=1), 1) - timedelta(days=1)
+            current = start + timedelta(days=rng.choice([0, 1, 6, 7, 99, 364, 365]))
+            if rng.random() < 0.7:
+                current = start + timedelta(days=rng.randint(0, 11000))
+
+            milestone = MilestoneIndex(start).next(current)
+            expected = _brute_next(start, current)
+            self.assertEqual(
+                (milestone.date, milestone.type, milestone.value),
+                expected,
+                (start, current),
+            )
+
+    def test_window_rebuild_matches_fresh_index(self):
+        """同一个索引按日期前进查询多年，窗口重建后的结果与新建索引相同"""
+        start = date(2020, 1, 31)
+        index = MilestoneIndex(start, window_months=3)
+        current = start
+        while current < date(2030, 1, 1):
+            self.assertEqual(index.next(current), MilestoneIndex(start).next(current))
+            current += timedelta(days=5)
+
+    def test_special_day_wins_ties(self):
+        # 2023-01-01 起第365天与一周年是同一天
+        start = date(2023, 1, 1)
+        milestone = MilestoneIndex(start).next(date(2023, 12, 31))
+        self.assertEqual((milestone.type, milestone.value), ("special", 365))
+        self.assertEqual(milestone.date, date(2023, 12, 31) + timedelta(days=1))
+
+    def test_next_anniversary_counts_days_until(self):
+        # 1月31日开始的第一个月纪念日是2月29日，早于第30天（3月1日）
+        result = AnniversaryCalculator.calculate_anniversaries(
+            date(2024, 1, 31), date(2024, 2, 20)
+        )
+        self.assertEqual(result["monthly"]["months"], 0)
+        self.assertEqual(result["next_anniversary"]["type"], "monthly")
+        self.assertEqual(result["next_anniversary"]["days_until"], 9)
+        self.assertEqual(result["monthly"]["next_month_days"], 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
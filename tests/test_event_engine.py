@@ -0,0 +1,157 @@
+"""wechat.event_engine.EventEngine 与逐个事件计算下一次发生日期的结果对比
+
+用法: python -m pytest tests
+"""
+
+import random
+import unittest
+from datetime import date, timedelta
+from typing import List, Set, Tuple
+
+from models.event_models import Event
+from models.recipient_models import Recipient
+from wechat.event_engine import EventEngine
+
+LEAD_DAYS = 3
+
+
+def _random_event(rng: random.Random, index: int) -> Event:
+    event_type = rng.choice(["anniversary", "birthday", "countdown"])
+    if event_type == "countdown":
+        day = date(2024, 1, 1) + timedelta(days=rng.randint(0, 900))
+    elif rng.random() < 0.1:
+        day = date(rng.choice([1996, 2000, 2004]), 2, 29)
+    else:
+        day = date(1990, 1, 1) + timedelta(days=rng.randint(0, 12000))
+    return Event(
+        name=f"事件{index}",
+        date=day,
+        type=event_type,
+        lead_days=rng.choice([None, None, 0, 1, 7]),
+        calendar=(
+            "lunar" if event_type != "countdown" and rng.random() < 0.2 else "solar"
+        ),
+    )
+
+
+def _recipients(seed: int, count: int, events: int) -> List[Recipient]:
+    rng = random.Random(seed)
+    return [
+        Recipient(
+            name=f"接收人{i}",
+            events=tuple(_random_event(rng, j) for j in range(events)),
+        )
+        for i in range(count)
+    ]
+
+
+def _brute_due(
+    recipients: List[Recipient], today: date
+) -> Set[Tuple[str, str, date, int]]:
+    due = set()
+    for recipient in recipients:
+        for event in recipient.events:
+            occurrence = event.occurrence(today)
+            if occurrence is None:
+                continue
+            lead = LEAD_DAYS if event.lead_days is None else event.lead_days
+            days = (occurrence - today).days
+            if days <= lead:
+                due.add((recipient.name, event.name, occurrence, days))
+    return due
+
+
+def _engine_due(engine: EventEngine, today: date) -> Set[Tuple[str, str, date, int]]:
+    occurrences = engine.due(today)
+    # 结果按发生日期排序
+    dates = [occurrence.date for occurrence in occurrences]
+    assert dates == sorted(dates)
+    return {
+        (
+            occurrence.recipient,
+            occurrence.event.name,
+            occurrence.date,
+            occurrence.days_until,
+        )
+        for occurrence in occurrences
+    }
+
+
+class EventEngineTest(unittest.TestCase):
+    def test_daily_matches_brute_force(self):
+        recipients = _recipients(21, 200, 3)
+        engine = EventEngine(LEAD_DAYS)
+        start = date(2024, 1, 1)
+        engine.sync(recipients, start)
+
+        for offset in range(800):
+            today = start + timedelta(days=offset)
+            self.assertEqual(
+                _engine_due(engine, today), _brute_due(recipients, today), today
+            )
+
+    def test_skipped_days_and_timezone_jitter(self):
+        """运行中间跳过几天，且各时区的查询日期在 SKEW_DAYS 天内来回变化"""
+        recipients = _recipients(2021, 200, 3)
+        engine = EventEngine(LEAD_DAYS)
+        rng = random.Random(7)
+        base = date(2024, 1, 1)
+        engine.sync(recipients, base)
+
+        while base < date(2026, 3, 1):
+            for _ in range(3):
+                today = base - timedelta(days=rng.randint(0, EventEngine.SKEW_DAYS))
+                self.assertEqual(
+                    _engine_due(engine, today), _brute_due(recipients, today), today
+                )
+            base += timedelta(days=rng.choice([1, 1, 1, 2, 5]))
+
+    def test_countdown_is_removed_after_it_passes(self):
+        engine = EventEngine(LEAD_DAYS)
+        event = Event(name="旅行", date=date(2024, 3, 10), type="countdown")
+        engine.sync([Recipient(name="小美", events=(event,))], date(2024, 3, 1))
+
+        self.assertEqual(engine.due(date(2024, 3, 6)), [])
+        self.assertEqual(
+            [occurrence.days_until for occurrence in engine.due(date(2024, 3, 7))],
+            [3],
+        )
+        self.assertEqual(
+            engine.due(date(2024, 3, 10))[0].message, "⏳ 就是今天：旅行！"
+        )
+        engine.due(date(2024, 3, 20))
+        self.assertEqual(engine.stats["pending"], 0)
+        self.assertEqual(engine.stats["active"], 0)
+
+    def test_sync_keeps_progress_until_config_changes(self):
+        recipients = _recipients(3, 10, 2)
+        engine = EventEngine(LEAD_DAYS)
+
+        self.assertTrue(engine.sync(recipients, date(2024, 1, 1)))
+        engine.due(date(2024, 6, 1))
+        popped = engine.stats["popped"]
+        self.assertFalse(engine.sync(list(recipients), date(2024, 6, 1)))
+        self.assertEqual(engine.stats["popped"], popped)
+
+        changed = recipients[1:] + [
+            Recipient(name="新接收人", events=recipients[0].events)
+        ]
+        self.assertTrue(engine.sync(changed, date(2024, 6, 1)))
+        self.assertEqual(
+            _engine_due(engine, date(2024, 6, 1)),
+            _brute_due(changed, date(2024, 6, 1)),
+        )
+
+    def test_birthday_message_counts_age(self):
+        engine = EventEngine(LEAD_DAYS)
+        event = Event(name="小美的生日", date=date(2000, 2, 29), type="birthday")
+        engine.sync([Recipient(name="小美", events=(event,))], date(2025, 2, 20))
+
+        occurrences = engine.due_by_recipient(date(2025, 2, 26))["小美"]
+        # 平年的2月29日生日按2月28日计算
+        self.assertEqual(occurrences[0].date, date(2025, 2, 28))
+        self.assertEqual(occurrences[0].message, "🎂 距离小美的生日（25 岁）还有 2 天")
+
+
+if __name__ == "__main__":
+    unittest.main()
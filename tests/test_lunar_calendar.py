@@ -0,0 +1,236 @@
+"""models.lunar_calendar 的查找表、范围边界与加载时的历法校验
+
+用法: python -m pytest tests
+"""
+
+import random
+import unittest
+from datetime import date, timedelta
+
+from models.event_models import Event, check_calendar
+from models.lunar_calendar import (
+    MAX_DATE,
+    MIN_DATE,
+    LunarDate,
+    leap_month,
+    lunar_anniversary,
+    lunar_to_solar,
+    lunar_years_between,
+    month_length,
+    next_lunar_anniversary,
+    solar_to_lunar,
+)
+from models.recipient_models import Recipient
+from wechat.date_calculation import (
+    MILESTONE_PRIORITY,
+    SPECIAL_DAYS,
+    MilestoneIndex,
+    add_months,
+)
+
+
+class LunarTableTest(unittest.TestCase):
+    def test_new_year_dates(self):
+        for day in (
+            date(1900, 1, 31),
+            date(1949, 1, 29),
+            date(2000, 2, 5),
+            date(2020, 1, 25),
+            date(2023, 1, 22),
+            date(2024, 2, 10),
+            date(2025, 1, 29),
+            date(2030, 2, 3),
+        ):
+            self.assertEqual(solar_to_lunar(day), LunarDate(day.year, 1, 1), day)
+
+    def test_leap_months(self):
+        self.assertEqual(leap_month(2020), 4)
+        self.assertEqual(leap_month(2023), 2)
+        self.assertEqual(leap_month(2024), 0)
+        self.assertEqual(leap_month(2025), 6)
+        self.assertEqual(lunar_to_solar(2023, 2, 1, leap=True), date(2023, 3, 22))
+        self.assertEqual(lunar_to_solar(2025, 6, 1, leap=True), date(2025, 7, 25))
+        self.assertEqual(solar_to_lunar(date(2023, 3, 22)), LunarDate(2023, 2, 1, True))
+
+    def test_every_day_round_trips_and_advances(self):
+        """逐日遍历整张表：农历日期逐日递增，月末后进入下一个月，且能转换回原日期"""
+        previous = None
+        day = MIN_DATE
+        while day <= MAX_DATE:
+            lunar = solar_to_lunar(day)
+            self.assertEqual(
+                lunar_to_solar(lunar.year, lunar.month, lunar.day, lunar.leap), day
+            )
+            if previous is not None:
+                if lunar.day == 1:
+                    self.assertEqual(
+                        previous.day,
+                        month_length(previous.year, previous.month, previous.leap),
+                    )
+                else:
+                    self.assertEqual(
+                        (lunar.year, lunar.month, lunar.leap, lunar.day - 1),
+                        (previous.year, previous.month, previous.leap, previous.day),
+                    )
+            previous = lunar
+            day += timedelta(days=1)
+
+    def test_range_edges(self):
+        self.assertEqual(MAX_DATE, date(2101, 1, 28))
+        self.assertEqual(solar_to_lunar(MAX_DATE), LunarDate(2100, 12, 29))
+        with self.assertRaises(ValueError):
+            solar_to_lunar(MIN_DATE - timedelta(days=1))
+        with self.assertRaises(ValueError):
+            solar_to_lunar(MAX_DATE + timedelta(days=1))
+        with self.assertRaises(ValueError):
+            lunar_to_solar(2101, 1, 1)
+        self.assertIsNone(lunar_anniversary(LunarDate(2000, 5, 5), 2101))
+        self.assertIsNone(
+            next_lunar_anniversary(date(2000, 6, 6), MAX_DATE + timedelta(days=1))
+        )
+
+    def test_invalid_lunar_dates(self):
+        with self.assertRaises(ValueError):
+            lunar_to_solar(2024, 1, 30)  # 2024年正月只有29天
+        with self.assertRaises(ValueError):
+            lunar_to_solar(2024, 4, 1, leap=True)  # 2024年没有闰月
+        with self.assertRaises(ValueError):
+            lunar_to_solar(2024, 13, 1)
+
+    def test_missing_thirtieth_uses_month_end(self):
+        # 2023年腊月三十，2024年腊月只有29天，取除夕
+        self.assertEqual(
+            lunar_anniversary(LunarDate(2023, 12, 30), 2024), date(2025, 1, 28)
+        )
+        # 闰月出生的按同名的普通月份过周年
+        self.assertEqual(
+            lunar_anniversary(LunarDate(2023, 2, 10, True), 2024),
+            lunar_to_solar(2024, 2, 10),
+        )
+
+    def test_years_between_matches_brute_force(self):
+        rng = random.Random(22)
+        for _ in range(500):
+            start = date(1950, 1, 1) + timedelta(days=rng.randint(0, 27000))
+            current = start + timedelta(days=rng.randint(0, 20000))
+            if current > MAX_DATE:
+                continue
+            lunar = solar_to_lunar(start)
+            expected = 0
+            while True:
+                day = lunar_anniversary(lunar, lunar.year + expected + 1)
+                if day is None or day > current:
+                    break
+                expected += 1
+            self.assertEqual(lunar_years_between(start, current), expected)
+
+
+class LunarMilestoneTest(unittest.TestCase):
+    def test_next_matches_brute_force(self):
+        """农历周年与公历月纪念日、特殊天数合并后，与逐项枚举取最早的结果相同"""
+        rng = random.Random(2022)
+        for _ in range(1000):
+            start = date(1960, 1, 1) + timedelta(days=rng.randint(0, 24000))
+            current = start + timedelta(days=rng.randint(0, 12000))
+            if current.year > 2095:
+                continue
+            lunar = solar_to_lunar(start)
+            candidates = [
+                (
+                    start + timedelta(days=day),
+                    MILESTONE_PRIORITY["special"],
+                    "special",
+                    day,
+                )
+                for day in SPECIAL_DAYS
+            ]
+            for months in range(1, (current.year - start.year + 2) * 12):
+                candidates.append(
+                    (
+                        add_months(start, months),
+                        MILESTONE_PRIORITY["monthly"],
+                        "monthly",
+                        months,
+                    )
+                )
+            for years in range(1, current.year - start.year + 3):
+                candidates.append(
+                    (
+                        lunar_anniversary(lunar, lunar.year + years),
+                        MILESTONE_PRIORITY["yearly"],
+                        "yearly",
+                        years,
+                    )
+                )
+            expected = min(
+                candidate for candidate in candidates if candidate[0] > current
+            )
+
+            milestone = MilestoneIndex(start, lunar=True).next(current)
+            self.assertEqual(
+                (milestone.date, milestone.type, milestone.value),
+                (expected[0], expected[2], expected[3]),
+                (start, current),
+            )
+
+
+class CalendarValidationTest(unittest.TestCase):
+    def test_check_calendar(self):
+        self.assertEqual(check_calendar("solar", date(1800, 1, 1)), "solar")
+        self.assertEqual(check_calendar("lunar", MIN_DATE), "lunar")
+        self.assertEqual(check_calendar("lunar", MAX_DATE), "lunar")
+        with self.assertRaises(ValueError):
+            check_calendar("Lunar")
+        with self.assertRaises(ValueError):
+            check_calendar("lunar", MIN_DATE - timedelta(days=1))
+        with self.assertRaises(ValueError):
+            check_calendar("lunar", MAX_DATE + timedelta(days=1))
+
+    def test_event_load(self):
+        event = Event.load(
+            {
+                "name": "生日",
+                "date": "1995-03-08",
+                "type": "birthday",
+                "calendar": "lunar",
+            }
+        )
+        self.assertEqual(event.calendar, "lunar")
+        with self.assertRaises(ValueError):
+            Event.load({"name": "生日", "date": "1899-12-31", "calendar": "lunar"})
+        with self.assertRaises(ValueError):
+            Event.load({"name": "生日", "date": "1995-03-08", "calendar": "chinese"})
+
+    def test_recipient_load(self):
+        recipient = Recipient.load(
+            {"name": "小美"},
+            {"anniversary": "2020-05-20", "anniversary_calendar": "lunar"},
+        )
+        self.assertEqual(recipient.anniversary_calendar, "lunar")
+        with self.assertRaises(ValueError):
+            Recipient.load(
+                {
+                    "name": "小美",
+                    "anniversary": "2020-05-20",
+                    "anniversary_calendar": "Lunar",
+                }
+            )
+        with self.assertRaises(ValueError):
+            Recipient.load(
+                {
+                    "name": "小美",
+                    "anniversary": "1890-05-20",
+                    "anniversary_calendar": "lunar",
+                }
+            )
+        # 没有纪念日时只校验历法名称
+        self.assertEqual(
+            Recipient.load(
+                {"name": "小美", "anniversary_calendar": "lunar"}
+            ).anniversary,
+            None,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+"""models.singleton 的并发创建和 cache_clear
+
+用法: python -m pytest tests
+"""
+
+import threading
+import time
+import unittest
+
+from models.singleton import singleton
+
+
+class SingletonTest(unittest.TestCase):
+    def test_concurrent_first_calls_create_once(self):
+        created = []
+
+        @singleton
+        def get_value() -> object:
+            """获取测试对象"""
+            # 放慢创建过程，让其他线程在实例创建完成前进入
+            time.sleep(0.05)
+            created.append(object())
+            return created[-1]
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_value()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(created), 1)
+        self.assertTrue(all(result is created[0] for result in results))
+        self.assertEqual(get_value.__name__, "get_value")
+        self.assertEqual(get_value.__doc__, "获取测试对象")
+
+    def test_cache_clear_recreates(self):
+        get_value = singleton(object)
+        first = get_value()
+
+        self.assertIs(get_value(), first)
+        get_value.cache_clear()
+        self.assertIsNot(get_value(), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
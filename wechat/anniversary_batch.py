@@ -0,0 +1,195 @@
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Sequence, Union
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，未安装时只能使用逐条计算
+    np = None
+
+from wechat.date_calculation import SPECIAL_DAYS, AnniversaryCalculator
+
+# next_type 列的取值
+NEXT_NONE, NEXT_SPECIAL, NEXT_MONTHLY, NEXT_YEARLY = 0, 1, 2, 3
+NEXT_TYPE_NAMES = {
+    NEXT_NONE: "none",
+    NEXT_SPECIAL: "special",
+    NEXT_MONTHLY: "monthly",
+    NEXT_YEARLY: "yearly",
+}
+
+
+def available() -> bool:
+    """是否可以使用批量计算（需要安装 numpy）"""
+    return np is not None
+
+
+def _add_months(start_month: Any, start_day: Any, months: Any) -> Any:
+    """add_months 的向量化版本：目标月份没有这一天时取该月最后一天"""
+    target = start_month + months
+    first_day = target.astype("datetime64[D]")
+    month_length = ((target + 1).astype("datetime64[D]") - first_day).astype(np.int64)
+    return first_day + (np.minimum(start_day, month_length) - 1)
+
+
+@dataclass
+class AnniversaryBatch:
+    """按列存放的批量纪念日计算结果，每列长度等于接收人数"""
+
+    valid: Any  # 开始日期不晚于当前日期
+    total_days: Any
+    weeks: Any
+    remaining_days: Any
+    months: Any
+    next_month_days: Any
+    years: Any
+    next_year_days: Any
+    next_type: Any  # NEXT_* 常量
+    next_value: Any  # 特殊纪念日的天数，其他类型为 0
+    next_days_until: Any
+    love_score: Any
+
+    def __len__(self) -> int:
+        return len(self.total_days)
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """第 index 位接收人的结果，格式与 calculate_anniversaries 相同"""
+        if not self.valid[index]:
+            return {"error": "开始日期不能晚于当前日期"}
+
+        total_days = int(self.total_days[index])
+        weeks = int(self.weeks[index])
+        remaining_days = int(self.remaining_days[index])
+        months = int(self.months[index])
+        years = int(self.years[index])
+        next_type = int(self.next_type[index])
+        days_until = int(self.next_days_until[index])
+
+        if next_type == NEXT_SPECIAL:
+            value = int(self.next_value[index])
+            next_anniversary = {
+                "type": "special",
+                "days_until": days_until,
+                "message": f"距离第 {value} 天纪念日还有 {days_until} 天",
+                "days": value,
+            }
+        elif next_type == NEXT_MONTHLY:
+            next_anniversary = {
+                "type": "monthly",
+                "days_until": days_until,
+                "message": f"距离下个月纪念日还有 {days_until} 天",
+            }
+        else:
+            next_anniversary = {
+                "type": "yearly",
+                "days_until": days_until,
+                "message": f"距离周年纪念日还有 {days_until} 天",
+            }
+
+        return {
+            "total_days": total_days,
+            "daily": {
+                "days": total_days,
+                "weeks": weeks,
+                "remaining_days": remaining_days,
+                "message": f"已经相识 {total_days} 天",
+            },
+            "weekly": {
+                "weeks": weeks,
+                "remaining_days": remaining_days,
+                "message": f"已经相识 {weeks} 周 {remaining_days} 天",
+            },
+            "monthly": {
+                "months": months,
+                "message": f"已经相识 {months} 个月",
+                "next_month_days": int(self.next_month_days[index]),
+            },
+            "yearly": {
+                "years": years,
+                "message": f"已经相识 {years} 年",
+                "next_year_days": int(self.next_year_days[index]),
+            },
+            "special": AnniversaryCalculator._get_special_anniversaries(total_days),
+            "next_anniversary": next_anniversary,
+            "love_score": int(self.love_score[index]),
+        }
+
+
+def calculate_anniversaries_batch(
+    start_dates: Union[Sequence[Union[date, datetime]], Any],
+    current_date: Union[date, datetime, None] = None,
+) -> AnniversaryBatch:
+    """批量计算纪念日
+
+    start_dates 可以是 date/datetime 列表或 numpy datetime64 数组，
+    所有计算都是整列的向量化运算，结果与逐条调用 calculate_anniversaries 一致。
+    """
+    if np is None:
+        raise RuntimeError("批量计算纪念日需要安装 numpy")
+    if current_date is None:
+        current_date = datetime.now()
+    if isinstance(current_date, datetime):
+        current_date = current_date.date()
+
+    start = np.asarray(start_dates, dtype="datetime64[D]")
+    current = np.datetime64(current_date, "D")
+
+    total_days = (current - start).astype(np.int64)
+    valid = total_days >= 0
+
+    # 月/年：按日历月精确计算
+    start_month = start.astype("datetime64[M]")
+    start_day = (start - start_month.astype("datetime64[D]")).astype(np.int64) + 1
+    months = (np.datetime64(current_date, "M") - start_month).astype(np.int64)
+    months -= _add_months(start_month, start_day, months) > current
+    months = np.maximum(months, 0)
+    next_month_date = _add_months(start_month, start_day, months + 1)
+    next_month_days = (next_month_date - current).astype(np.int64)
+
+    years = months // 12
+    next_year_date = _add_months(start_month, start_day, years * 12)
+    next_year_date = np.where(
+        next_year_date < current,
+        _add_months(start_month, start_day, (years + 1) * 12),
+        next_year_date,
+    )
+    next_year_days = (next_year_date - current).astype(np.int64)
+
+    # 下一个纪念日：特殊天数与下一个月/周年纪念日中较近者，同一天时特殊天数优先
+    special_days = np.asarray(SPECIAL_DAYS, dtype=np.int64)
+    position = np.searchsorted(special_days, total_days, side="right")
+    has_special = position < len(special_days)
+    special_value = special_days[np.minimum(position, len(special_days) - 1)]
+    special_until = np.where(
+        has_special, special_value - total_days, np.iinfo(np.int64).max
+    )
+    use_special = special_until <= next_month_days
+
+    next_type = np.where(
+        use_special,
+        NEXT_SPECIAL,
+        np.where((months + 1) % 12 == 0, NEXT_YEARLY, NEXT_MONTHLY),
+    )
+    next_value = np.where(use_special, special_value, 0)
+    next_days_until = np.where(use_special, special_until, next_month_days)
+
+    # 爱情分数
+    love_score = np.minimum(
+        100,
+        np.minimum(100, total_days // 10) + np.minimum(50, total_days // 100 * 10),
+    )
+
+    return AnniversaryBatch(
+        valid=valid,
+        total_days=total_days,
+        weeks=total_days // 7,
+        remaining_days=total_days % 7,
+        months=months,
+        next_month_days=np.maximum(next_month_days, 0),
+        years=years,
+        next_year_days=next_year_days,
+        next_type=next_type,
+        next_value=next_value,
+        next_days_until=next_days_until,
+        love_score=love_score,
+    )
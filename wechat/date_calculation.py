@@ -1,8 +1,28 @@
+import bisect
+import calendar
+import functools
 import logging
-import random
-from datetime import datetime, timedelta
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
 from enum import Enum
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from models.lunar_calendar import (
+    lunar_anniversary,
+    lunar_years_between,
+    next_lunar_anniversary,
+    solar_to_lunar,
+)
+from models.sampling import AliasTable, Sampler, pick
+from models.singleton import singleton
+from settings.settings import settings
+from wechat.render_context import (
+    RenderCache,
+    RenderContext,
+    section_rng,
+    section_sampler,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -16,15 +36,177 @@ class AnniversaryStyle(Enum):
     MILESTONE = "milestone"  # 里程碑风格
 
 
+# 特殊纪念日（天数）
+SPECIAL_DAYS = [7, 14, 30, 100, 365, 500, 730, 1000, 1825, 3650, 10000]
+# 特殊纪念日名称
+SPECIAL_NAMES = {
+    7: "一周",
+    14: "两周",
+    30: "一个月",
+    100: "百日",
+    365: "一周年",
+    500: "五百天",
+    730: "两周年",
+    1000: "千日",
+    1825: "五周年",
+    3650: "十周年",
+    10000: "万日",
+}
+# 同一天有多个纪念日时的优先级
+MILESTONE_PRIORITY = {"special": 0, "yearly": 1, "monthly": 2}
+
+
+def add_months(start: date, months: int) -> date:
+    """按日历加月份，目标月份没有这一天时取该月最后一天（如 1月31日、2月29日）"""
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def _as_date(value: Union[date, datetime]) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+@dataclass(frozen=True)
+class Milestone:
+    """单个纪念日"""
+
+    date: date
+    type: str  # special / monthly / yearly
+    value: int  # 天数、月数或年数
+    name: str = ""  # 农历周年纪念日为 "农历"
+
+    def message(self, days_until: int) -> str:
+        if self.type == "special":
+            return f"距离第 {self.value} 天纪念日还有 {days_until} 天"
+        if self.type == "monthly":
+            return f"距离下个月纪念日还有 {days_until} 天"
+        return f"距离{self.name}周年纪念日还有 {days_until} 天"
+
+
+class MilestoneIndex:
+    """某个开始日期的纪念日索引
+
+    按日历精确计算的月纪念日、周年纪念日和特殊天数
+    合并为一个按日期排序的数组，用二分查找定位下一个纪念日。
+    月/周年纪念日只展开查询日期附近 window_months 个月，
+    查询日期超出范围时才重新构建，同一天的大量查询只需一次二分查找。
+    lunar 为 True 时周年纪念日按农历同月同日计算，月纪念日仍按公历。
+    """
+
+    def __init__(
+        self,
+        start_date: Union[date, datetime],
+        window_months: int = 24,
+        lunar: bool = False,
+    ):
+        self.start = _as_date(start_date)
+        self.lunar = lunar
+        self._window_months = window_months
+        # (日期序数, 优先级, 类型, 数值, 名称)
+        self._fixed = [
+            (
+                (self.start + timedelta(days=day)).toordinal(),
+                MILESTONE_PRIORITY["special"],
+                "special",
+                day,
+                "",
+            )
+            for day in SPECIAL_DAYS
+        ]
+        # (覆盖范围起点序数, 终点序数, 排序后的纪念日, 对应的日期序数)
+        self._window: Tuple[int, int, List[tuple], List[int]] = (0, -1, [], [])
+
+    def _build(self, current: date) -> Tuple[int, int, List[tuple], List[int]]:
+        """展开 current 所在月份起 window_months 个月内的纪念日"""
+        first = max(0, self.count_months(current))
+        last = first + self._window_months
+        entries = list(self._fixed)
+        for months in range(first + 1, last + 1):
+            kind, value = (
+                ("monthly", months)
+                if months % 12 or self.lunar
+                else ("yearly", months // 12)
+            )
+            entries.append(
+                (
+                    add_months(self.start, months).toordinal(),
+                    MILESTONE_PRIORITY[kind],
+                    kind,
+                    value,
+                    "",
+                )
+            )
+        # 只有起止范围内的查询结果是完整的
+        low = add_months(self.start, first).toordinal()
+        high = add_months(self.start, last).toordinal()
+        if self.lunar:
+            entries.extend(self._lunar_yearly(low, high))
+        entries.sort()
+        window = (low, high, entries, [entry[0] for entry in entries])
+        self._window = window
+        return window
+
+    def _lunar_yearly(self, low: int, high: int) -> List[tuple]:
+        """日期序数 low 之后到 high 为止的农历周年纪念日"""
+        lunar = solar_to_lunar(self.start)
+        entries = []
+        year = max(lunar.year + 1, solar_to_lunar(date.fromordinal(low)).year)
+        while True:
+            day = lunar_anniversary(lunar, year)
+            if day is None or day.toordinal() > high:
+                return entries
+            entries.append(
+                (
+                    day.toordinal(),
+                    MILESTONE_PRIORITY["yearly"],
+                    "yearly",
+                    year - lunar.year,
+                    "农历",
+                )
+            )
+            year += 1
+
+    def next(self, current_date: Union[date, datetime]) -> Optional[Milestone]:
+        """严格晚于 current_date 的第一个纪念日"""
+        current = _as_date(current_date)
+        ordinal = current.toordinal()
+        low, high, entries, ordinals = self._window
+        if not low <= ordinal < high:
+            low, high, entries, ordinals = self._build(current)
+
+        position = bisect.bisect_right(ordinals, ordinal)
+        if position == len(entries):
+            return None
+        day, _, kind, value, name = entries[position]
+        return Milestone(date.fromordinal(day), kind, value, name)
+
+    def count_months(self, current_date: Union[date, datetime]) -> int:
+        """到 current_date 为止已满的月数"""
+        current = _as_date(current_date)
+        months = (current.year - self.start.year) * 12 + (
+            current.month - self.start.month
+        )
+        if add_months(self.start, months) > current:
+            months -= 1
+        return months
+
+
+@functools.lru_cache(maxsize=65536)
+def milestone_index(start_date: date, lunar: bool = False) -> MilestoneIndex:
+    """获取开始日期对应的纪念日索引（按开始日期缓存）"""
+    return MilestoneIndex(start_date, lunar=lunar)
+
+
 class AnniversaryCalculator:
     """纪念日计算器"""
 
     @staticmethod
     def calculate_anniversaries(
-        start_date: datetime, current_date: datetime = None
+        start_date: datetime, current_date: datetime = None, lunar: bool = False
     ) -> Dict[str, Dict]:
         """
-        计算各种纪念日
+        计算各种纪念日，lunar 为 True 时周年按农历计算
         """
         if current_date is None:
             current_date = datetime.now()
@@ -33,17 +215,16 @@ class AnniversaryCalculator:
         if total_days < 0:
             return {"error": "开始日期不能晚于当前日期"}
 
+        index = milestone_index(_as_date(start_date), lunar)
         return {
             "total_days": total_days,
             "daily": AnniversaryCalculator._get_daily_info(total_days),
             "weekly": AnniversaryCalculator._get_weekly_info(total_days),
-            "monthly": AnniversaryCalculator._get_monthly_info(
-                start_date, current_date
-            ),
-            "yearly": AnniversaryCalculator._get_yearly_info(start_date, current_date),
+            "monthly": AnniversaryCalculator._get_monthly_info(index, current_date),
+            "yearly": AnniversaryCalculator._get_yearly_info(index, current_date),
             "special": AnniversaryCalculator._get_special_anniversaries(total_days),
             "next_anniversary": AnniversaryCalculator._get_next_anniversary(
-                start_date, current_date
+                index, current_date
             ),
             "love_score": AnniversaryCalculator._calculate_love_score(total_days),
         }
@@ -78,20 +259,14 @@ class AnniversaryCalculator:
         }
 
     @staticmethod
-    def _get_monthly_info(start_date: datetime, current_date: datetime) -> Dict:
+    def _get_monthly_info(index: MilestoneIndex, current_date: datetime) -> Dict:
         """获取每月信息"""
-        # 计算完整的月数
-        months = (current_date.year - start_date.year) * 12 + (
-            current_date.month - start_date.month
-        )
-
-        # 调整如果当前日小于开始日
-        if current_date.day < start_date.day:
-            months -= 1
+        # 计算完整的月数（按日历月，月底日期自动顺延到当月最后一天）
+        months = index.count_months(current_date)
 
         # 计算下一个整月纪念日
-        next_month_date = start_date + timedelta(days=30 * (months + 1))
-        days_until_next_month = (next_month_date - current_date).days
+        next_month_date = add_months(index.start, months + 1)
+        days_until_next_month = (next_month_date - _as_date(current_date)).days
 
         return {
             "months": months,
@@ -100,36 +275,38 @@ class AnniversaryCalculator:
         }
 
     @staticmethod
-    def _get_yearly_info(start_date: datetime, current_date: datetime) -> Dict:
+    def _get_yearly_info(index: MilestoneIndex, current_date: datetime) -> Dict:
         """获取每年信息"""
-        years = current_date.year - start_date.year
-
-        # 调整如果还没到周年日
-        if (current_date.month, current_date.day) < (start_date.month, start_date.day):
-            years -= 1
+        today = _as_date(current_date)
+        if index.lunar:
+            years = lunar_years_between(index.start, today)
+            upcoming = next_lunar_anniversary(index.start, today)
+            return {
+                "years": years,
+                "message": f"已经相识 {years} 年（农历）",
+                "next_year_days": (
+                    (upcoming[1] - today).days if upcoming is not None else 0
+                ),
+            }
 
-        # 计算下一个周年日
-        next_year_date = datetime(current_date.year, start_date.month, start_date.day)
-        if next_year_date < current_date:
-            next_year_date = datetime(
-                current_date.year + 1, start_date.month, start_date.day
-            )
+        years = index.count_months(current_date) // 12
 
-        days_until_next_year = (next_year_date - current_date).days
+        # 计算下一个周年日（当天即为周年日时距离为0）
+        next_year_date = add_months(index.start, years * 12)
+        if next_year_date < today:
+            next_year_date = add_months(index.start, (years + 1) * 12)
 
         return {
             "years": years,
             "message": f"已经相识 {years} 年",
-            "next_year_days": max(0, days_until_next_year),
+            "next_year_days": (next_year_date - today).days,
         }
 
     @staticmethod
     def _get_special_anniversaries(total_days: int) -> List[Dict]:
         """获取特殊纪念日"""
-        special_days = [7, 14, 30, 100, 365, 500, 730, 1000, 1825, 3650, 10000]
-
         anniversaries = []
-        for day in special_days:
+        for day in SPECIAL_DAYS:
             if total_days >= day:
                 anniversaries.append(
                     {
@@ -153,104 +330,121 @@ class AnniversaryCalculator:
     @staticmethod
     def _format_special_day(days: int) -> str:
         """格式化特殊纪念日名称"""
-        special_names = {
-            7: "一周",
-            14: "两周",
-            30: "一个月",
-            100: "百日",
-            365: "一周年",
-            500: "五百天",
-            730: "两周年",
-            1000: "千日",
-            1825: "五周年",
-            3650: "十周年",
-            10000: "万日",
-        }
-        return special_names.get(days, f"{days}天")
+        return SPECIAL_NAMES.get(days, f"{days}天")
 
     @staticmethod
-    def _get_next_anniversary(start_date: datetime, current_date: datetime) -> Dict:
-        """获取下一个重要纪念日"""
-        total_days = (current_date - start_date).days
+    def _get_next_anniversary(index: MilestoneIndex, current_date: datetime) -> Dict:
+        """获取下一个重要纪念日（特殊天数、月纪念日、周年纪念日中最近的一个）"""
+        milestone = index.next(current_date)
+        if milestone is None:
+            return {"type": "none", "days_until": 0, "message": "已经走过了所有纪念日"}
+
+        days_until = (milestone.date - _as_date(current_date)).days
+        result = {
+            "type": milestone.type,
+            "days_until": days_until,
+            "message": milestone.message(days_until),
+        }
+        if milestone.type == "special":
+            result["days"] = milestone.value
+        return result
 
-        # 检查特殊纪念日
-        special_days = [7, 14, 30, 100, 365, 500, 730, 1000, 1825, 3650, 10000]
-        for day in special_days:
-            if day > total_days:
-                return {
-                    "type": "special",
-                    "days": day,
-                    "days_until": day - total_days,
-                    "message": f"距离第 {day} 天纪念日还有 {day - total_days} 天",
-                }
-
-        # 检查月纪念日
-        next_month_date = start_date + timedelta(days=30 * (total_days // 30 + 1))
-        days_until_month = (next_month_date - current_date).days
-
-        # 检查年纪念日
-        next_year_date = datetime(current_date.year, start_date.month, start_date.day)
-        if next_year_date < current_date:
-            next_year_date = datetime(
-                current_date.year + 1, start_date.month, start_date.day
-            )
-        days_until_year = (next_year_date - current_date).days
 
-        if days_until_month < days_until_year:
-            return {
-                "type": "monthly",
-                "days_until": days_until_month,
-                "message": f"距离下个月纪念日还有 {days_until_month} 天",
-            }
-        else:
-            return {
-                "type": "yearly",
-                "days_until": days_until_year,
-                "message": f"距离周年纪念日还有 {days_until_year} 天",
-            }
+class AnniversaryCache:
+    """纪念日数据缓存
+
+    相同开始日期的接收人在同一天得到完全相同的纪念日数据，
+    按 (开始日期, 当前日期, 是否农历) 缓存 calculate_anniversaries 的结果，
+    各风格的格式化函数只读取缓存的数据；日期前进时整体清空。
+    不同时区的接收人可能交替查询相邻的两天，查询较早的日期时不清空。
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self._cache = RenderCache(max_entries)
+        self._lock = threading.Lock()
+        self._day: Optional[date] = None
+
+    def get(
+        self,
+        start_date: datetime,
+        current_date: Union[date, datetime],
+        lunar: bool = False,
+    ) -> Dict[str, Dict]:
+        """获取纪念日数据，未命中时计算并缓存（返回的字典不可修改）"""
+        day = _as_date(current_date)
+        with self._lock:
+            if self._day is None or day > self._day:
+                self._cache.clear()
+                self._day = day
+        return self._cache.get_or_render(
+            (start_date, day, lunar),
+            lambda: AnniversaryCalculator.calculate_anniversaries(
+                start_date, current_date, lunar
+            ),
+        )
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        return {"day": str(self._day), **self._cache.stats}
+
+
+@singleton
+def get_anniversary_cache() -> AnniversaryCache:
+    """获取进程级的纪念日数据缓存"""
+    return AnniversaryCache(settings.ANNIVERSARY_CACHE_SIZE)
 
 
 class AnniversaryMessageGenerator:
     """纪念日消息生成器"""
 
+    # 样式权重
+    STYLE_WEIGHTS: Dict[AnniversaryStyle, int] = {
+        AnniversaryStyle.DETAILED: 20,
+        AnniversaryStyle.ROMANTIC: 20,
+        AnniversaryStyle.CUTE: 20,
+        AnniversaryStyle.POETIC: 20,
+        AnniversaryStyle.FUNNY: 20,
+        AnniversaryStyle.MILESTONE: 20,
+    }
+    # 按权重抽样的别名表，只构建一次
+    STYLE_TABLE = AliasTable(list(STYLE_WEIGHTS), list(STYLE_WEIGHTS.values()))
+
     @staticmethod
     def _get_style_weights() -> Dict[AnniversaryStyle, int]:
         """根据天数获取样式权重"""
-        weights = {
-            AnniversaryStyle.DETAILED: 20,
-            AnniversaryStyle.ROMANTIC: 20,
-            AnniversaryStyle.CUTE: 20,
-            AnniversaryStyle.POETIC: 20,
-            AnniversaryStyle.FUNNY: 20,
-            AnniversaryStyle.MILESTONE: 20,
-        }
-
-        return weights
+        return AnniversaryMessageGenerator.STYLE_WEIGHTS
 
     @staticmethod
     def generate_anniversary_message(
         start_date: datetime,
         current_date: datetime = None,
         style: Optional[AnniversaryStyle] = None,
+        context: Optional[RenderContext] = None,
+        anniversaries: Optional[Dict[str, Dict]] = None,
+        lunar: bool = False,
     ) -> str:
         """
         生成纪念日消息，可指定样式或随机选择
+
+        指定 context 时随机选择由 (接收人, 日期) 确定，相同输入得到相同消息；
+        anniversaries 为批量预先计算好的纪念日数据，未指定时从纪念日数据缓存获取；
+        lunar 为 True 时周年纪念日按农历计算
         """
         if current_date is None:
             current_date = datetime.now()
+        sampler = section_sampler(context, "anniversary")
 
-        anniversaries = AnniversaryCalculator.calculate_anniversaries(
-            start_date, current_date
-        )
+        if anniversaries is None:
+            anniversaries = get_anniversary_cache().get(start_date, current_date, lunar)
         if "error" in anniversaries:
             return anniversaries["error"]
 
         # 随机选择样式
         if style is None:
-            weights = AnniversaryMessageGenerator._get_style_weights()
-            styles = list(weights.keys())
-            weight_values = [weights[s] for s in styles]
-            style = random.choices(styles, weights=weight_values, k=1)[0]
+            style = AnniversaryMessageGenerator.STYLE_TABLE.sample(
+                section_rng(context, "anniversary_style")
+            )
 
         # 根据样式生成消息
         if style == AnniversaryStyle.DETAILED:
@@ -259,7 +453,7 @@ class AnniversaryMessageGenerator:
             )
         elif style == AnniversaryStyle.ROMANTIC:
             return AnniversaryMessageGenerator._romantic_style(
-                start_date, current_date, anniversaries
+                start_date, current_date, anniversaries, sampler
             )
         elif style == AnniversaryStyle.CUTE:
             return AnniversaryMessageGenerator._cute_style(
@@ -267,7 +461,7 @@ class AnniversaryMessageGenerator:
             )
         elif style == AnniversaryStyle.POETIC:
             return AnniversaryMessageGenerator._poetic_style(
-                start_date, current_date, anniversaries
+                start_date, current_date, anniversaries, sampler
             )
         elif style == AnniversaryStyle.FUNNY:
             return AnniversaryMessageGenerator._funny_style(start_date, anniversaries)
@@ -306,7 +500,10 @@ class AnniversaryMessageGenerator:
 
     @staticmethod
     def _romantic_style(
-        start_date: datetime, current_date: datetime, anniversaries: Dict
+        start_date: datetime,
+        current_date: datetime,
+        anniversaries: Dict,
+        sampler: Optional[Sampler] = None,
     ) -> str:
         """浪漫抒情风格"""
         days = anniversaries["total_days"]
@@ -321,7 +518,7 @@ class AnniversaryMessageGenerator:
             f"也就是 {days // 365} 年 {(days % 365) // 30} 个月的甜蜜",
             "",
             "💝 我们的爱情就像:",
-            f"   {AnniversaryMessageGenerator._get_romantic_analogy()}",
+            f"   {AnniversaryMessageGenerator._get_romantic_analogy(sampler)}",
             "",
             "🌈 每一天都因为有你而更加美好",
             "✨ 期待我们的每一个明天",
@@ -354,7 +551,10 @@ class AnniversaryMessageGenerator:
 
     @staticmethod
     def _poetic_style(
-        start_date: datetime, current_date: datetime, anniversaries: Dict
+        start_date: datetime,
+        current_date: datetime,
+        anniversaries: Dict,
+        sampler: Optional[Sampler] = None,
     ) -> str:
         """诗意文学风格"""
         days = anniversaries["total_days"]
@@ -369,7 +569,7 @@ class AnniversaryMessageGenerator:
             f"🎋 {days // 365} 度春夏秋冬",
             "",
             "💞 情如:",
-            f"   {AnniversaryMessageGenerator._get_poetic_metaphor()}",
+            f"   {AnniversaryMessageGenerator._get_poetic_metaphor(sampler)}",
             "",
             "🎑 愿时光静好，与君语",
             "🌌 愿细水流年，与君同",
@@ -424,7 +624,7 @@ class AnniversaryMessageGenerator:
         return "\n".join(messages)
 
     @staticmethod
-    def _get_romantic_analogy() -> str:
+    def _get_romantic_analogy(sampler: Optional[Sampler] = None) -> str:
         """获取浪漫比喻"""
         analogies = [
             "初生的朝阳，充满希望和温暖",
@@ -435,10 +635,10 @@ class AnniversaryMessageGenerator:
             "深海的珍珠，珍贵而难得",
             "山间的清泉，纯净而甘甜",
         ]
-        return random.choice(analogies)
+        return pick(sampler, "romantic_analogy", analogies)
 
     @staticmethod
-    def _get_poetic_metaphor() -> str:
+    def _get_poetic_metaphor(sampler: Optional[Sampler] = None) -> str:
         """获取诗意比喻"""
         metaphors = [
             "长河流水，绵延不绝",
@@ -449,4 +649,4 @@ class AnniversaryMessageGenerator:
             "云卷云舒，不离不弃",
             "星辰大海，共赴前程",
         ]
-        return random.choice(metaphors)
+        return pick(sampler, "poetic_metaphor", metaphors)
@@ -1,21 +1,41 @@
+import asyncio
+import json
 import logging
+import random
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
 
-from openai import OpenAI
+import httpx
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    DefaultHttpxClient,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+)
 
+from models.singleton import singleton
 from settings.settings import settings
+from wechat.fetch import remaining
 
 logger = logging.getLogger(__name__)
 
+# 可重试的异常
+RETRYABLE_ERRORS = (
+    APIConnectionError,
+    APITimeoutError,
+    RateLimitError,
+    InternalServerError,
+)
 
-def get_suggestion(message):
-    client = OpenAI(
-        api_key=settings.DEEPSEEK_API_KEY,
-        base_url="https://api.deepseek.com",
-    )
-
-    romantic_master_prompt = """
+romantic_master_prompt = """
     你是一位充满诗意的浪漫主义爱情大师，具有以下特质：
-    
+
     1. **语言风格**：优雅、温柔、深情，充满诗意的比喻和意象
     2. **情感表达**：善于用细腻的文字触动人心，表达深刻的情感
     3. **浪漫元素**：擅长运用月亮、星辰、花朵、微风等自然意象
@@ -27,17 +47,397 @@ def get_suggestion(message):
        - 用温柔的方式给予情感建议
        - 总是传递积极向上的爱情观
        - 擅长用比喻让抽象的情感变得具体可感
-    
+
     请用你最浪漫的方式回应用户，不超过30字，让每个回答都像一首情诗般动人。
     """
 
-    response = client.chat.completions.create(
-        model="deepseek-chat",
-        messages=[
-            {"role": "system", "content": romantic_master_prompt},
-            {"role": "user", "content": f"{message}，给出健康、出行、穿衣等建议"},
+batch_prompt = """
+    用户会发送一个JSON数组，每个元素包含 id 和 weather 两个字段。
+    请针对每个元素的天气分别给出健康、出行、穿衣等建议，并且只输出如下格式的JSON：
+    {"suggestions": [{"id": 0, "suggestion": "建议内容"}]}
+    每个 id 都必须出现且只出现一次。
+    """
+
+
+class SuggestionStats:
+    """大模型调用统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.batch_fallbacks = 0
+        self.local_fallbacks = 0
+        self.streams = 0
+        self.ttft_total = 0.0
+        self.ttft_max = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record(self, latency: float, usage: Any = None, retries: int = 0) -> None:
+        with self._lock:
+            self.calls += 1
+            self.retries += retries
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            if usage is not None:
+                self.prompt_tokens += usage.prompt_tokens or 0
+                self.completion_tokens += usage.completion_tokens or 0
+
+    def record_failure(self, retries: int = 0) -> None:
+        with self._lock:
+            self.failures += 1
+            self.retries += retries
+
+    def record_batch_fallback(self, count: int) -> None:
+        with self._lock:
+            self.batch_fallbacks += count
+
+    def record_local_fallback(self) -> None:
+        with self._lock:
+            self.local_fallbacks += 1
+
+    def record_first_token(self, ttft: float) -> None:
+        with self._lock:
+            self.streams += 1
+            self.ttft_total += ttft
+            self.ttft_max = max(self.ttft_max, ttft)
+
+    @property
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "failures": self.failures,
+                "retries": self.retries,
+                "batch_fallbacks": self.batch_fallbacks,
+                "local_fallbacks": self.local_fallbacks,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "latency_avg": self.latency_total / self.calls if self.calls else 0,
+                "latency_max": self.latency_max,
+                "ttft_avg": self.ttft_total / self.streams if self.streams else 0,
+                "ttft_max": self.ttft_max,
+            }
+
+
+stats = SuggestionStats()
+
+# 异步客户端的连接池绑定在事件循环上，每个事件循环一个
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        settings.DEEPSEEK_TIMEOUT, connect=settings.DEEPSEEK_CONNECT_TIMEOUT
+    )
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.DEEPSEEK_POOL_SIZE,
+        max_keepalive_connections=settings.DEEPSEEK_POOL_SIZE,
+    )
+
+
+@singleton
+def get_client() -> OpenAI:
+    """获取进程级共享的 DeepSeek 客户端（复用连接池）"""
+    return OpenAI(
+        api_key=settings.DEEPSEEK_API_KEY,
+        base_url=settings.DEEPSEEK_BASE_URL,
+        timeout=_timeout(),
+        # 重试由 _backoff 统一处理，便于统计
+        max_retries=0,
+        http_client=DefaultHttpxClient(limits=_limits()),
+    )
+
+
+def get_async_client() -> AsyncOpenAI:
+    """获取当前事件循环共享的异步 DeepSeek 客户端"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=settings.DEEPSEEK_API_KEY,
+            base_url=settings.DEEPSEEK_BASE_URL,
+            timeout=_timeout(),
+            max_retries=0,
+            http_client=DefaultAsyncHttpxClient(limits=_limits()),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def _backoff(attempt: int) -> float:
+    """指数退避并加入随机抖动"""
+    return min(10.0, 0.5 * 2**attempt) * random.uniform(0.5, 1.0)
+
+
+def _build_messages(message: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": romantic_master_prompt},
+        {"role": "user", "content": f"{message}，给出健康、出行、穿衣等建议"},
+    ]
+
+
+def _format_suggestion(content: str) -> str:
+    return f"✨ 温馨提示：\n{content}"
+
+
+def _create_completion(
+    messages: List[Dict[str, str]], deadline: Optional[float] = None, **kwargs
+) -> Any:
+    """带重试和统计的同步请求
+
+    deadline 为截止时间（time.monotonic），每次尝试前按剩余时间重新计算超时，
+    已到截止时间时抛出 TimeoutError，退避等待会超过截止时间时不再重试。
+    """
+    client = get_client()
+
+    for attempt in range(settings.DEEPSEEK_MAX_RETRIES + 1):
+        if deadline is not None:
+            kwargs["timeout"] = min(settings.DEEPSEEK_TIMEOUT, remaining(deadline))
+        started = time.perf_counter()
+        try:
+            response = client.chat.completions.create(
+                model=settings.DEEPSEEK_MODEL,
+                messages=messages,
+                stream=False,
+                **kwargs,
+            )
+        except RETRYABLE_ERRORS as e:
+            if attempt >= settings.DEEPSEEK_MAX_RETRIES:
+                stats.record_failure(retries=attempt)
+                raise
+            backoff = _backoff(attempt)
+            if deadline is not None and time.monotonic() + backoff >= deadline:
+                stats.record_failure(retries=attempt)
+                logger.info(f"DeepSeek 请求失败，重试会超过截止时间: {e}")
+                raise
+            logger.info(f"DeepSeek 请求失败，准备第 {attempt + 1} 次重试: {e}")
+            time.sleep(backoff)
+        except Exception:
+            stats.record_failure(retries=attempt)
+            raise
+        else:
+            stats.record(time.perf_counter() - started, response.usage, attempt)
+            return response
+
+
+def _total_tokens(response: Any) -> int:
+    return response.usage.total_tokens if response.usage else 0
+
+
+def request_suggestion(
+    message: str, deadline: Optional[float] = None
+) -> Tuple[str, int]:
+    """请求大模型建议，返回建议内容和本次消耗的token数
+
+    包括重试在内不超过截止时间 deadline（time.monotonic）。
+    """
+    response = _create_completion(_build_messages(message), deadline)
+    content = response.choices[0].message.content
+    return _format_suggestion(content), _total_tokens(response)
+
+
+def get_suggestion(message):
+    return request_suggestion(message)[0]
+
+
+def stream_suggestion(message: str, budget: float) -> Tuple[str, int]:
+    """流式请求大模型建议，总耗时超过 budget 秒时中止并抛出 TimeoutError"""
+    started = time.perf_counter()
+    stream = None
+    timer = None
+    parts: List[str] = []
+    usage = None
+    first_token_at = None
+    try:
+        stream = get_client().chat.completions.create(
+            model=settings.DEEPSEEK_MODEL,
+            messages=_build_messages(message),
+            stream=True,
+            stream_options={"include_usage": True},
+            timeout=budget,
+        )
+        # 到期后关闭连接，打断阻塞中的读取
+        timer = threading.Timer(budget - (time.perf_counter() - started), stream.close)
+        timer.daemon = True
+        timer.start()
+
+        for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    stats.record_first_token(first_token_at - started)
+                parts.append(chunk.choices[0].delta.content)
+            if time.perf_counter() - started >= budget:
+                break
+    except Exception as e:
+        stats.record_failure()
+        if time.perf_counter() - started >= budget:
+            raise TimeoutError(f"DeepSeek 响应超过 {budget:g} 秒") from e
+        raise
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if stream is not None:
+            stream.close()
+
+    if time.perf_counter() - started >= budget:
+        stats.record_failure()
+        raise TimeoutError(f"DeepSeek 响应超过 {budget:g} 秒")
+
+    stats.record(time.perf_counter() - started, usage)
+    return _format_suggestion("".join(parts)), usage.total_tokens if usage else 0
+
+
+def _parse_batch(content: str, size: int) -> Dict[int, str]:
+    """解析批量请求返回的JSON，丢弃不合法的条目"""
+    try:
+        data = json.loads(content)
+    except (TypeError, json.JSONDecodeError):
+        return {}
+    items = data.get("suggestions") if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return {}
+
+    parsed = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        index, suggestion = item.get("id"), item.get("suggestion")
+        if (
+            isinstance(index, int)
+            and 0 <= index < size
+            and isinstance(suggestion, str)
+            and suggestion.strip()
+        ):
+            parsed[index] = suggestion.strip()
+    return parsed
+
+
+def request_suggestions_batch(
+    messages: List[str], deadline: Optional[float] = None
+) -> Tuple[Dict[int, str], int]:
+    """一次请求为多条天气消息生成建议
+
+    返回 {序号: 建议} 以及本次消耗的token数，解析失败的条目不在结果中；
+    包括重试在内不超过截止时间 deadline（time.monotonic）。
+    """
+    payload = [
+        {"id": index, "weather": message} for index, message in enumerate(messages)
+    ]
+    response = _create_completion(
+        [
+            {"role": "system", "content": romantic_master_prompt + batch_prompt},
+            {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
         ],
-        stream=False,
+        deadline,
+        response_format={"type": "json_object"},
     )
+    parsed = _parse_batch(response.choices[0].message.content, len(messages))
+    return {
+        index: _format_suggestion(suggestion) for index, suggestion in parsed.items()
+    }, _total_tokens(response)
+
+
+def request_suggestions(
+    messages: List[str],
+    batch_size: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> List[Optional[Tuple[str, int]]]:
+    """批量生成建议，返回与 messages 一一对应的 (建议, token数)
+
+    每 batch_size 条合并为一次请求，批量结果缺失或解析失败的条目逐条补请求；
+    逐条请求失败或超过截止时间 deadline（time.monotonic）的条目为None，
+    由调用方使用本地建议。
+    """
+    batch_size = batch_size or settings.SUGGESTION_BATCH_SIZE
+    results: List[Optional[Tuple[str, int]]] = [None] * len(messages)
+
+    if batch_size > 1:
+        for start in range(0, len(messages), batch_size):
+            chunk = messages[start : start + batch_size]
+            try:
+                parsed, tokens = request_suggestions_batch(chunk, deadline)
+            except Exception as e:
+                logger.info(f"DeepSeek 批量请求失败，改为逐条请求: {e}")
+                continue
+            for index, suggestion in parsed.items():
+                results[start + index] = (suggestion, tokens // len(chunk))
+
+    missing = [index for index, result in enumerate(results) if result is None]
+    if batch_size > 1 and missing:
+        stats.record_batch_fallback(len(missing))
+    for index in missing:
+        try:
+            results[index] = request_suggestion(messages[index], deadline)
+        except TimeoutError as e:
+            logger.info(f"DeepSeek 逐条请求已超过截止时间，剩余条目使用本地建议: {e}")
+            break
+        except Exception as e:
+            logger.info(f"DeepSeek 逐条请求失败，使用本地建议: {e}")
+    return results
+
 
-    return f"✨ 温馨提示：\n{response.choices[0].message.content}"
+def get_suggestions(
+    messages: List[str], batch_size: Optional[int] = None
+) -> List[Optional[str]]:
+    """批量生成建议，失败的条目为None"""
+    return [
+        None if result is None else result[0]
+        for result in request_suggestions(messages, batch_size)
+    ]
+
+
+async def get_suggestion_async(message: str) -> str:
+    """get_suggestion 的异步版本"""
+    client = get_async_client()
+
+    for attempt in range(settings.DEEPSEEK_MAX_RETRIES + 1):
+        started = time.perf_counter()
+        try:
+            response = await client.chat.completions.create(
+                model=settings.DEEPSEEK_MODEL,
+                messages=_build_messages(message),
+                stream=False,
+            )
+        except RETRYABLE_ERRORS as e:
+            if attempt >= settings.DEEPSEEK_MAX_RETRIES:
+                stats.record_failure(retries=attempt)
+                raise
+            logger.info(f"DeepSeek 请求失败，准备第 {attempt + 1} 次重试: {e}")
+            await asyncio.sleep(_backoff(attempt))
+        except Exception:
+            stats.record_failure(retries=attempt)
+            raise
+        else:
+            stats.record(time.perf_counter() - started, response.usage, attempt)
+            return _format_suggestion(response.choices[0].message.content)
+
+
+async def get_suggestions_async(
+    messages: List[str], concurrency: Optional[int] = None
+) -> List[Any]:
+    """并发获取多条建议，同时进行的请求数不超过 concurrency
+
+    返回值与 messages 一一对应，失败的条目为对应的异常对象。
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.DEEPSEEK_CONCURRENCY)
+
+    async def _limited(message: str) -> str:
+        async with semaphore:
+            return await get_suggestion_async(message)
+
+    return await asyncio.gather(
+        *(_limited(message) for message in messages), return_exceptions=True
+    )
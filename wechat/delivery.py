@@ -0,0 +1,252 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import requests
+
+from models.singleton import singleton
+from settings.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryBackend:
+    """消息发送后端接口"""
+
+    name = "base"
+
+    def open(self) -> None:
+        """建立发送会话"""
+
+    def send(self, who: str, message: str) -> None:
+        """发送一条消息，失败时抛出异常"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """关闭发送会话"""
+
+
+class WxautoBackend(DeliveryBackend):
+    """通过 wxauto 自动化微信客户端发送"""
+
+    name = "wxauto"
+
+    def __init__(self):
+        self._wx = None
+
+    def open(self) -> None:
+        from wxauto import WeChat  # 开源版
+
+        self._wx = WeChat()
+
+    def send(self, who: str, message: str) -> None:
+        self._wx.SendMsg(message, who=who)
+
+    def close(self) -> None:
+        self._wx = None
+
+
+class FileBackend(DeliveryBackend):
+    """把消息以 JSON Lines 写入文件，用于无微信环境下的测试和压测"""
+
+    name = "file"
+
+    def __init__(self, file_path: str):
+        self._file_path = file_path
+        self._file = None
+
+    def open(self) -> None:
+        os.makedirs(os.path.dirname(self._file_path) or ".", exist_ok=True)
+        self._file = open(self._file_path, "a", encoding="utf-8")
+
+    def send(self, who: str, message: str) -> None:
+        record = {"who": who, "message": message, "time": datetime.now().isoformat()}
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class HttpBackend(DeliveryBackend):
+    """把消息 POST 到本地 HTTP 服务，用于无微信环境下的测试和压测"""
+
+    name = "http"
+
+    def __init__(self, url: str, timeout: float = 10):
+        self._url = url
+        self._timeout = timeout
+        self._session: Optional[requests.Session] = None
+
+    def open(self) -> None:
+        self._session = requests.Session()
+
+    def send(self, who: str, message: str) -> None:
+        response = self._session.post(
+            self._url, json={"who": who, "message": message}, timeout=self._timeout
+        )
+        response.raise_for_status()
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+@dataclass
+class OutgoingMessage:
+    """待发送消息"""
+
+    who: str
+    message: str
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class DeliveryWorker:
+    """单线程消息发送器
+
+    一个工作线程持有唯一的发送会话，按入队顺序依次发送，
+    因此同一联系人的消息顺序与提交顺序一致；两次发送之间至少间隔 interval 秒。
+    """
+
+    def __init__(
+        self, backend: DeliveryBackend, maxsize: int = 1000, interval: float = 1.0
+    ):
+        self._backend = backend
+        self._interval = interval
+        self._queue: "queue.Queue[Optional[OutgoingMessage]]" = queue.Queue(maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._session_open = False
+        self._last_sent_at = 0.0
+
+        # 统计信息
+        self.sent = 0
+        self.failed = 0
+        self.sessions = 0
+        self.send_seconds_total = 0.0
+        self.send_seconds_max = 0.0
+        self.wait_seconds_max = 0.0
+
+    def start(self) -> "DeliveryWorker":
+        """启动工作线程"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=f"delivery-{self._backend.name}", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def submit(self, who: str, message: str, timeout: Optional[float] = None) -> Future:
+        """提交一条待发送消息，队列已满时阻塞（最多 timeout 秒）"""
+        self.start()
+        item = OutgoingMessage(who, message)
+        self._queue.put(item, timeout=timeout)
+        return item.future
+
+    def join(self) -> None:
+        """等待队列中的消息全部处理完毕"""
+        self._queue.join()
+
+    def stop(self) -> None:
+        """处理完剩余消息后停止工作线程"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._thread = None
+
+    def _ensure_session(self) -> None:
+        if not self._session_open:
+            self._backend.open()
+            self._session_open = True
+            self.sessions += 1
+
+    def _reset_session(self) -> None:
+        try:
+            self._backend.close()
+        except Exception as e:
+            logger.info(f"关闭发送会话失败: {e}")
+        self._session_open = False
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    self._reset_session()
+                    return
+                self._deliver(item)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, item: OutgoingMessage) -> None:
+        # 发送节流
+        delay = self._last_sent_at + self._interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        started = time.monotonic()
+        self.wait_seconds_max = max(self.wait_seconds_max, started - item.enqueued_at)
+        try:
+            self._ensure_session()
+            self._backend.send(item.who, item.message)
+        except Exception as e:
+            self.failed += 1
+            # 会话可能已失效，下次发送时重新建立
+            self._reset_session()
+            logger.info(f"{datetime.now()} - 发送给 {item.who} 失败: {e}")
+            item.future.set_exception(e)
+        else:
+            elapsed = time.monotonic() - started
+            self.sent += 1
+            self.send_seconds_total += elapsed
+            self.send_seconds_max = max(self.send_seconds_max, elapsed)
+            item.future.set_result(elapsed)
+        finally:
+            self._last_sent_at = time.monotonic()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """发送统计"""
+        return {
+            "backend": self._backend.name,
+            "queue_depth": self._queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "sessions": self.sessions,
+            "send_seconds_avg": self.send_seconds_total / self.sent if self.sent else 0,
+            "send_seconds_max": self.send_seconds_max,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+
+def create_backend(name: str) -> DeliveryBackend:
+    """根据名称创建发送后端"""
+    if name == "wxauto":
+        return WxautoBackend()
+    if name == "file":
+        return FileBackend(settings.DELIVERY_FILE)
+    if name == "http":
+        return HttpBackend(settings.DELIVERY_HTTP_URL)
+    raise ValueError(f"未知的发送后端: {name}")
+
+
+@singleton
+def get_delivery_worker() -> DeliveryWorker:
+    """获取进程级的消息发送器"""
+    return DeliveryWorker(
+        create_backend(settings.DELIVERY_BACKEND),
+        maxsize=settings.DELIVERY_QUEUE_SIZE,
+        interval=settings.DELIVERY_INTERVAL,
+    )
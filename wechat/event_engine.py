@@ -0,0 +1,199 @@
+import heapq
+import itertools
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from models.event_models import Event
+from models.recipient_models import Recipient
+from models.singleton import singleton
+from settings.settings import settings
+
+# 待提醒堆的条目：(开始提醒的日期序数, 序号, 发生日期序数, 接收人, 事件)
+_Entry = Tuple[int, int, int, str, Event]
+
+
+@dataclass(frozen=True)
+class Occurrence:
+    """事件的一次发生"""
+
+    recipient: str
+    event: Event
+    date: date
+    days_until: int
+
+    @property
+    def years(self) -> int:
+        """第几周年（生日为年龄）"""
+        return self.event.years_at(self.date)
+
+    @property
+    def message(self) -> str:
+        name, days, years = self.event.name, self.days_until, self.years
+        if self.event.type == "birthday":
+            age = f"（{years} 岁）" if years > 0 else ""
+            if days == 0:
+                return f"🎂 今天是{name}{age}，生日快乐！"
+            return f"🎂 距离{name}{age}还有 {days} 天"
+        if self.event.type == "countdown":
+            if days == 0:
+                return f"⏳ 就是今天：{name}！"
+            return f"⏳ 距离{name}还有 {days} 天"
+        anniversary = f"{name} {years} 周年" if years > 0 else name
+        if days == 0:
+            return f"💞 今天是{anniversary}！"
+        return f"💞 距离{anniversary}还有 {days} 天"
+
+
+class EventEngine:
+    """多事件提醒引擎
+
+    所有接收人的事件按"开始提醒的日期"放在一个最小堆中，
+    每次只弹出已进入提醒窗口的事件，放入按发生日期排序的活动堆；
+    发生日期过去后重复事件计算下一次发生并重新入堆，倒计时直接移除。
+    每天的开销只与到期事件数成正比，不需要遍历所有接收人的所有事件。
+    不同时区的接收人同一时刻的日期可能相差两天，查询的日期不一定递增，
+    因此发生日期过去 SKEW_DAYS 天后才离开活动堆，查询时再按日期筛选。
+    """
+
+    # 同一时刻各时区日期的最大差（UTC+14 与 UTC-12）
+    SKEW_DAYS = 2
+
+    def __init__(self, lead_days: int = 3):
+        self._lead_days = lead_days
+        self._lock = threading.Lock()
+        self._pending: List[_Entry] = []
+        self._active: List[_Entry] = []  # 以发生日期序数为第一个元素
+        self._sequence = itertools.count()
+        self._signature: Optional[int] = None
+
+        # 统计信息
+        self.scheduled = 0
+        self.popped = 0
+
+    def _lead(self, event: Event) -> int:
+        return self._lead_days if event.lead_days is None else event.lead_days
+
+    def _entry(self, recipient: str, event: Event, today: date) -> Optional[_Entry]:
+        occurrence = event.occurrence(today)
+        if occurrence is None:
+            return None
+        ordinal = occurrence.toordinal()
+        self.scheduled += 1
+        return (
+            ordinal - self._lead(event),
+            next(self._sequence),
+            ordinal,
+            recipient,
+            event,
+        )
+
+    def schedule(
+        self, recipient: str, event: Event, today: Union[date, datetime]
+    ) -> None:
+        """添加一个事件"""
+        if isinstance(today, datetime):
+            today = today.date()
+        with self._lock:
+            entry = self._entry(recipient, event, today)
+            if entry is not None:
+                heapq.heappush(self._pending, entry)
+
+    def sync(
+        self, recipients: Iterable[Recipient], today: Union[date, datetime]
+    ) -> bool:
+        """按接收人配置重建事件堆，配置未变化时保留现有进度，返回是否重建"""
+        if isinstance(today, datetime):
+            today = today.date()
+        # 从 SKEW_DAYS 天前开始安排，时区较晚的接收人查询较早的日期时不会漏掉
+        since = date.fromordinal(today.toordinal() - self.SKEW_DAYS)
+        configured = tuple(
+            (recipient.name, recipient.events)
+            for recipient in recipients
+            if recipient.events
+        )
+        signature = hash(configured)
+        with self._lock:
+            if signature == self._signature:
+                return False
+            self._signature = signature
+            entries = (
+                self._entry(name, event, since)
+                for name, events in configured
+                for event in events
+            )
+            self._pending = [entry for entry in entries if entry is not None]
+            self._active = []
+            heapq.heapify(self._pending)
+            return True
+
+    def due(self, today: Union[date, datetime]) -> List[Occurrence]:
+        """今天及提醒窗口内将要发生的事件，按发生日期排序"""
+        if isinstance(today, datetime):
+            today = today.date()
+        ordinal = today.toordinal()
+        horizon = ordinal - self.SKEW_DAYS
+        since = date.fromordinal(horizon)
+        with self._lock:
+            # 过去超过 SKEW_DAYS 天的事件离开活动堆，重复事件安排下一次
+            while self._active and self._active[0][0] < horizon:
+                _, _, _, recipient, event = heapq.heappop(self._active)
+                self._reschedule(recipient, event, since)
+
+            # 进入提醒窗口的事件移入活动堆
+            while self._pending and self._pending[0][0] <= ordinal:
+                _, sequence, occurrence, recipient, event = heapq.heappop(self._pending)
+                self.popped += 1
+                if occurrence < horizon:
+                    # 错过了发生日期（如中间有几天没有运行）
+                    self._reschedule(recipient, event, since)
+                    continue
+                heapq.heappush(
+                    self._active, (occurrence, sequence, occurrence, recipient, event)
+                )
+
+            # 活动堆中可能有已过去或按 today 尚未进入提醒窗口的事件
+            return [
+                Occurrence(
+                    recipient, event, date.fromordinal(occurrence), occurrence - ordinal
+                )
+                for occurrence, _, _, recipient, event in sorted(self._active)
+                if ordinal <= occurrence <= ordinal + self._lead(event)
+            ]
+
+    def _reschedule(self, recipient: str, event: Event, today: date) -> None:
+        entry = self._entry(recipient, event, today)
+        if entry is not None:
+            heapq.heappush(self._pending, entry)
+
+    def due_by_recipient(
+        self, today: Union[date, datetime]
+    ) -> Dict[str, List[Occurrence]]:
+        """按接收人分组的到期事件，供渲染阶段一次取用"""
+        grouped: Dict[str, List[Occurrence]] = {}
+        for occurrence in self.due(today):
+            grouped.setdefault(occurrence.recipient, []).append(occurrence)
+        return grouped
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """引擎统计"""
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "active": len(self._active),
+                "scheduled": self.scheduled,
+                "popped": self.popped,
+            }
+
+
+def events_message(occurrences: List[Occurrence]) -> str:
+    """接收人当天的事件提醒"""
+    return "\n".join(occurrence.message for occurrence in occurrences)
+
+
+@singleton
+def get_event_engine() -> EventEngine:
+    """获取进程级的事件引擎"""
+    return EventEngine(settings.EVENT_LEAD_DAYS)
@@ -0,0 +1,358 @@
+import functools
+import logging
+import os
+import time
+from concurrent.futures import Executor, Future
+from dataclasses import astuple
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models.event_models import parse_date
+from models.recipient_models import Recipient, RecipientDatabase
+from settings.settings import settings
+from wechat import anniversary_batch
+from wechat.date_calculation import AnniversaryMessageGenerator, AnniversaryStyle
+from wechat.deepseek import stats as suggestion_stats
+from wechat.event_engine import events_message, get_event_engine
+from wechat.fetch import chain, fetch_daily_sentence, fetch_weather, remaining, timed
+from wechat.render_context import RenderContext, get_render_cache
+from wechat.suggestion_cache import get_cached_suggestion, get_cached_suggestions
+from wechat.template import WeatherMessageGenerator, template_concat
+
+logger = logging.getLogger(__name__)
+
+# 天气渲染的共享键：(城市ID, 天气模板风格)
+RenderKey = Tuple[Optional[int], str]
+
+
+def load_recipients() -> List[Recipient]:
+    """加载接收人列表，未配置接收人文件时使用 settings 中的单个接收人"""
+    if settings.RECIPIENTS_FILE and os.path.exists(settings.RECIPIENTS_FILE):
+        return RecipientDatabase().load_from_file(settings.RECIPIENTS_FILE).get_all
+
+    return [
+        Recipient(
+            name=settings.USER_NAME,
+            anniversary=parse_date(settings.ANNIVERSARY),
+        )
+    ]
+
+
+def _location_context(location: Optional[int], current_date: datetime) -> RenderContext:
+    """同一城市的接收人共用的天气渲染上下文（天气正文中的图标、名称）"""
+    return RenderContext(f"location:{location}", current_date, settings.RENDER_SEED)
+
+
+def _render_weather(
+    weather: Any,
+    generator: WeatherMessageGenerator,
+    styles: List[str],
+    context: RenderContext,
+    timings: Dict[str, float],
+) -> Tuple[Any, Dict[str, str]]:
+    """用同一份模板数据渲染该城市需要的全部风格，相同输入直接返回缓存结果
+
+    头部行按接收人轮换，这里只渲染不含头部的正文。
+    """
+    key = (
+        "weather",
+        context.key,
+        astuple(weather),
+        tuple(styles),
+        generator.signature,
+    )
+    messages = timed(
+        timings,
+        "render_weather",
+        get_render_cache().get_or_render,
+        key,
+        lambda: generator.generate_messages(weather, styles, context, header=False),
+    )
+    return weather, messages
+
+
+def _suggest(
+    rendered: Tuple[Any, Dict[str, str]],
+    style: str,
+    context: RenderContext,
+    deadline: float,
+    timings: Dict[str, float],
+) -> Tuple[Any, str, Optional[str]]:
+    """为渲染好的天气消息生成大模型建议，返回 (天气, 天气正文, 建议)
+
+    流式和非流式请求都不超过 SUGGESTION_BUDGET 秒和截止时间 deadline，
+    超出预算或请求失败时建议为None，由各接收人使用本地建议；
+    缓存中的建议按城市的渲染上下文选取，同一天重新生成时结果相同。
+    """
+    weather, messages = rendered
+    weather_message = messages[style]
+    try:
+        budget = min(settings.SUGGESTION_BUDGET, remaining(deadline))
+        if settings.SUGGESTION_STREAM:
+            limits = {"budget": budget}
+        else:
+            limits = {"deadline": time.monotonic() + budget}
+        suggestion_message = timed(
+            timings,
+            "suggestion",
+            get_cached_suggestion,
+            weather,
+            weather_message,
+            rng=context.rng(f"suggestion:{style}"),
+            **limits,
+        )
+    except Exception as e:
+        logger.info(f"{datetime.now()} - 大模型建议获取失败，使用本地建议: {e}")
+        suggestion_message = None
+    return weather, weather_message, suggestion_message
+
+
+def _collect(
+    futures: Dict[Any, Future], deadline: float, failure: str = "天气消息生成失败"
+) -> Dict[Any, Any]:
+    """收集各城市的结果，单个城市失败不影响其他接收人"""
+    results = {}
+    for key, future in futures.items():
+        try:
+            results[key] = future.result(timeout=remaining(deadline))
+        except Exception as e:
+            logger.info(f"{datetime.now()} - {key} {failure}: {e!r}")
+    return results
+
+
+def _anniversary_rows(
+    recipients: List[Recipient], current_date: datetime
+) -> List[Optional[Callable[[], Dict]]]:
+    """接收人较多时按列批量计算纪念日，返回每位接收人取出自己那一行的函数"""
+    rows: List[Optional[Callable[[], Dict]]] = [None] * len(recipients)
+    # 农历周年纪念日只能逐条计算
+    positions = [
+        i
+        for i, recipient in enumerate(recipients)
+        if recipient.anniversary is not None
+        and recipient.anniversary_calendar != "lunar"
+    ]
+    if (
+        len(positions) < settings.ANNIVERSARY_BATCH_MIN
+        or not anniversary_batch.available()
+    ):
+        return rows
+
+    batch = anniversary_batch.calculate_anniversaries_batch(
+        [recipients[i].anniversary for i in positions], current_date
+    )
+    for row, position in enumerate(positions):
+        rows[position] = functools.partial(batch.row, row)
+    return rows
+
+
+def _anniversary_message(
+    recipient: Recipient,
+    current_date: datetime,
+    row: Optional[Callable[[], Dict]] = None,
+) -> str:
+    """生成接收人个性化的纪念日消息，同一接收人同一天的结果相同并会被缓存"""
+    if recipient.anniversary is None:
+        return ""
+    style = (
+        AnniversaryStyle(recipient.anniversary_style)
+        if recipient.anniversary_style
+        else None
+    )
+    context = RenderContext(recipient.name, current_date, settings.RENDER_SEED)
+    lunar = recipient.anniversary_calendar == "lunar"
+    key = ("anniversary", context.key, recipient.anniversary, style, lunar)
+    return get_render_cache().get_or_render(
+        key,
+        lambda: AnniversaryMessageGenerator.generate_anniversary_message(
+            recipient.anniversary,
+            current_date,
+            style=style,
+            context=context,
+            anniversaries=None if row is None else row(),
+            lunar=lunar,
+        ),
+    )
+
+
+def build_daily_messages(
+    recipients: List[Recipient],
+    executor: Executor,
+    deadline: float,
+    timings: Dict[str, float],
+    current_date: datetime,
+) -> List[Tuple[Recipient, str]]:
+    """为接收人生成 current_date 当天的消息
+
+    每个城市只请求一次天气、只计算一次模板数据并渲染所需的全部风格，
+    每日一句全局只请求一次，相同 (城市, 风格) 的大模型建议只生成一次；
+    接收人的风格只是从已渲染的消息中选取；
+    头部行、本地建议按接收人的抽样进度选取，纪念日部分按接收人单独计算。
+    current_date 是这批接收人所在时区的日期，天气、每日一句、纪念日和事件提醒都按它计算。
+    """
+    generator = WeatherMessageGenerator("./data/header.json", "./data/weather.json")
+    # 大模型建议提前结束，为本地建议和拼接消息留出时间
+    suggestion_deadline = deadline - settings.SUGGESTION_HEADROOM
+
+    locations = {recipient.location for recipient in recipients}
+    contexts = {
+        location: _location_context(location, current_date) for location in locations
+    }
+    # 未指定风格的接收人按城市共用一种风格，各风格按天轮换
+    default_styles = {
+        location: contexts[location]
+        .sampler("style")
+        .choice("style", generator.templates.styles)
+        for location in locations
+    }
+
+    def render_key(recipient: Recipient) -> RenderKey:
+        return (
+            recipient.location,
+            recipient.weather_style or default_styles[recipient.location],
+        )
+
+    render_keys = {render_key(recipient) for recipient in recipients}
+    styles_by_location: Dict[Optional[int], List[str]] = {}
+    for location, style in sorted(render_keys, key=str):
+        styles_by_location.setdefault(location, []).append(style)
+    logger.info(
+        f"接收人 {len(recipients)} 位，城市 {len(locations)} 个，"
+        f"天气消息 {len(render_keys)} 种"
+    )
+
+    weather_futures: Dict[Optional[int], Future] = {
+        location: executor.submit(
+            timed, timings, "weather", fetch_weather, deadline, current_date, location
+        )
+        for location in locations
+    }
+    sentence_future = executor.submit(
+        timed, timings, "sentence", fetch_daily_sentence, deadline, current_date
+    )
+    # 天气就绪后立即渲染该城市需要的所有风格
+    render_futures: Dict[Optional[int], Future] = {
+        location: chain(
+            executor,
+            weather_futures[location],
+            _render_weather,
+            generator,
+            styles,
+            contexts[location],
+            timings,
+        )
+        for location, styles in styles_by_location.items()
+    }
+    batch_size = settings.SUGGESTION_BATCH_SIZE
+    if batch_size <= 1:
+        # 渲染完成后立即请求大模型
+        suggestion_futures = {
+            key: chain(
+                executor,
+                render_futures[key[0]],
+                _suggest,
+                key[1],
+                contexts[key[0]],
+                suggestion_deadline,
+                timings,
+            )
+            for key in render_keys
+        }
+
+    # 等待网络请求期间计算各接收人的纪念日
+    anniversary_rows = timed(
+        timings, "anniversary_batch", _anniversary_rows, recipients, current_date
+    )
+    anniversary_messages = [
+        timed(
+            timings, "anniversary", _anniversary_message, recipient, current_date, row
+        )
+        for recipient, row in zip(recipients, anniversary_rows)
+    ]
+
+    # 只取出今天到期的生日、倒计时等事件（事件堆由调用方按全部接收人同步）
+    due_events = timed(
+        timings, "events", get_event_engine().due_by_recipient, current_date
+    )
+
+    try:
+        sentence_message = sentence_future.result(timeout=remaining(deadline)).to_str
+    except Exception as e:
+        # 每日一句是可选部分，获取失败时省略，不影响其余内容
+        logger.info(f"{datetime.now()} - 每日一句获取失败，本次省略: {e!r}")
+        sentence_message = ""
+
+    rendered: Dict[RenderKey, Tuple[Any, str, Optional[str]]]
+    if batch_size <= 1:
+        rendered = _collect(
+            suggestion_futures, suggestion_deadline, "大模型建议未完成，使用本地建议"
+        )
+        # 建议未按时完成的 (城市, 风格) 用已渲染的天气，由接收人使用本地建议
+        rendered_locations = _collect(render_futures, deadline)
+        for key in render_keys - rendered.keys():
+            if key[0] in rendered_locations:
+                weather, weather_messages = rendered_locations[key[0]]
+                rendered[key] = (weather, weather_messages[key[1]], None)
+    else:
+        # 全部渲染完成后合并为批量请求
+        rendered_locations = _collect(render_futures, deadline)
+        keys = [key for key in render_keys if key[0] in rendered_locations]
+        items = [
+            (rendered_locations[key[0]][0], rendered_locations[key[0]][1][key[1]])
+            for key in keys
+        ]
+        try:
+            suggestions = timed(
+                timings,
+                "suggestion",
+                get_cached_suggestions,
+                items,
+                batch_size,
+                suggestion_deadline,
+                [
+                    contexts[location].rng(f"suggestion:{style}")
+                    for location, style in keys
+                ],
+            )
+        except Exception as e:
+            logger.info(f"{datetime.now()} - 大模型建议获取失败，使用本地建议: {e}")
+            suggestions = [None] * len(keys)
+        rendered = {
+            key: (weather, weather_message, suggestion)
+            for key, (weather, weather_message), suggestion in zip(
+                keys, items, suggestions
+            )
+        }
+
+    messages = []
+    for recipient, anniversary_message in zip(recipients, anniversary_messages):
+        key = render_key(recipient)
+        if key not in rendered:
+            continue
+        weather, weather_message, suggestion_message = rendered[key]
+        # 头部行和本地建议按接收人轮换，换城市、换风格后也接着原来的进度
+        context = RenderContext(recipient.name, current_date, settings.RENDER_SEED)
+        weather_message = (
+            generator.header_line(context.sampler("header")) + weather_message
+        )
+        if suggestion_message is None:
+            suggestion_stats.record_local_fallback()
+            suggestion_message = generator.generate_local_suggestion(weather, context)
+        occurrences = due_events.get(recipient.name)
+        messages.append(
+            (
+                recipient,
+                template_concat(
+                    weather_message,
+                    suggestion_message,
+                    anniversary_message,
+                    sentence_message,
+                    reminder=(
+                        functools.partial(events_message, occurrences)
+                        if occurrences
+                        else None
+                    ),
+                ),
+            )
+        )
+    return messages
@@ -0,0 +1,181 @@
+import logging
+import time
+from concurrent.futures import Executor, Future
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from api.client import get_api_client
+from api.daily_sentence import ApiDailySentence
+from api.weather import ApiWeather
+from settings.settings import settings
+from wechat.forecast_store import get_forecast_store, parse_update_time
+from wechat.sentence_store import get_sentence_store
+
+logger = logging.getLogger(__name__)
+
+
+def timed(timings: Dict[str, float], stage: str, func: Callable, *args, **kwargs):
+    """执行函数并记录该阶段耗时（同一阶段多次执行时记录最慢的一次）"""
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - started
+        timings[stage] = max(timings.get(stage, 0.0), elapsed)
+
+
+def remaining(deadline: float) -> float:
+    """距离截止时间的剩余秒数"""
+    seconds = deadline - time.monotonic()
+    if seconds <= 0:
+        raise TimeoutError("本次运行已超过截止时间")
+    return seconds
+
+
+def chain(executor: Executor, future: Future, func: Callable, *args) -> Future:
+    """future 完成后把 func(future.result(), *args) 提交到线程池
+
+    不在工作线程中阻塞等待上游结果，避免线程池被等待任务占满。
+    """
+    chained = Future()
+
+    def _copy(done: Future) -> None:
+        if done.cancelled():
+            chained.cancel()
+        elif done.exception() is not None:
+            chained.set_exception(done.exception())
+        else:
+            chained.set_result(done.result())
+
+    def _submit(done: Future) -> None:
+        if done.cancelled() or done.exception() is not None:
+            _copy(done)
+            return
+        try:
+            executor.submit(func, done.result(), *args).add_done_callback(_copy)
+        except RuntimeError as e:
+            # 线程池已关闭
+            chained.set_exception(e)
+
+    future.add_done_callback(_submit)
+    return chained
+
+
+def request_forecast(
+    location: int, deadline: Optional[float] = None
+) -> Tuple[Optional[float], List[Dict[str, Any]]]:
+    """请求和风天气3日预报，返回 (发布时间, 每日预报列表)"""
+    weather_api = ApiWeather()
+    response = get_api_client().request(
+        weather_api,
+        headers=weather_api.Headers.load().to_dict,
+        params=weather_api.Params(location=location).to_dict,
+        deadline=deadline,
+    )
+    data = response.json()
+    daily = data.get("daily")
+    if not daily:
+        # 接口出错时（如 code 不为200）没有预报数据，按请求失败处理
+        raise ValueError(f"城市 {location} 天气预报为空: code={data.get('code')}")
+    return parse_update_time(data.get("updateTime")), daily
+
+
+def _pick_day(daily: List[Dict[str, Any]], fx_date: str) -> Dict[str, Any]:
+    """从预报列表中取出指定日期，找不到时使用第一天"""
+    for day in daily:
+        if day.get("fxDate") == fx_date:
+            return day
+    return daily[0]
+
+
+def fetch_weather(
+    deadline: float, current_date: date, location: Optional[int] = None
+) -> ApiWeather.Response:
+    """获取 current_date（接收人所在时区的当天）的天气信息
+
+    本地存储中有新鲜的预报时不请求接口；只有过期预报时先尝试刷新，
+    FORECAST_STALE_BUDGET 秒内未完成则使用过期预报，刷新在后台继续进行。
+    """
+    if location is None:
+        location = ApiWeather.Params.load().location
+    store = get_forecast_store()
+    today = current_date.strftime("%Y-%m-%d")
+
+    cached = store.get(location, today)
+    store.record(cached)
+    if store.is_fresh(cached):
+        return ApiWeather.Response.load(cached[0])
+
+    refresh = store.refresh(
+        location,
+        lambda: request_forecast(location, None if cached else deadline),
+    )
+    if cached is None:
+        daily = refresh.result(timeout=remaining(deadline))
+        return ApiWeather.Response.load(_pick_day(daily, today))
+
+    try:
+        daily = refresh.result(
+            timeout=min(settings.FORECAST_STALE_BUDGET, remaining(deadline))
+        )
+    except Exception as e:
+        logger.info(
+            f"城市 {location} 天气刷新未完成，使用 {cached[1] / 3600:.1f} 小时前的预报: {e!r}"
+        )
+        return ApiWeather.Response.load(cached[0])
+    return ApiWeather.Response.load(_pick_day(daily, today))
+
+
+def request_sentence(
+    dateline: Optional[str] = None, deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    """请求金山词霸每日一句，返回接口原始数据"""
+    sentence_api = ApiDailySentence()
+    response = get_api_client().request(
+        sentence_api,
+        params=sentence_api.Params(date=dateline).to_dict,
+        deadline=deadline,
+    )
+    return response.json()
+
+
+def fetch_daily_sentence(
+    deadline: float, current_date: date
+) -> ApiDailySentence.Response:
+    """获取 current_date（接收人所在时区的当天）的每日一句
+
+    当天的句子只请求一次并存档，接口不可用或 SENTENCE_BUDGET 秒内未返回时
+    使用最近一天的存档；当天的句子尚未发布时使用接口返回的最近一句，
+    SENTENCE_RETRY_AFTER 秒内不再请求。
+    """
+    store = get_sentence_store()
+    today = current_date.strftime("%Y-%m-%d")
+
+    data = store.get(today)
+    if data is None and not store.is_unpublished(today):
+        try:
+            budget = min(deadline, time.monotonic() + settings.SENTENCE_BUDGET)
+            data = request_sentence(today, budget)
+            store.put(data)
+        except Exception as e:
+            data = store.latest(before=today)
+            if data is None:
+                raise
+            logger.info(f"每日一句获取失败，使用 {data['dateline']} 的存档: {e!r}")
+        else:
+            if data.get("dateline") != today:
+                store.mark_unpublished(today)
+                logger.info(
+                    f"每日一句 {today} 尚未发布，使用 {data.get('dateline')} 的句子"
+                )
+    if data is None:
+        data = store.latest(before=today)
+        if data is None:
+            raise LookupError(f"每日一句 {today} 尚未发布，且没有存档")
+    return ApiDailySentence.Response.load(data)
+
+
+def prefetch_daily_sentence(current_date: date) -> None:
+    """空闲时在后台预取 current_date 第二天的每日一句"""
+    tomorrow = (current_date + timedelta(days=1)).strftime("%Y-%m-%d")
+    get_sentence_store().prefetch(tomorrow, lambda: request_sentence(tomorrow))
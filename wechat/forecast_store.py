@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models.singleton import singleton
+from settings.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# 预报查询结果：(当日预报, 距离预报发布的秒数)
+CachedForecast = Tuple[Dict[str, Any], float]
+
+
+def parse_update_time(value: Optional[str]) -> Optional[float]:
+    """解析和风天气的 updateTime（如 2021-11-15T16:35+08:00），失败时返回None"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+class ForecastStore:
+    """天气预报本地存储
+
+    以 (城市ID, 预报日期) 为主键保存接口返回的每一天预报，
+    预报发布时间（updateTime）距今不超过 fresh_age 秒视为新鲜，可直接使用；
+    超过 max_age 秒的预报不再使用，早于昨天的预报在写入时清理
+    （时区较晚的接收人当地可能还是昨天）。
+    """
+
+    def __init__(
+        self,
+        file_path: Optional[str],
+        fresh_age: float = 60 * 60 * 6,
+        max_age: float = 60 * 60 * 36,
+    ):
+        self._fresh_age = fresh_age
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self._refreshing: Dict[int, Future] = {}
+
+        if file_path:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(
+            file_path or ":memory:", check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS forecast ("
+            " location INTEGER NOT NULL,"
+            " fx_date TEXT NOT NULL,"
+            " update_time REAL NOT NULL,"
+            " fetched_at REAL NOT NULL,"
+            " data TEXT NOT NULL,"
+            " PRIMARY KEY (location, fx_date)"
+            ") WITHOUT ROWID"
+        )
+
+        # 统计信息
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def get(self, location: int, fx_date: str) -> Optional[CachedForecast]:
+        """查询某城市某天的预报，不存在或已超过 max_age 时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT update_time, data FROM forecast"
+                " WHERE location = ? AND fx_date = ?",
+                (location, fx_date),
+            ).fetchone()
+        if row is None:
+            return None
+        age = time.time() - row[0]
+        if age > self._max_age:
+            return None
+        return json.loads(row[1]), age
+
+    def is_fresh(self, cached: Optional[CachedForecast]) -> bool:
+        return cached is not None and cached[1] <= self._fresh_age
+
+    def put(
+        self, location: int, update_time: Optional[float], daily: List[Dict[str, Any]]
+    ) -> None:
+        """保存一次接口返回的全部预报，不覆盖发布时间更新的已有预报"""
+        now = time.time()
+        update_time = now if update_time is None else update_time
+        rows = [
+            (
+                location,
+                day["fxDate"],
+                update_time,
+                now,
+                json.dumps(day, ensure_ascii=False, separators=(",", ":")),
+            )
+            for day in daily
+        ]
+        with self._lock:
+            # 连接为自动提交模式，需要显式开启事务，保证写入和清理一起生效
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write(rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _write(self, rows: List[Tuple]) -> None:
+        self._conn.executemany(
+            "INSERT INTO forecast VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (location, fx_date) DO UPDATE SET"
+            " update_time = excluded.update_time,"
+            " fetched_at = excluded.fetched_at,"
+            " data = excluded.data"
+            " WHERE excluded.update_time >= forecast.update_time",
+            rows,
+        )
+        self._conn.execute(
+            "DELETE FROM forecast WHERE fx_date < ?",
+            ((datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d"),),
+        )
+
+    def refresh(
+        self,
+        location: int,
+        fetch: Callable[[], Tuple[Optional[float], List[Dict[str, Any]]]],
+    ) -> Future:
+        """在后台线程中重新获取某城市的预报并写入存储
+
+        fetch 返回 (发布时间, 每日预报列表)，同一城市同时只会有一个刷新任务，
+        返回的 Future 结果为每日预报列表。
+        """
+        with self._lock:
+            future = self._refreshing.get(location)
+            if future is not None:
+                return future
+            future = Future()
+            self._refreshing[location] = future
+
+        def _run() -> None:
+            try:
+                update_time, daily = fetch()
+                self.put(location, update_time, daily)
+            except Exception as e:
+                with self._lock:
+                    self.refresh_failures += 1
+                    del self._refreshing[location]
+                future.set_exception(e)
+            else:
+                with self._lock:
+                    self.refreshes += 1
+                    del self._refreshing[location]
+                future.set_result(daily)
+
+        threading.Thread(
+            target=_run, name=f"forecast-refresh-{location}", daemon=True
+        ).start()
+        return future
+
+    def record(self, cached: Optional[CachedForecast]) -> None:
+        """记录一次查询的命中情况"""
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+            elif self.is_fresh(cached):
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """存储统计"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM forecast").fetchone()[0]
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "refresh_failures": self.refresh_failures,
+            }
+
+
+@singleton
+def get_forecast_store() -> ForecastStore:
+    """获取进程级的天气预报存储"""
+    return ForecastStore(
+        settings.FORECAST_STORE_FILE,
+        fresh_age=settings.FORECAST_FRESH_AGE,
+        max_age=settings.FORECAST_MAX_AGE,
+    )
@@ -0,0 +1,115 @@
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from models.recipient_models import Recipient
+from models.singleton import singleton
+from settings.settings import settings
+
+
+@dataclass
+class PreparedMessage:
+    """提前生成好的消息"""
+
+    recipient: Recipient
+    message: str
+    send_at: datetime  # 计划发送时间（带时区）
+    prepared_at: datetime
+
+
+class ReadyQueue:
+    """待发送消息队列
+
+    准备任务在发送时间之前生成消息放入队列，发送任务到点后直接取出发送；
+    只有计划发送时间与当前时间相差不超过 grace 秒的消息才会被取出，
+    过期的消息（如前一天没有发出去的）直接丢弃。
+    """
+
+    def __init__(self, grace: float = 300):
+        self._grace = timedelta(seconds=grace)
+        self._lock = threading.Lock()
+        self._messages: Dict[str, PreparedMessage] = {}
+
+        # 统计信息
+        self.prepared = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def put(self, prepared: PreparedMessage) -> None:
+        """放入一条准备好的消息，同一接收人只保留最新的一条"""
+        with self._lock:
+            self._messages[prepared.recipient.name] = prepared
+            self.prepared += 1
+
+    def pop(self, name: str, now: datetime) -> Optional[PreparedMessage]:
+        """取出接收人当前这次发送的消息，没有准备好时返回None"""
+        with self._lock:
+            prepared = self._messages.get(name)
+            if prepared is not None and prepared.send_at < now - self._grace:
+                del self._messages[name]
+                self.expired += 1
+                prepared = None
+            if prepared is None or prepared.send_at > now + self._grace:
+                self.misses += 1
+                return None
+            del self._messages[name]
+            self.hits += 1
+            return prepared
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """队列统计"""
+        with self._lock:
+            return {
+                "ready": len(self._messages),
+                "prepared": self.prepared,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+            }
+
+
+class SendGapRecorder:
+    """每位接收人计划发送时间与实际发出时间的差（秒）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gaps: Dict[str, float] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._gaps[name] = seconds
+
+    def get(self, name: str) -> Optional[float]:
+        """接收人最近一次发送的延迟"""
+        with self._lock:
+            return self._gaps.get(name)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """各接收人最近一次发送延迟的汇总"""
+        with self._lock:
+            gaps = sorted(self._gaps.values())
+        if not gaps:
+            return {"recipients": 0}
+        return {
+            "recipients": len(gaps),
+            "avg": sum(gaps) / len(gaps),
+            "p50": gaps[len(gaps) // 2],
+            "p95": gaps[min(len(gaps) - 1, int(len(gaps) * 0.95))],
+            "max": gaps[-1],
+        }
+
+
+@singleton
+def get_ready_queue() -> ReadyQueue:
+    """获取进程级的待发送消息队列"""
+    return ReadyQueue(settings.SCHEDULER_MISFIRE_GRACE)
+
+
+@singleton
+def get_send_gaps() -> SendGapRecorder:
+    """获取进程级的发送延迟记录"""
+    return SendGapRecorder()
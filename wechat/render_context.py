@@ -0,0 +1,117 @@
+import random
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Union
+
+from models.sampling import CursorStore, Sampler
+from models.singleton import singleton
+from settings.settings import settings
+
+
+class RenderContext:
+    """渲染用的随机数上下文
+
+    每个消息部分（section）的随机数生成器都由 (接收人, 日期, 部分) 确定；
+    头部、图标、名称、建议等列表的选取使用按接收人持久化进度的洗牌袋，
+    同一天内重复选取得到相同结果，因此当天的渲染结果可以缓存。
+    seed 可用于让不同部署得到不同的随机序列。
+    """
+
+    def __init__(self, recipient: Any, day: Union[date, datetime, str], seed: str = ""):
+        if isinstance(day, datetime):
+            day = day.date()
+        elif isinstance(day, str):
+            day = date.fromisoformat(day)
+        self.recipient = str(recipient)
+        self.date = day
+        self.day = day.isoformat()
+        self.seed = seed
+
+    def rng(self, section: str) -> random.Random:
+        """某个消息部分专用的随机数生成器（字符串种子跨进程稳定）"""
+        return random.Random(f"{self.seed}|{self.recipient}|{self.day}|{section}")
+
+    def sampler(self, section: str) -> Sampler:
+        """某个消息部分的不重复抽样器，进度按接收人保存在进程级的进度存储中"""
+        return Sampler(
+            get_cursor_store(), self.recipient, self.date, section, self.seed
+        )
+
+    @property
+    def key(self) -> tuple:
+        return self.seed, self.recipient, self.day
+
+
+def section_rng(
+    context: Optional[RenderContext], section: str
+) -> Optional[random.Random]:
+    """获取消息部分的随机数生成器，未指定上下文时返回None（使用全局random）"""
+    return None if context is None else context.rng(section)
+
+
+def section_sampler(
+    context: Optional[RenderContext], section: str
+) -> Optional[Sampler]:
+    """获取消息部分的抽样器，未指定上下文时返回None（使用全局random）"""
+    return None if context is None else context.sampler(section)
+
+
+class RenderCache:
+    """渲染结果缓存
+
+    渲染是 (输入, 随机数上下文) 的纯函数，重复调用和重试直接返回缓存结果；
+    超过 max_entries 时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key: Hashable, render: Callable[[], Any]) -> Any:
+        """命中时返回缓存结果，否则渲染并保存"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = render()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+@singleton
+def get_render_cache() -> RenderCache:
+    """获取进程级的渲染结果缓存"""
+    return RenderCache(settings.RENDER_CACHE_SIZE)
+
+
+@singleton
+def get_cursor_store() -> CursorStore:
+    """获取进程级的抽样进度存储"""
+    return CursorStore(settings.SAMPLER_CURSOR_FILE)
@@ -0,0 +1,211 @@
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import Executor
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.schedulers.base import BaseScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from models.recipient_models import Recipient
+from settings.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# 接收人发送任务和提前准备任务的ID前缀
+JOB_PREFIX = "recipient:"
+PREPARE_PREFIX = "prepare:"
+
+
+def send_slot(recipient: Recipient) -> Tuple[int, int, str]:
+    """接收人的发送时间 (时, 分, 时区)，未配置时使用 settings 中的默认值"""
+    hour, minute = settings.HOUR, settings.MINUTE
+    if recipient.send_time:
+        hour, minute = (int(part) for part in recipient.send_time.split(":"))
+    return hour, minute, recipient.timezone or settings.TIMEZONE
+
+
+def local_date(recipient: Recipient, when: Optional[datetime] = None) -> date:
+    """接收人所在时区 when 时刻（为空时为现在）的日期"""
+    zone = ZoneInfo(send_slot(recipient)[2])
+    return (when or datetime.now(timezone.utc)).astimezone(zone).date()
+
+
+def prepare_slot(recipient: Recipient, lead: float) -> Tuple[int, int, str]:
+    """提前 lead 秒（向上取整到分钟）准备消息的时间 (时, 分, 时区)"""
+    hour, minute, zone = send_slot(recipient)
+    lead_minutes = -(-int(lead) // 60)
+    hour, minute = divmod((hour * 60 + minute - lead_minutes) % (24 * 60), 60)
+    return hour, minute, zone
+
+
+def next_send_time(recipient: Recipient, after: datetime) -> datetime:
+    """接收人不早于 after 的下一次计划发送时间（带时区）"""
+    hour, minute, zone = send_slot(recipient)
+    trigger = CronTrigger(hour=hour, minute=minute, timezone=zone)
+    return trigger.get_next_fire_time(None, after)
+
+
+def job_stores(url: Optional[str]) -> Dict[str, Any]:
+    """定时任务存储，配置了数据库地址时持久化，重启后无需重新创建所有任务"""
+    if not url:
+        return {"default": MemoryJobStore()}
+
+    from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+
+    if url.startswith("sqlite:///"):
+        os.makedirs(os.path.dirname(url[len("sqlite:///") :]) or ".", exist_ok=True)
+    return {"default": SQLAlchemyJobStore(url=url)}
+
+
+def _recipient_jobs(
+    recipients: Iterable[Recipient], func: str, prepare_func: Optional[str]
+) -> Iterable[Tuple[str, str, str, Tuple[int, int, str]]]:
+    """每位接收人应有的任务 (任务ID, 函数, 接收人, 触发时间)"""
+    lead = settings.SCHEDULER_PREPARE_LEAD
+    for recipient in recipients:
+        name = recipient.name
+        yield f"{JOB_PREFIX}{name}", func, name, send_slot(recipient)
+        if prepare_func and lead > 0:
+            slot = prepare_slot(recipient, lead)
+            yield f"{PREPARE_PREFIX}{name}", prepare_func, name, slot
+
+
+def sync_recipient_jobs(
+    scheduler: BaseScheduler,
+    recipients: Iterable[Recipient],
+    func: str,
+    prepare_func: Optional[str] = None,
+) -> Dict[str, int]:
+    """让任务存储中的接收人任务与配置一致
+
+    每位接收人一个发送任务，配置了 prepare_func 且 SCHEDULER_PREPARE_LEAD 大于0时
+    再加一个提前准备消息的任务。只新增缺少的任务、更新时间或调度参数变化的任务、
+    删除多余的任务，其余任务保持原样（包括下次运行时间）；需要在调度器启动后调用。
+    """
+    existing = {
+        job.id: job
+        for job in scheduler.get_jobs()
+        if job.id.startswith((JOB_PREFIX, PREPARE_PREFIX))
+    }
+    misfire_grace_time = settings.SCHEDULER_MISFIRE_GRACE
+    coalesce = settings.SCHEDULER_COALESCE
+    result = {"unchanged": 0, "added": 0, "updated": 0, "removed": 0}
+
+    for job_id, job_func, recipient_name, (hour, minute, zone) in _recipient_jobs(
+        recipients, func, prepare_func
+    ):
+        name = f"{recipient_name} {hour:02d}:{minute:02d} {zone}"
+        job = existing.pop(job_id, None)
+        if (
+            job is not None
+            and job.name == name
+            and job.func_ref == job_func
+            and job.misfire_grace_time == misfire_grace_time
+            and job.coalesce == coalesce
+        ):
+            result["unchanged"] += 1
+            continue
+
+        scheduler.add_job(
+            job_func,
+            trigger=CronTrigger(hour=hour, minute=minute, timezone=zone),
+            args=[recipient_name],
+            id=job_id,
+            name=name,
+            replace_existing=True,
+            misfire_grace_time=misfire_grace_time,
+            coalesce=coalesce,
+        )
+        result["added" if job is None else "updated"] += 1
+
+    for job_id in existing:
+        scheduler.remove_job(job_id)
+        result["removed"] += 1
+    return result
+
+
+class MinuteBatcher:
+    """把同一分钟内触发的接收人合并为一次批量运行
+
+    接收人的定时任务触发时只登记接收人；同一分钟（按UTC计算，不同时区也能合并）
+    第一次登记后等待 window 秒，再把这一分钟登记的全部接收人交给 run_batch
+    在线程池中一次处理，天气、每日一句等共享数据只获取一次。
+    retry 大于0时，run_batch 返回的未完成接收人每隔 retry 秒重新运行一次，
+    直到距第一次运行超过 retry_for 秒；等待重试期间不占用线程池。
+    需要在事件循环中调用。
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[str]], Any],
+        executor: Executor,
+        window: float = 5,
+        retry: float = 0,
+        retry_for: float = 0,
+    ):
+        self._run_batch = run_batch
+        self._executor = executor
+        self._window = window
+        self._retry = retry
+        self._retry_for = retry_for
+        self._pending: Dict[datetime, Set[str]] = {}
+
+        # 统计信息
+        self.enqueued = 0
+        self.batches = 0
+        self.retries = 0
+
+    def add(self, name: str) -> None:
+        """登记一位到点的接收人"""
+        minute = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        names = self._pending.get(minute)
+        if names is None:
+            names = self._pending[minute] = set()
+            asyncio.get_running_loop().call_later(self._window, self._flush, minute)
+        names.add(name)
+        self.enqueued += 1
+
+    def _flush(self, minute: datetime) -> None:
+        names = sorted(self._pending.pop(minute, ()))
+        if not names:
+            return
+        self.batches += 1
+        logger.info(f"{minute} 触发的 {len(names)} 位接收人合并为一次运行")
+        self._submit(names, asyncio.get_running_loop().time() + self._retry_for)
+
+    def _submit(self, names: List[str], retry_until: float) -> None:
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, self._run_batch, names
+        )
+        future.add_done_callback(functools.partial(self._done, retry_until))
+
+    def _done(self, retry_until: float, future: "asyncio.Future") -> None:
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.error(f"批量运行失败: {future.exception()}")
+            return
+        unfinished = sorted(future.result() or ()) if self._retry > 0 else []
+        if not unfinished:
+            return
+        loop = asyncio.get_running_loop()
+        if loop.time() + self._retry > retry_until:
+            logger.info(f"{len(unfinished)} 位接收人重试后仍未完成，不再重试")
+            return
+        self.retries += 1
+        loop.call_later(self._retry, self._submit, unfinished, retry_until)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """合并统计"""
+        return {
+            "enqueued": self.enqueued,
+            "batches": self.batches,
+            "retries": self.retries,
+            "pending": sum(len(names) for names in self._pending.values()),
+        }
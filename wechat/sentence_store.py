@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from models.singleton import singleton
+from settings.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SentenceStore:
+    """每日一句存档
+
+    以 dateline 为键保存接口返回的原始数据，同时按 sid 建立索引；
+    当天已有的句子直接从内存返回，接口不可用时可以退回到最近一天的存档。
+    接口返回的还不是所请求日期的句子（尚未发布）时记录下来，
+    retry_after 秒内不再为该日期请求接口。
+    存档持久化在 file_path 中，最多保留 max_entries 天。
+    """
+
+    def __init__(
+        self,
+        file_path: Optional[str],
+        max_entries: int = 365,
+        retry_after: float = 60 * 60,
+    ):
+        self._file_path = file_path
+        self._max_entries = max_entries
+        self._retry_after = retry_after
+        self._lock = threading.Lock()
+        self._by_date: Dict[str, Dict[str, Any]] = {}
+        self._by_sid: Dict[str, str] = {}
+        self._prefetching: Dict[str, threading.Thread] = {}
+        # 尚未发布的日期及发现的时间（time.monotonic）
+        self._unpublished: Dict[str, float] = {}
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+        self.prefetches = 0
+
+        self._load()
+
+    def _load(self) -> None:
+        if not self._file_path or not os.path.exists(self._file_path):
+            return
+        try:
+            with open(self._file_path, "r", encoding="utf-8") as file:
+                archive = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.info(f"每日一句存档加载失败，将重新获取: {e}")
+            return
+        for data in archive.values():
+            self._add(data)
+
+    def _save(self) -> None:
+        if not self._file_path:
+            return
+        os.makedirs(os.path.dirname(self._file_path) or ".", exist_ok=True)
+        tmp_path = f"{self._file_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self._by_date, file, ensure_ascii=False)
+        os.replace(tmp_path, self._file_path)
+
+    def _add(self, data: Dict[str, Any]) -> None:
+        dateline = data["dateline"]
+        self._by_date[dateline] = data
+        if data.get("sid"):
+            self._by_sid[data["sid"]] = dateline
+
+        # 超出容量时淘汰最早的日期
+        while len(self._by_date) > self._max_entries:
+            oldest = min(self._by_date)
+            sid = self._by_date.pop(oldest).get("sid")
+            if self._by_sid.get(sid) == oldest:
+                del self._by_sid[sid]
+
+    def get(self, dateline: str) -> Optional[Dict[str, Any]]:
+        """按日期获取句子"""
+        with self._lock:
+            data = self._by_date.get(dateline)
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return data
+
+    def get_by_sid(self, sid: str) -> Optional[Dict[str, Any]]:
+        """按句子ID获取句子"""
+        with self._lock:
+            dateline = self._by_sid.get(sid)
+            return None if dateline is None else self._by_date.get(dateline)
+
+    def latest(self, before: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """获取不晚于 before 的最近一天的句子，用于接口不可用时兜底"""
+        with self._lock:
+            datelines = [
+                dateline
+                for dateline in self._by_date
+                if before is None or dateline <= before
+            ]
+            if not datelines:
+                return None
+            self.fallbacks += 1
+            return self._by_date[max(datelines)]
+
+    def mark_unpublished(self, dateline: str) -> None:
+        """记录该日期的句子尚未发布"""
+        with self._lock:
+            self._unpublished[dateline] = time.monotonic()
+
+    def is_unpublished(self, dateline: str) -> bool:
+        """最近 retry_after 秒内是否已确认该日期的句子尚未发布"""
+        with self._lock:
+            marked = self._unpublished.get(dateline)
+            if marked is None:
+                return False
+            if time.monotonic() - marked >= self._retry_after:
+                del self._unpublished[dateline]
+                return False
+            return True
+
+    def put(self, data: Dict[str, Any]) -> None:
+        """保存接口返回的一条句子"""
+        if not data.get("dateline"):
+            return
+        with self._lock:
+            self._add(data)
+            self._save()
+
+    def prefetch(
+        self, dateline: str, fetch: Callable[[], Dict[str, Any]]
+    ) -> Optional[threading.Thread]:
+        """在后台线程中预取指定日期的句子
+
+        已存在、正在预取或最近确认尚未发布时不重复请求。
+        """
+        if self.is_unpublished(dateline):
+            return None
+        with self._lock:
+            if dateline in self._by_date or dateline in self._prefetching:
+                return None
+
+            def _run() -> None:
+                try:
+                    data = fetch()
+                    if data.get("dateline") == dateline:
+                        self.put(data)
+                        with self._lock:
+                            self.prefetches += 1
+                    else:
+                        self.mark_unpublished(dateline)
+                        logger.debug(f"每日一句 {dateline} 尚未发布")
+                except Exception as e:
+                    logger.info(f"每日一句 {dateline} 预取失败: {e}")
+                finally:
+                    with self._lock:
+                        del self._prefetching[dateline]
+
+            thread = threading.Thread(
+                target=_run, name=f"sentence-prefetch-{dateline}", daemon=True
+            )
+            self._prefetching[dateline] = thread
+        thread.start()
+        return thread
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """存档统计"""
+        with self._lock:
+            return {
+                "entries": len(self._by_date),
+                "hits": self.hits,
+                "misses": self.misses,
+                "fallbacks": self.fallbacks,
+                "prefetches": self.prefetches,
+            }
+
+
+@singleton
+def get_sentence_store() -> SentenceStore:
+    """获取进程级的每日一句存档"""
+    return SentenceStore(
+        settings.SENTENCE_ARCHIVE_FILE,
+        max_entries=settings.SENTENCE_ARCHIVE_SIZE,
+        retry_after=settings.SENTENCE_RETRY_AFTER,
+    )
@@ -0,0 +1,256 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.singleton import singleton
+from settings.settings import settings
+from wechat.deepseek import (
+    request_suggestion,
+    request_suggestions,
+    stream_suggestion,
+)
+
+logger = logging.getLogger(__name__)
+
+# 温度区间上界（摄氏度），按当日最高温分档
+TEMPERATURE_BANDS = [0, 10, 18, 25, 30, 35]
+# 湿度区间上界（百分比）
+HUMIDITY_BANDS = [30, 60]
+# 紫外线等级区间上界
+UV_BANDS = [2, 5, 7, 10]
+# 降水量区间上界（毫米）：无雨、小雨、中雨、大雨，超过为暴雨
+PRECIP_BANDS = [0, 10, 25, 50]
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _bucket(value: Any, bands: List[float]) -> Optional[int]:
+    """返回数值所在区间的序号，缺失值返回None"""
+    number = _number(value)
+    if number is None:
+        return None
+    for index, upper in enumerate(bands):
+        if number <= upper:
+            return index
+    return len(bands)
+
+
+def _code(value: Any) -> Optional[str]:
+    """天气图标代码统一为字符串，与解析为数值之前写入缓存文件的键保持一致"""
+    return None if value is None else str(value)
+
+
+def weather_features(weather: Any) -> Tuple:
+    """从天气数据中提取用于缓存的归一化特征"""
+    return (
+        _bucket(weather.tempMax, TEMPERATURE_BANDS),
+        _code(weather.iconDay),
+        _code(weather.iconNight),
+        _bucket(weather.humidity, HUMIDITY_BANDS),
+        _bucket(weather.uvIndex, UV_BANDS),
+        _bucket(weather.precip, PRECIP_BANDS),
+    )
+
+
+class SuggestionCache:
+    """大模型建议缓存
+
+    以天气特征为键，每个键最多保存 variants 条不同的建议，有缓存时随机返回其中一条；
+    变体未攒满时以 top_up 的概率视为未命中，重新生成一条补充进来；
+    条目超过 ttl 秒过期，总数超过 max_entries 时淘汰最久未使用的条目；
+    缓存持久化在 file_path 中，调用 save 时写回，跨进程运行复用。
+    """
+
+    def __init__(
+        self,
+        file_path: Optional[str],
+        ttl: float = 60 * 60 * 24 * 30,
+        max_entries: int = 1000,
+        variants: int = 3,
+        top_up: float = 0.2,
+    ):
+        self._file_path = file_path
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._variants = variants
+        self._top_up = top_up
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+
+        self._load()
+
+    @staticmethod
+    def _key(features: Tuple) -> str:
+        return json.dumps(features, separators=(",", ":"))
+
+    def _load(self) -> None:
+        if not self._file_path or not os.path.exists(self._file_path):
+            return
+        try:
+            with open(self._file_path, "r", encoding="utf-8") as file:
+                entries = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.info(f"建议缓存加载失败，将重新生成: {e}")
+            return
+        now = time.time()
+        for key, entry in entries.items():
+            if now - entry["created"] < self._ttl:
+                self._entries[key] = entry
+
+    def save(self) -> None:
+        """有变化时写回文件"""
+        if not self._file_path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self._file_path) or ".", exist_ok=True)
+            tmp_path = f"{self._file_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(self._entries, file, ensure_ascii=False)
+            os.replace(tmp_path, self._file_path)
+            self._dirty = False
+
+    def get(
+        self, features: Tuple, rng: Optional[random.Random] = None
+    ) -> Optional[str]:
+        """命中时返回一条建议，否则返回None
+
+        变体未攒满时按 top_up 的概率返回None，由调用方生成新的建议补充；
+        是否补充和选取哪条建议都由 rng 决定，未指定时使用全局 random。
+        """
+        rng = rng or random
+        key = self._key(features)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created"] >= self._ttl:
+                del self._entries[key]
+                self._dirty = True
+                entry = None
+            if entry is None or (
+                len(entry["suggestions"]) < self._variants
+                and rng.random() < self._top_up
+            ):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_tokens += entry["tokens"] // len(entry["suggestions"])
+            return rng.choice(entry["suggestions"])
+
+    def put(self, features: Tuple, suggestion: str, tokens: int = 0) -> None:
+        """保存一条新生成的建议"""
+        key = self._key(features)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {"created": time.time(), "suggestions": [], "tokens": 0}
+                self._entries[key] = entry
+            if len(entry["suggestions"]) < self._variants:
+                entry["suggestions"].append(suggestion)
+                entry["tokens"] += tokens
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            self._dirty = True
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0,
+                "saved_tokens": self.saved_tokens,
+            }
+
+
+@singleton
+def get_suggestion_cache() -> SuggestionCache:
+    """获取进程级的建议缓存"""
+    return SuggestionCache(
+        settings.SUGGESTION_CACHE_FILE,
+        ttl=settings.SUGGESTION_CACHE_TTL,
+        max_entries=settings.SUGGESTION_CACHE_SIZE,
+        variants=settings.SUGGESTION_CACHE_VARIANTS,
+        top_up=settings.SUGGESTION_CACHE_TOP_UP,
+    )
+
+
+def get_cached_suggestion(
+    weather: Any,
+    weather_message: str,
+    budget: Optional[float] = None,
+    deadline: Optional[float] = None,
+    rng: Optional[random.Random] = None,
+) -> str:
+    """按天气特征获取建议，命中缓存时不请求大模型
+
+    指定 budget 时以流式方式请求，超时抛出 TimeoutError；
+    否则以普通方式请求，包括重试在内不超过截止时间 deadline。
+    rng 决定缓存中的选取，传入渲染上下文的随机数生成器时同一天的结果相同。
+    """
+    cache = get_suggestion_cache()
+    features = weather_features(weather)
+    suggestion = cache.get(features, rng)
+    if suggestion is None:
+        if budget is None:
+            suggestion, tokens = request_suggestion(weather_message, deadline)
+        else:
+            suggestion, tokens = stream_suggestion(weather_message, budget)
+        cache.put(features, suggestion, tokens)
+    return suggestion
+
+
+def get_cached_suggestions(
+    items: List[Tuple[Any, str]],
+    batch_size: Optional[int] = None,
+    deadline: Optional[float] = None,
+    rngs: Optional[List[random.Random]] = None,
+) -> List[Optional[str]]:
+    """批量版本的 get_cached_suggestion，未命中的条目合并为批量请求
+
+    items 为 (天气数据, 天气消息) 列表，返回值与其一一对应；
+    大模型请求失败或超过截止时间 deadline 的条目为None。
+    rngs 为各条目选取缓存建议用的随机数生成器。
+    """
+    cache = get_suggestion_cache()
+    features = [weather_features(weather) for weather, _ in items]
+    results: List[Optional[str]] = [
+        cache.get(feature, rngs[index] if rngs else None)
+        for index, feature in enumerate(features)
+    ]
+
+    missing = [index for index, result in enumerate(results) if result is None]
+    if missing:
+        generated = request_suggestions(
+            [items[index][1] for index in missing], batch_size, deadline
+        )
+        for index, result in zip(missing, generated):
+            if result is None:
+                continue
+            suggestion, tokens = result
+            cache.put(features[index], suggestion, tokens)
+            results[index] = suggestion
+    return results
@@ -1,92 +1,302 @@
+import asyncio
+import functools
 import logging
-from datetime import datetime
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
-import requests
-from apscheduler.schedulers.blocking import BlockingScheduler
-from apscheduler.triggers.cron import CronTrigger
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
-from api.daily_sentence import ApiDailySentence
-from api.weather import ApiWeather
+from api.client import get_api_client
+from models.recipient_models import Recipient
 from settings.settings import settings
-from wechat.date_calculation import AnniversaryMessageGenerator
-from wechat.deepseek import get_suggestion
-from .template import template_concat, WeatherMessageGenerator
+from wechat.deepseek import stats as suggestion_stats
+from wechat.date_calculation import get_anniversary_cache
+from wechat.delivery import get_delivery_worker
+from wechat.event_engine import get_event_engine
+from wechat.fanout import build_daily_messages, load_recipients
+from wechat.forecast_store import get_forecast_store
+from wechat.fetch import prefetch_daily_sentence, timed
+from wechat.render_context import get_cursor_store, get_render_cache
+from wechat.ready_queue import PreparedMessage, get_ready_queue, get_send_gaps
+from wechat.scheduler import (
+    MinuteBatcher,
+    job_stores,
+    local_date,
+    next_send_time,
+    sync_recipient_jobs,
+)
+from wechat.sentence_store import get_sentence_store
+from wechat.suggestion_cache import get_suggestion_cache
 
 logger = logging.getLogger(__name__)
 
 
-def send_daily_message():
-    """发送每日消息的函数"""
+def _build_messages(
+    names: Optional[Iterable[str]],
+    timings: Dict[str, float],
+    send_time: Optional[Callable[[Recipient], datetime]] = None,
+) -> Tuple[List[Recipient], List[Tuple[Recipient, str]]]:
+    """获取数据并生成消息，names 为空时为所有接收人生成
+
+    接收人按所在时区的日期分组，每组按自己的日期生成天气、纪念日和事件提醒；
+    send_time 给出接收人的计划发送时间时按发送时的日期，否则按现在的日期。
+    """
+    deadline = time.monotonic() + settings.RUN_DEADLINE
+    executor = ThreadPoolExecutor(
+        max_workers=settings.FETCH_WORKERS, thread_name_prefix="daily-fetch"
+    )
     try:
-        weather_api = ApiWeather()
-        response = requests.request(
-            weather_api.METHOD,
-            weather_api.URL,
-            headers=weather_api.Headers.load().to_dict,
-            params=weather_api.Params.load().to_dict,
-            timeout=weather_api.TIMEOUT,
-        )
-        daily = response.json().get("daily")[0]
-        weather = weather_api.Response.load(daily)
-
-        # 获取每日一句
-        sentence_api = ApiDailySentence()
-        response = requests.request(
-            sentence_api.METHOD,
-            sentence_api.URL,
-            timeout=sentence_api.TIMEOUT,
-        )
-        sentence_response = sentence_api.Response.load(response.json())
-
-        # 生成消息
-        weather_message = WeatherMessageGenerator(
-            "./data/header.json", "./data/weather.json"
-        ).generate_random_style_message(weather)
-        suggestion_message = get_suggestion(weather_message)
-        anniversary_message = AnniversaryMessageGenerator.generate_anniversary_message(
-            datetime.strptime(settings.ANNIVERSARY, "%Y-%m-%d")
+        recipients = load_recipients()
+        get_event_engine().sync(recipients, date.today())
+        if names is not None:
+            names = set(names)
+            recipients = [
+                recipient for recipient in recipients if recipient.name in names
+            ]
+        groups: Dict[date, List[Recipient]] = {}
+        for recipient in recipients:
+            when = send_time(recipient) if send_time else None
+            groups.setdefault(local_date(recipient, when), []).append(recipient)
+
+        messages: List[Tuple[Recipient, str]] = []
+        # 按日期先后生成，事件引擎查询的日期尽量递增
+        for day in sorted(groups):
+            current_date = datetime.combine(day, datetime.min.time())
+            messages.extend(
+                build_daily_messages(
+                    groups[day], executor, deadline, timings, current_date
+                )
+            )
+        return recipients, messages
+    finally:
+        # 超时的请求不再等待，直接丢弃
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _deliver(
+    messages: List[Tuple[Recipient, str]],
+    send_at: Optional[Dict[str, datetime]] = None,
+) -> int:
+    """交给常驻的发送线程按顺序节流发送，send_at 为各接收人的计划发送时间"""
+    worker = get_delivery_worker()
+    gaps = get_send_gaps()
+
+    def _record(name: str, scheduled: datetime, future: Future) -> None:
+        if future.exception() is None:
+            gaps.record(name, (datetime.now(timezone.utc) - scheduled).total_seconds())
+
+    futures = []
+    for recipient, message in messages:
+        future = worker.submit(recipient.name, message)
+        if send_at and recipient.name in send_at:
+            future.add_done_callback(
+                functools.partial(_record, recipient.name, send_at[recipient.name])
+            )
+        futures.append(future)
+    wait(futures)
+    logger.info(f"发送统计: {worker.stats}")
+    return sum(1 for future in futures if future.exception() is None)
+
+
+def _log_stats(started: float, timings: Dict[str, float]) -> None:
+    timings["total"] = time.perf_counter() - started
+    logger.info(
+        "阶段耗时: "
+        + ", ".join(f"{stage}={seconds:.3f}s" for stage, seconds in timings.items())
+    )
+    if logger.isEnabledFor(logging.DEBUG):
+        for label, stats in (
+            ("接口耗时", get_api_client().stats),
+            ("天气预报存储", get_forecast_store().stats),
+            ("每日一句存档", get_sentence_store().stats),
+            ("大模型", suggestion_stats.to_dict),
+            ("建议缓存", get_suggestion_cache().stats),
+            ("渲染缓存", get_render_cache().stats),
+            ("纪念日数据缓存", get_anniversary_cache().stats),
+            ("事件引擎", get_event_engine().stats),
+            ("待发送队列", get_ready_queue().stats),
+            ("发送延迟", get_send_gaps().stats),
+        ):
+            logger.debug(f"{label}统计: {stats}")
+    get_cursor_store().save()
+    get_suggestion_cache().save()
+
+
+def send_daily_message(names: Optional[Iterable[str]] = None):
+    """立即生成并发送每日消息，names 为空时发送给所有接收人"""
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    try:
+        recipients, messages = _build_messages(names, timings)
+        sent = timed(timings, "send", _deliver, messages)
+
+        logger.info(f"{datetime.now()} - 消息发送成功！共 {sent}/{len(recipients)} 条")
+
+        # 利用发送后的空闲时间预取明天的每日一句
+        if settings.SENTENCE_PREFETCH:
+            for day in {local_date(recipient) for recipient, _ in messages}:
+                prefetch_daily_sentence(day)
+
+    except Exception as e:
+        logger.info(f"{datetime.now()} - 发送消息失败: {e}")
+    finally:
+        _log_stats(started, timings)
+
+
+def prepare_daily_message(names: Iterable[str]) -> List[str]:
+    """提前生成消息放入待发送队列，返回未能生成的接收人
+
+    消息按计划发送时的当地日期生成（如 00:05 发送、前一天 23:55 准备的消息用发送当天的日期）。
+    未完成的接收人由调度器每隔 SCHEDULER_PREPARE_RETRY 秒重试，
+    直到超出提前量；仍未准备好的接收人到点后由发送任务即时生成。
+    """
+    missing = set(names)
+    queue = get_ready_queue()
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    try:
+        now = datetime.now(timezone.utc)
+        recipients, messages = _build_messages(
+            missing, timings, lambda recipient: next_send_time(recipient, now)
         )
-        message = template_concat(
-            weather_message,
-            suggestion_message,
-            anniversary_message,
-            sentence_response.to_str,
+        for recipient, message in messages:
+            queue.put(
+                PreparedMessage(recipient, message, next_send_time(recipient, now), now)
+            )
+        # 已不在配置中的接收人不再重试
+        missing &= {recipient.name for recipient in recipients}
+        missing -= {recipient.name for recipient, _ in messages}
+        logger.info(
+            f"{datetime.now()} - 提前生成消息 {len(messages)} 条，"
+            f"未完成 {len(missing)} 条"
         )
-        from wxauto import WeChat  # 开源版
+    except Exception as e:
+        logger.info(f"{datetime.now()} - 提前生成消息失败: {e}")
+    finally:
+        _log_stats(started, timings)
+    return sorted(missing)
 
-        # 发送微信消息
-        wx = WeChat()
-        wx.SendMsg(message, who=settings.USER_NAME)
 
-        logger.info(f"{datetime.now()} - 消息发送成功！")
+def deliver_daily_message(names: Iterable[str]) -> None:
+    """到点发送：直接发送已准备好的消息，未准备好的接收人即时生成"""
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    names = list(names)
+    try:
+        now = datetime.now(timezone.utc)
+        queue = get_ready_queue()
+        messages: List[Tuple[Recipient, str]] = []
+        send_at: Dict[str, datetime] = {}
+        missing = []
+        for name in names:
+            prepared = queue.pop(name, now)
+            if prepared is None:
+                missing.append(name)
+                continue
+            messages.append((prepared.recipient, prepared.message))
+            send_at[name] = prepared.send_at
+
+        if missing:
+            logger.info(f"{len(missing)} 位接收人的消息未提前准备好，即时生成")
+            # 计划时间为刚刚过去（在宽限时间内）的那次发送
+            since = now - timedelta(seconds=settings.SCHEDULER_MISFIRE_GRACE)
+            _, late = _build_messages(
+                missing, timings, lambda recipient: next_send_time(recipient, since)
+            )
+            for recipient, _ in late:
+                send_at[recipient.name] = next_send_time(recipient, since)
+            messages.extend(late)
+
+        sent = timed(timings, "send", _deliver, messages, send_at)
+        logger.info(f"{datetime.now()} - 消息发送成功！共 {sent}/{len(names)} 条")
+
+        if settings.SENTENCE_PREFETCH:
+            for day in {
+                local_date(recipient, send_at.get(recipient.name))
+                for recipient, _ in messages
+            }:
+                prefetch_daily_sentence(day)
 
     except Exception as e:
         logger.info(f"{datetime.now()} - 发送消息失败: {e}")
+    finally:
+        _log_stats(started, timings)
+
 
+_batchers: Dict[str, MinuteBatcher] = {}
 
-def setup_scheduler():
-    """设置定时任务"""
-    scheduler = BlockingScheduler()
 
-    # 添加每天7点30执行的任务
-    scheduler.add_job(
-        send_daily_message,
-        trigger=CronTrigger(hour=settings.HOUR, minute=settings.MINUTE),
-        id="daily_morning_message",
-        name="每日早安消息",
-        replace_existing=True,
+async def enqueue_recipient(name: str) -> None:
+    """接收人的发送任务，同一分钟到点的接收人合并为一次发送"""
+    _batchers["send"].add(name)
+
+
+async def enqueue_prepare(name: str) -> None:
+    """接收人的提前准备任务，同一分钟触发的接收人合并为一次生成"""
+    _batchers["prepare"].add(name)
+
+
+def setup_scheduler() -> AsyncIOScheduler:
+    """设置定时任务：每位接收人一个按其发送时间和时区触发的发送任务，
+    以及一个提前 SCHEDULER_PREPARE_LEAD 秒生成消息的准备任务"""
+    window = settings.SCHEDULER_BATCH_WINDOW
+    retry = settings.SCHEDULER_PREPARE_RETRY
+    # 准备和发送使用各自的线程池，准备阶段再慢也不会推迟到点发送
+    _batchers["prepare"] = MinuteBatcher(
+        prepare_daily_message,
+        ThreadPoolExecutor(
+            max_workers=settings.SCHEDULER_WORKERS, thread_name_prefix="daily-prepare"
+        ),
+        window,
+        retry=retry,
+        retry_for=settings.SCHEDULER_PREPARE_LEAD - retry,
+    )
+    _batchers["send"] = MinuteBatcher(
+        deliver_daily_message,
+        ThreadPoolExecutor(
+            max_workers=settings.SCHEDULER_WORKERS, thread_name_prefix="daily-send"
+        ),
+        window,
     )
+    return AsyncIOScheduler(
+        jobstores=job_stores(settings.SCHEDULER_JOBSTORE_URL),
+        job_defaults={
+            "coalesce": settings.SCHEDULER_COALESCE,
+            "misfire_grace_time": settings.SCHEDULER_MISFIRE_GRACE,
+            "max_instances": 1,
+        },
+        timezone=settings.TIMEZONE,
+    )
+
 
-    return scheduler
+async def serve() -> None:
+    """启动调度器并同步接收人任务，一直运行到被取消"""
+    scheduler = setup_scheduler()
+    # 先以暂停状态启动，读到任务存储中已有的任务后再增量同步
+    scheduler.start(paused=True)
+    try:
+        result = sync_recipient_jobs(
+            scheduler,
+            load_recipients(),
+            "wechat.task:enqueue_recipient",
+            "wechat.task:enqueue_prepare",
+        )
+        logger.info(f"定时任务同步: {result}")
+        scheduler.resume()
+        await asyncio.Event().wait()
+    finally:
+        scheduler.shutdown(wait=False)
+        for stage, batcher in _batchers.items():
+            logger.info(f"定时任务合并统计 {stage}: {batcher.stats}")
 
 
 def run():
     try:
         logger.info("服务启动")
-        logger.info("获取定时任务")
-        scheduler = setup_scheduler()
         logger.info("定时任务启动")
-        scheduler.start()
+        asyncio.run(serve())
     except KeyboardInterrupt:
         logger.info("程序已退出")
     except Exception as e:
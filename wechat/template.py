@@ -1,157 +1,100 @@
 import logging
-import random
 from datetime import datetime
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Dict, Iterable, Optional
 
-from models.header_models import HeaderDatabase
-from models.weather_models import WeatherDataLoader
-from wechat.utils import check_condition
+from models.registry import header_registry, template_registry, weather_registry
+from models.sampling import Sampler, pick
+from wechat.render_context import RenderContext, section_sampler
 
 logger = logging.getLogger(__name__)
 
 
-class WeatherMessageGenerator:
-    def __init__(self, header_path: str, weather_data_path: str):
-        self.header = HeaderDatabase()
-        self.header.load_from_file(header_path)
-        self.loader = WeatherDataLoader()
-        self.loader.load_from_file(weather_data_path)
-
-        # 消息模板库
-        self.templates = {
-            "romantic": [
-                "🌙✨ {date} | 在{season}的怀抱里 {season_icon}",
-                "🌡️ 温度: {temp_min}°C ~ {temp_max}°C | 爱你的温度刚刚好 ❤️",
-                "☀️ 白天: {day_icon} {day_name} | 像你的笑容一样温暖 {day_icon}",
-                "🌙 夜间: {night_icon} {night_name} | 月光如你的眼眸般温柔 {night_icon}",
-                "💧 湿度: {humidity_name} {humidity_icon} {humidity}% | 空气里弥漫着甜蜜的气息",
-                "☂️ 紫外线: {uv_name} {uv_icon} | 我们的爱情需要防晒吗？等级 {uv_index}",
-                "🌧️ 降水: {precip}mm | 如果是雨，那也是浪漫的太阳雨",
-                "👀 能见度: {vis_name} {vis_icon} {vis}公里 | 我能看见我们的未来",
-                "🌅 日出: {sunrise} | 日落: {sunset} | 想你的时间从日出到日落",
-                "🌙 月相: {moon_name} {moon_icon} | 月出: {moonrise} | 月落: {moonset}",
-            ],
-            "cute": [
-                "🐰🌈 {date} | {season}小精灵来啦 {season_icon}",
-                "🌡️ 温度: {temp_min}°C ~ {temp_max}°C | 暖暖的像小熊的拥抱 🧸",
-                "☀️ 白天: {day_icon} {day_name} | 太阳公公在微笑哦 {day_icon}",
-                "🌙 夜间: {night_icon} {night_name} | 月亮婆婆讲故事时间 {night_icon}",
-                "💧 湿度: {humidity_name} {humidity_icon} {humidity}% | 空气湿润润的像果冻",
-                "☂️ 紫外线: {uv_name} {uv_icon} | 小兔子要涂防晒霜啦！等级 {uv_index}",
-                "🌧️ 降水: {precip}mm | 雨滴在跳圆舞曲呢",
-                "👀 能见度: {vis_name} {vis_icon} {vis}公里 | 能看到好多棉花糖云朵",
-                "🌅 日出: {sunrise} | 日落: {sunset} | 太阳宝宝起床睡觉时间",
-                "🌙 月相: {moon_name} {moon_icon} | 月出: {moonrise} | 月落: {moonset}",
-            ],
-            "playful": [
-                "🎪🤹 {date} | {season}马戏团开演啦 {season_icon}",
-                "🌡️ 温度: {temp_min}°C ~ {temp_max}°C | 热到可以煎鸡蛋了！ 🍳",
-                "☀️ 白天: {day_icon} {day_name} | 太阳在开个人演唱会 {day_icon}",
-                "🌙 夜间: {night_icon} {night_name} | 月亮在玩捉迷藏 {night_icon}",
-                "💧 湿度: {humidity_name} {humidity_icon} {humidity}% | 空气湿得像刚洗完澡",
-                "☂️ 紫外线: {uv_name} {uv_icon} | 防晒霜，启动！等级 {uv_index}",
-                "🌧️ 降水: {precip}mm | 雨神今天比较节俭",
-                "👀 能见度: {vis_name} {vis_icon} {vis}公里 | 能看到邻居家的猫在干嘛",
-                "🌅 日出: {sunrise} | 日落: {sunset} | 太阳的上下班时间",
-                "🌙 月相: {moon_name} {moon_icon} | 月出: {moonrise} | 月落: {moonset}",
-            ],
-            "poetic": [
-                "📜🌸 {date} | {season}的诗篇正在书写 {season_icon}",
-                "🌡️ 温度: {temp_min}°C ~ {temp_max}°C | 恰似温柔的拥抱",
-                "☀️ 白天: {day_icon} {day_name} | 光与影的完美和声 {day_icon}",
-                "🌙 夜间: {night_icon} {night_name} | 星空下的静谧独白 {night_icon}",
-                "💧 湿度: {humidity_name} {humidity_icon} {humidity}% | 空气中弥漫着诗意的露珠",
-                "☂️ 紫外线: {uv_name} {uv_icon} | 阳光的诗行，等级 {uv_index}",
-                "🌧️ 降水: {precip}mm | 天空的泪滴，大地的甘霖",
-                "👀 能见度: {vis_name} {vis_icon} {vis}公里 | 远方的山峦若隐若现",
-                "🌅 日出: {sunrise} | 日落: {sunset} | 昼夜交替的华美乐章",
-                "🌙 月相: {moon_name} {moon_icon} | 月出: {moonrise} | 月落: {moonset}",
-            ],
-            "tech": [
-                "🤖📊 {date} | {season}数据报告 {season_icon}",
-                "🌡️ 温度: {temp_min}°C ~ {temp_max}°C | 热力学参数正常",
-                "☀️ 白天: {day_icon} {day_name} | 太阳辐射强度: 标准 {day_icon}",
-                "🌙 夜间: {night_icon} {night_name} | 月光反射率: 正常 {night_icon}",
-                "💧 湿度: {humidity_name} {humidity_icon} {humidity}% | 水分子浓度: 偏高",
-                "☂️ 紫外线: {uv_name} {uv_icon} | 电磁波谱分析，等级 {uv_index}",
-                "🌧️ 降水: {precip}mm | 液态水沉淀量",
-                "👀 能见度: {vis_name} {vis_icon} {vis}公里 | 光学透明度: 优秀",
-                "🌅 日出: {sunrise} | 日落: {sunset} | 地球自转时间标记",
-                "🌙 月相: {moon_name} {moon_icon} | 月出: {moonrise} | 月落: {moonset}",
-            ],
-        }
-
-    def _get_season_info(self) -> tuple:
-        """获取季节信息"""
-        current_month = datetime.now().month
-        season = self.loader.find_category_by_id(1012)
-        season_icon = "❓"
-        season_name = "未知季节"
+def _forecast_month(fx_date: Optional[str]) -> Optional[int]:
+    """预报日期（YYYY-MM-DD）中的月份，无法解析时返回None"""
+    try:
+        return int(fx_date[5:7])
+    except (TypeError, ValueError):
+        return None
 
-        for item in season.items:
-            if current_month in item.level:
-                season_icon = item.get_icon
-                season_name = item.get_name
-                break
 
-        return season_name, season_icon
+class WeatherMessageGenerator:
+    def __init__(
+        self,
+        header_path: str,
+        weather_data_path: str,
+        template_path: str = "./data/templates.json",
+    ):
+        # 从进程级注册表获取数据快照，文件未变化时不会重复解析
+        self.header, header_digest = header_registry.get_with_digest(header_path)
+        self.loader, weather_digest = weather_registry.get_with_digest(
+            weather_data_path
+        )
+        # 消息模板库（已预编译）
+        self.templates, template_digest = template_registry.get_with_digest(
+            template_path
+        )
+        # 数据文件内容的哈希，数据变化后渲染缓存不再命中
+        self.signature = (header_digest, weather_digest, template_digest)
 
-    def _get_humidity_info(self, humidity_value: int) -> tuple:
+    def _get_season_info(
+        self, month: Optional[int] = None, sampler: Optional[Sampler] = None
+    ) -> tuple:
+        """获取季节信息"""
+        if month is None:
+            month = datetime.now().month
+        item = self.loader.find_item_by_value(1012, month)
+        if item is None:
+            return "未知季节", "❓"
+        return item.pick_name(sampler), item.pick_icon(sampler)
+
+    def _get_humidity_info(
+        self, humidity_value: Optional[int], sampler: Optional[Sampler] = None
+    ) -> tuple:
         """获取湿度信息"""
-        humidity = self.loader.find_category_by_id(1015)
-        humidity_icon = "💧"
-        humidity_name = "适宜"
-
-        for item in humidity.items:
-            if check_condition(humidity_value, item.condition):
-                humidity_icon = item.get_icon
-                humidity_name = item.get_name
-                break
-
-        return humidity_name, humidity_icon
-
-    def _get_uv_info(self, uv_index: int) -> tuple:
+        item = self.loader.find_item_by_value(1015, humidity_value)
+        if item is None:
+            return "适宜", "💧"
+        return item.pick_name(sampler), item.pick_icon(sampler)
+
+    def _get_uv_info(
+        self, uv_index: Optional[int], sampler: Optional[Sampler] = None
+    ) -> tuple:
         """获取紫外线信息"""
-        uv_category = self.loader.find_category_by_id(1011)
-        uv_icon = "🔆"
-        uv_name = "适中"
-
-        for item in uv_category.items:
-            if uv_index in item.level:
-                uv_icon = item.get_icon
-                uv_name = item.get_name
-                break
-
-        return uv_name, uv_icon
-
-    def _get_visibility_info(self, visibility: int) -> tuple:
+        item = self.loader.find_item_by_value(1011, uv_index)
+        if item is None:
+            return "适中", "🔆"
+        return item.pick_name(sampler), item.pick_icon(sampler)
+
+    def _get_visibility_info(
+        self, visibility: Optional[int], sampler: Optional[Sampler] = None
+    ) -> tuple:
         """获取能见度信息"""
-        visibility_category = self.loader.find_category_by_id(1013)
-        visibility_icon = "👀"
-        visibility_name = "良好"
-
-        for item in visibility_category.items:
-            if check_condition(visibility, item.condition):
-                visibility_icon = item.get_icon
-                visibility_name = item.get_name
-                break
-
-        return visibility_name, visibility_icon
-
-    def generate_message(self, weather_data: Any, style: str = "romantic") -> str:
-        """生成天气消息"""
+        item = self.loader.find_item_by_value(1013, visibility)
+        if item is None:
+            return "良好", "👀"
+        return item.pick_name(sampler), item.pick_icon(sampler)
+
+    def build_context(
+        self, weather_data: Any, sampler: Optional[Sampler] = None
+    ) -> Dict[str, Any]:
+        """计算一份预报的模板数据，所有风格共用
+
+        sampler 为空时使用全局 random；指定时同一天重复计算的结果相同。
+        """
         # 获取各种天气信息
-        day_icon_item = self.loader.find_item_by_code(int(weather_data.iconDay))
-        night_icon_item = self.loader.find_item_by_code(int(weather_data.iconNight))
-        moon_icon_item = self.loader.find_item_by_code(int(weather_data.moonPhaseIcon))
+        day_icon_item = self.loader.find_item_by_code(weather_data.iconDay)
+        night_icon_item = self.loader.find_item_by_code(weather_data.iconNight)
+        moon_icon_item = self.loader.find_item_by_code(weather_data.moonPhaseIcon)
 
-        season_name, season_icon = self._get_season_info()
+        season_name, season_icon = self._get_season_info(
+            _forecast_month(weather_data.fxDate), sampler
+        )
         humidity_name, humidity_icon = self._get_humidity_info(
-            int(weather_data.humidity)
+            weather_data.humidity, sampler
         )
-        uv_name, uv_icon = self._get_uv_info(int(weather_data.uvIndex))
+        uv_name, uv_icon = self._get_uv_info(weather_data.uvIndex, sampler)
         visibility_name, visibility_icon = self._get_visibility_info(
-            int(weather_data.vis)
+            weather_data.vis, sampler
         )
 
         # 准备模板数据
@@ -161,10 +104,6 @@ class WeatherMessageGenerator:
             "season_icon": season_icon,
             "temp_min": weather_data.tempMin,
             "temp_max": weather_data.tempMax,
-            "day_icon": day_icon_item.get_icon,
-            "day_name": day_icon_item.get_name,
-            "night_icon": night_icon_item.get_icon,
-            "night_name": night_icon_item.get_name,
             "humidity_name": humidity_name,
             "humidity_icon": humidity_icon,
             "humidity": weather_data.humidity,
@@ -177,32 +116,102 @@ class WeatherMessageGenerator:
             "vis": weather_data.vis,
             "sunrise": weather_data.sunrise,
             "sunset": weather_data.sunset,
-            "moon_name": moon_icon_item.get_name,
-            "moon_icon": moon_icon_item.get_icon,
             "moonrise": weather_data.moonrise,
             "moonset": weather_data.moonset,
         }
+        if day_icon_item is not None:
+            template_data["day_icon"] = day_icon_item.pick_icon(sampler)
+            template_data["day_name"] = day_icon_item.pick_name(sampler)
+        if night_icon_item is not None:
+            template_data["night_icon"] = night_icon_item.pick_icon(sampler)
+            template_data["night_name"] = night_icon_item.pick_name(sampler)
+        if moon_icon_item is not None:
+            template_data["moon_name"] = moon_icon_item.pick_name(sampler)
+            template_data["moon_icon"] = moon_icon_item.pick_icon(sampler)
+        # 缺失的数据视为字段不存在，渲染时对应的行会被跳过
+        return {key: value for key, value in template_data.items() if value is not None}
+
+    def header_line(self, sampler: Optional[Sampler] = None) -> str:
+        """消息的头部行"""
+        return f"{self.header.pick(sampler).to_str}\n"
+
+    def render(
+        self,
+        template_data: Dict[str, Any],
+        style: str = "romantic",
+        sampler: Optional[Sampler] = None,
+        header: bool = True,
+    ) -> str:
+        """用已计算好的模板数据渲染一种风格
+
+        header 为False时头部行留空，由调用方把 header_line 拼在消息前面。
+        """
+        first_line = self.header_line(sampler) if header else ""
+        return self.templates.get(style).render(template_data, first_line=first_line)
+
+    def generate_messages(
+        self,
+        weather_data: Any,
+        styles: Optional[Iterable[str]] = None,
+        context: Optional[RenderContext] = None,
+        header: bool = True,
+    ) -> Dict[str, str]:
+        """模板数据只计算一次，渲染全部（或指定的）风格，返回 {风格: 消息}
+
+        指定 context 时每种风格的结果与渲染了哪些其他风格无关。
+        """
+        template_data = self.build_context(
+            weather_data, section_sampler(context, "weather")
+        )
+        if styles is None:
+            styles = self.templates.styles
+        return {
+            style: self.render(
+                template_data,
+                style,
+                section_sampler(context, f"weather:{style}"),
+                header,
+            )
+            for style in styles
+        }
 
-        # 选择模板风格
-        selected_templates = self.templates.get(style, self.templates["romantic"])
-
-        # 构建消息
-        message_lines = [f"{self.header.choice.to_str}\n"]
-        for template in selected_templates:
-            try:
-                line = template.format(**template_data)
-                message_lines.append(line)
-            except KeyError:
-                # 如果某个字段缺失，跳过该行
+    def generate_message(
+        self,
+        weather_data: Any,
+        style: str = "romantic",
+        context: Optional[RenderContext] = None,
+    ) -> str:
+        """生成天气消息"""
+        return self.generate_messages(weather_data, [style], context)[style]
+
+    def generate_local_suggestion(
+        self, weather_data: Any, context: Optional[RenderContext] = None
+    ) -> str:
+        """不依赖大模型，从天气数据库自带的建议中组合出温馨提示"""
+        sampler = section_sampler(context, "local_suggestion")
+        items = [
+            self.loader.find_item_by_code(weather_data.iconDay),
+            self.loader.find_item_by_code(weather_data.iconNight),
+            self.loader.find_item_by_value(1015, weather_data.humidity),
+            self.loader.find_item_by_value(1011, weather_data.uvIndex),
+        ]
+        suggestions = []
+        for item in items:
+            if item is None:
                 continue
-
-        return "\n".join(message_lines)
-
-    def generate_random_style_message(self, weather_data: Any) -> str:
+            suggestion = item.pick_suggestion(sampler)
+            if suggestion not in suggestions:
+                suggestions.append(suggestion)
+        return f"✨ 温馨提示：\n{'，'.join(suggestions)}"
+
+    def generate_random_style_message(
+        self, weather_data: Any, context: Optional[RenderContext] = None
+    ) -> str:
         """随机选择风格生成消息"""
-        styles = list(self.templates.keys())
-        selected_style = random.choice(styles)
-        return self.generate_message(weather_data, selected_style)
+        selected_style = pick(
+            section_sampler(context, "style"), "style", self.templates.styles
+        )
+        return self.generate_message(weather_data, selected_style, context)
 
 
 def template_concat(
@@ -246,8 +255,8 @@ def template_concat(
         ]
     )
 
-    # 拼接消息
-    full_message = separator.join(message_parts)
+    # 拼接消息（跳过空白部分）
+    full_message = separator.join(part for part in message_parts if part)
 
     # 长度检查
     if max_length and len(full_message) > max_length: